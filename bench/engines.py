@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Сверка движков: один и тот же набор сценариев под `--engine sync` и
+`--engine async` должен дать одинаковый лог (и одинаковые ошибки).
+
+  1. все scenarios/*.yaml в dry-run;
+  2. синтетический сценарий, исполняемый по-настоящему: log, sleep, if,
+     repeat_until, wait_any, parallel и run_program (текущий python).
+
+Длительности "(1.23s)" и pid в логах нормализуются; строки сравниваются
+без учёта порядка — заголовки параллельных веток печатаются вперемешку.
+
+    python bench/engines.py
+
+Код выхода 1 — если логи движков расходятся.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import yaml
+from rich.console import Console
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from runner.dsl import load_config  # noqa: E402
+from runner.orchestrator import ENGINES, run_scenario  # noqa: E402
+
+_NOISE = (
+    (re.compile(r"\d+\.\d+s\b"), "#s"),
+    (re.compile(r"pid=\d+"), "pid=#"),
+)
+
+
+def _synthetic() -> Dict[str, Any]:
+    def log(name: str, msg: str) -> Dict[str, Any]:
+        return {"name": name, "action": "log", "message": msg}
+
+    def nap(name: str, d: str) -> Dict[str, Any]:
+        return {"name": name, "action": "sleep", "duration": d}
+
+    return {
+        "version": 1,
+        "settings": {"vars": {"who": "engines"}},
+        "steps": [
+            log("hello", "hello {{ who }}"),
+            {
+                "name": "python",
+                "action": "run_program",
+                "path": sys.executable,
+                "args": ["-c", "print('child')"],
+                "wait": True,
+                "timeout": "20s",
+            },
+            {
+                "name": "loop",
+                "action": "repeat_until",
+                "counter_id": "loop",
+                "max_attempts": 5,
+                "delay_between_attempts": "50ms",
+                "try": [nap("nap", "20ms")],
+                "condition": {"type": "attempts_ge", "counter_id": "loop", "value": 3},
+                "on_success": [log("done", "loop={{ state['counter:loop'] }}")],
+            },
+            {
+                "name": "branches",
+                "action": "parallel",
+                "join": "all",
+                "branches": [
+                    [nap("a", "300ms"), log("a-log", "a")],
+                    {"name": "b", "steps": [nap("b", "100ms"), log("b-log", "b")]},
+                ],
+            },
+            {
+                "name": "race",
+                "action": "wait_any",
+                "timeout": "1s",
+                "conditions": [
+                    {"type": "attempts_ge", "counter_id": "loop", "value": 3}
+                ],
+            },
+            {
+                "name": "branch",
+                "action": "if",
+                "condition": {
+                    "not": {"type": "attempts_ge", "counter_id": "loop", "value": 9}
+                },
+                "then": [log("then", "then-branch")],
+                "else": [log("else", "never")],
+                "delay_after": "30ms",
+            },
+        ],
+    }
+
+
+def _run(cfg: Dict[str, Any], engine: str, dry_run: bool) -> Tuple[List[str], float]:
+    buf = io.StringIO()
+    console = Console(file=buf, width=160, record=True, color_system=None)
+    t0 = time.perf_counter()
+    try:
+        run_scenario(cfg, dry_run=dry_run, console=console, engine=engine)
+        outcome = "ok"
+    except Exception as e:  # ошибка — тоже часть поведения
+        outcome = f"{type(e).__name__}: {e}"
+    dt = time.perf_counter() - t0
+    text = console.export_text() + f"\n=> {outcome}\n"
+    for rx, repl in _NOISE:
+        text = rx.sub(repl, text)
+    return [ln.rstrip() for ln in text.splitlines() if ln.strip()], dt
+
+
+def _compare(title: str, cfg: Dict[str, Any], dry_run: bool) -> bool:
+    runs = {e: _run(cfg, e, dry_run) for e in ENGINES}
+    (a, ta), (b, tb) = runs["sync"], runs["async"]
+    same = Counter(a) == Counter(b)
+    verdict = "same" if same else "DIFF"
+    print(f"{title:40} sync={ta * 1000:8.1f}ms async={tb * 1000:8.1f}ms  {verdict}")
+    if not same:
+        for ln in sorted((Counter(a) - Counter(b)).elements()):
+            print(f"    sync only : {ln}")
+        for ln in sorted((Counter(b) - Counter(a)).elements()):
+            print(f"    async only: {ln}")
+    return same
+
+
+def main() -> int:
+    ok = True
+    for path in sorted((ROOT / "scenarios").glob("*.yaml")):
+        cfg = load_config(ROOT, str(path), None, [])
+        ok &= _compare(f"{path.name} (dry-run)", cfg, dry_run=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scen = Path(tmp) / "engines.yaml"
+        scen.write_text(yaml.safe_dump(_synthetic()), encoding="utf-8")
+        cfg = load_config(ROOT, str(scen), None, [])
+        ok &= _compare("synthetic (real run)", cfg, dry_run=False)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк load_config на синтетическом сценарии (по умолчанию 10k шагов).
+
+Сравнивает текущую загрузку (libyaml CSafeLoader, кэш разбора по mtime,
+общий Jinja Environment с кэшем скомпилированных шаблонов, copy-on-write
+мердж) с прежним алгоритмом: чистый Python-лоадер, новый Environment и
+from_string на каждую строку, полное копирование дерева. Шаги текущий
+load_config не рендерит (они рендерятся при исполнении); для сверки
+результата они рендерятся отдельно.
+
+    python bench/load_config.py [--steps 10000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import yaml
+from jinja2 import Environment, StrictUndefined
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from runner import dsl  # noqa: E402
+from runner.utils.paths import ensure_paths_in_config  # noqa: E402
+
+
+def _synthetic(n: int) -> Dict[str, Any]:
+    steps: List[Dict[str, Any]] = []
+    for i in range(n):
+        if i % 10 == 0:
+            steps.append(
+                {
+                    "name": f"branch {i}",
+                    "action": "if",
+                    "condition": {"type": "process_exists", "name": "/{{ proc }}/i"},
+                    "then": [
+                        {"name": "log", "action": "log", "message": "{{ greet }} #1"}
+                    ],
+                    "else": [{"name": "nap", "action": "sleep", "duration": "10ms"}],
+                }
+            )
+        else:
+            steps.append(
+                {
+                    "name": f"step {i}",
+                    "action": "log",
+                    "message": "{{ greet }}, step" if i % 3 == 0 else f"plain {i}",
+                    "delay_after": "1ms",
+                }
+            )
+    return {
+        "version": 1,
+        "settings": {"vars": {"greet": "hello", "proc": "notepad"}},
+        "steps": steps,
+    }
+
+
+def _legacy_load(project_root: Path, scenario: str) -> Dict[str, Any]:
+    """Прежний путь load_config (для сравнения)."""
+
+    def merge(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+        out = dict(a)
+        for k, v in b.items():
+            if k in out and isinstance(out[k], dict) and isinstance(v, dict):
+                out[k] = merge(out[k], v)
+            else:
+                out[k] = v
+        return out
+
+    def load(p: Path) -> Dict[str, Any]:
+        with p.open("r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+
+    defaults_p, _, scenario_p = dsl.resolve_paths(project_root, scenario, None)
+    result: Dict[str, Any] = merge({}, load(defaults_p))
+    result = merge(result, load(scenario_p))
+    ensure_paths_in_config(result, project_root, scenario_p, None)
+
+    vars_ = ((result.get("settings") or {}).get("vars") or {}).copy()
+    env = Environment(undefined=StrictUndefined)
+
+    def walk(x: Any) -> Any:
+        if isinstance(x, str) and "{{" in x:
+            return env.from_string(x).render(**vars_)
+        if isinstance(x, dict):
+            return {k: walk(v) for k, v in x.items()}
+        if isinstance(x, list):
+            return [walk(i) for i in x]
+        return x
+
+    return walk(result)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--steps", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    opts = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scen = Path(tmp) / "synthetic.yaml"
+        scen.write_text(
+            yaml.safe_dump(_synthetic(opts.steps), allow_unicode=True),
+            encoding="utf-8",
+        )
+        print(f"scenario: {opts.steps} steps, {scen.stat().st_size / 1024:.0f} KiB")
+        print(f"yaml loader: {dsl._YamlLoader.__name__}")
+
+        legacy = _time(lambda: _legacy_load(ROOT, str(scen)), opts.repeat)
+
+        dsl._yaml_cache.clear()
+        dsl.compile_template.cache_clear()
+        cold = _time(lambda: dsl.load_config(ROOT, str(scen), None, []), 1)
+        warm = _time(lambda: dsl.load_config(ROOT, str(scen), None, []), opts.repeat)
+
+        # результат должен совпадать с прежним алгоритмом; шаги load_config
+        # не рендерит (это делает StepPlan.render при исполнении) — рендерим
+        # их здесь тем же render_tree с settings.vars
+        cfg = dsl.load_config(ROOT, str(scen), None, [])
+        variables = (cfg.get("settings") or {}).get("vars") or {}
+        cfg["steps"] = dsl.render_tree(cfg["steps"], variables)
+        same = cfg == _legacy_load(ROOT, str(scen))
+
+    med = statistics.median
+    print(f"legacy      : {med(legacy) * 1000:8.1f} ms")
+    print(f"current cold: {cold[0] * 1000:8.1f} ms  (x{med(legacy) / cold[0]:.1f})")
+    print(f"current warm: {med(warm) * 1000:8.1f} ms  (x{med(legacy) / med(warm):.1f})")
+    print(f"same result : {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Короткие команды оболочки: новый процесс на команду против сессии из пула
+(utils.shells). Печатает медиану и p90 на команду и число запущенных сессий.
+
+    python bench/shell.py [--shell auto|bash|sh|powershell|pwsh] [-n 50]
+
+На Windows (powershell.exe стартует сотни мс) разница — на порядки;
+на Linux bash стартует за единицы мс, и пул примерно на равных.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from runner.utils import shells  # noqa: E402
+
+
+def _fresh_argv(shell: str, command: str) -> List[str]:
+    if shell in ("powershell", "pwsh"):
+        exe = "powershell.exe" if shell == "powershell" else "pwsh"
+        return [exe, "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", command]
+    return [shell, "-c", command]
+
+
+def _measure(fn: Callable[[int], None], n: int) -> List[float]:
+    out = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def _report(title: str, xs: List[float]) -> None:
+    xs = sorted(xs)
+    p90 = xs[int(len(xs) * 0.9) - 1] if len(xs) >= 10 else xs[-1]
+    print(
+        f"  {title:8} median={statistics.median(xs) * 1000:8.2f}ms"
+        f" p90={p90 * 1000:8.2f}ms total={sum(xs):6.2f}s"
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shell", default="auto")
+    ap.add_argument("-n", type=int, default=50)
+    args = ap.parse_args()
+    shell = shells.default_shell() if args.shell == "auto" else args.shell
+
+    def fresh(i: int) -> None:
+        argv = _fresh_argv(shell, f"echo {i}")
+        subprocess.run(argv, capture_output=True, text=True, check=True)
+
+    pool = shells.ShellPool(shell, size=1, max_commands=shells.DEFAULT_MAX_COMMANDS)
+
+    def pooled(i: int) -> None:
+        code, _, _ = pool.run(f"echo {i}")
+        assert code == 0
+
+    print(f"{shell}: {args.n} x 'echo'")
+    _report("fresh", _measure(fresh, args.n))
+    _report("pooled", _measure(pooled, args.n))
+    print(f"  sessions started: {pool.started}")
+    pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
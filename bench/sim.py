@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Сквозной прогон сценария на синтетическом рабочем столе (desktop.sim):
+без GUI, на любой ОС. По умолчанию — scenarios/notepad_click.yaml с
+описанием стола scenarios/notepad_click.assets/sim.yaml.
+
+Для каждого движка (sync/async) и часов (real/virtual) печатает медиану
+реального времени прогона, время по часам сценария и счётчики стола
+(кадры, клики, клавиши).
+
+    python bench/sim.py [--scenario notepad_click] [--sim PATH] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from rich.console import Console
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from runner.desktop.sim import SimDesktop  # noqa: E402
+from runner.dsl import load_config  # noqa: E402
+from runner.orchestrator import ENGINES, run_scenario  # noqa: E402
+from runner.utils import timing  # noqa: E402
+
+
+def _once(
+    cfg: Dict[str, Any], sim_path: Path, engine: str, virtual: bool
+) -> Tuple[float, float, Dict[str, int]]:
+    desk = SimDesktop.from_file(sim_path)
+    clock = timing.VirtualClock() if virtual else timing.Clock()
+    console = Console(file=io.StringIO(), width=120)
+    t0 = time.perf_counter()
+    run_scenario(cfg, console=console, engine=engine, clock=clock, desktop=desk)
+    real = time.perf_counter() - t0
+    scen = clock.virtual_elapsed if isinstance(clock, timing.VirtualClock) else real
+    return real, scen, desk.summary()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenario", default="notepad_click")
+    ap.add_argument("--sim", default=None, help="описание стола (yaml)")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    sim_path = (
+        Path(args.sim)
+        if args.sim
+        else ROOT / "scenarios" / f"{args.scenario}.assets" / "sim.yaml"
+    )
+    cfg = load_config(ROOT, args.scenario, None, [])
+    with tempfile.TemporaryDirectory() as tmp:
+        # артефакты (debug.save_best) — во временный каталог, не в репозиторий
+        cfg = {**cfg, "paths": {**(cfg.get("paths") or {}), "project_root": tmp}}
+        print(f"{args.scenario} on {sim_path.relative_to(ROOT)}")
+        for engine in ENGINES:
+            for virtual in (False, True):
+                reals: List[float] = []
+                scen = 0.0
+                info: Dict[str, int] = {}
+                for _ in range(args.repeat):
+                    real, scen, info = _once(cfg, sim_path, engine, virtual)
+                    reals.append(real)
+                clock = "virtual" if virtual else "real"
+                med = statistics.median(reals) * 1000
+                counters = " ".join(f"{k}={v}" for k, v in info.items())
+                print(
+                    f"  {engine:5} {clock:7} real={med:8.1f}ms"
+                    f" scenario={scen:6.2f}s  {counters}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк времени старта CLI: `runner list` и `runner check`.
+
+Запускает `python -X importtime -m runner.cli ...` в отдельном процессе,
+суммирует время импортов верхнего уровня и проверяет, что тяжёлые
+модули (cv2, numpy, pyautogui, ...) вообще не загружались.
+
+    python bench/startup.py [--repeat 5]
+
+Код выхода 1 — если превышен бюджет или подтянулся тяжёлый модуль.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# бюджет на суммарное время импортов (мс) по командам
+BUDGET_MS: Dict[str, float] = {"list": 350.0, "check": 450.0}
+
+COMMANDS: Dict[str, List[str]] = {
+    "list": ["list"],
+    "check": ["check", "notepad_demo"],
+}
+
+# эти модули не должны грузиться ради list/check
+HEAVY = ("cv2", "numpy", "mss", "pyautogui", "pyperclip", "psutil", "pygetwindow")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _measure(args: List[str]) -> Tuple[float, float, Set[str]]:
+    """-> (wall ms, сумма cumulative импортов верхнего уровня ms, модули)"""
+    cmd = [sys.executable, "-X", "importtime", "-m", "runner.cli", *args]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000.0
+    if proc.returncode not in (0, 2):
+        sys.stderr.write(proc.stderr[-2000:])
+        raise SystemExit(f"command failed: {' '.join(args)}")
+
+    total_us = 0
+    modules: Set[str] = set()
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), m.group(3), m.group(4)
+        modules.add(name)
+        if len(indent) <= 1:  # импорт верхнего уровня
+            total_us += cumulative
+    return wall, total_us / 1000.0, modules
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--repeat", type=int, default=5)
+    opts = ap.parse_args()
+
+    failed = False
+    for name, args in COMMANDS.items():
+        walls: List[float] = []
+        imports: List[float] = []
+        loaded: Set[str] = set()
+        for _ in range(max(1, opts.repeat)):
+            wall, imp, mods = _measure(args)
+            walls.append(wall)
+            imports.append(imp)
+            loaded |= mods
+        heavy = sorted(m for m in loaded if m.split(".")[0] in HEAVY)
+        imp_med = statistics.median(imports)
+        budget = BUDGET_MS[name]
+        ok = imp_med <= budget and not heavy
+        failed |= not ok
+        print(
+            f"{name:6s} wall={statistics.median(walls):7.1f}ms "
+            f"imports={imp_med:7.1f}ms budget={budget:.0f}ms "
+            f"{'OK' if ok else 'FAIL'}"
+        )
+        if heavy:
+            print(f"       heavy modules imported: {', '.join(heavy)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
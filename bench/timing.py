@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Точность задержек и частоты опроса: time.sleep против utils.timing.
+
+  1. одиночные задержки 1/5/10/20/50 мс — среднее и максимальное опоздание;
+  2. опрос "работа + sleep(period)" против timing.ticks: сколько попыток
+     реально влезает в окно и какой получается фактический период.
+
+    python bench/timing.py [--work-ms 8] [--period-ms 20] [--window 1.0]
+
+На Windows c Python < 3.11 разница в п.1 самая заметная (квант ~15 мс).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from runner.utils import timing  # noqa: E402
+
+
+def _lateness(sleep: Callable[[float], object], d: float, n: int) -> List[float]:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        sleep(d)
+        out.append(time.perf_counter() - t0 - d)
+    return out
+
+
+def _busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _naive_poll(work: float, period: float, window: float) -> int:
+    n = 0
+    deadline = time.perf_counter() + window
+    while time.perf_counter() < deadline:
+        _busy(work)
+        n += 1
+        time.sleep(period)
+    return n
+
+
+def _ticks_poll(work: float, period: float, window: float) -> int:
+    n = 0
+    for _ in timing.ticks(period, window):
+        _busy(work)
+        n += 1
+    return n
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--work-ms", type=float, default=8.0)
+    ap.add_argument("--period-ms", type=float, default=20.0)
+    ap.add_argument("--window", type=float, default=1.0)
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    print(f"{'delay':>8} {'time.sleep avg/max':>22} {'timing.sleep avg/max':>24}")
+    for ms in (1, 5, 10, 20, 50):
+        d = ms / 1000
+        a = _lateness(time.sleep, d, args.repeat)
+        b = _lateness(timing.sleep, d, args.repeat)
+        print(
+            f"{ms:>6}ms {sum(a) / len(a) * 1000:>10.2f}/{max(a) * 1000:<7.2f}ms"
+            f" {sum(b) / len(b) * 1000:>12.2f}/{max(b) * 1000:<7.2f}ms"
+        )
+
+    work, period = args.work_ms / 1000, args.period_ms / 1000
+    expected = int(args.window / period)
+    naive = _naive_poll(work, period, args.window)
+    fixed = _ticks_poll(work, period, args.window)
+    print(
+        f"\npoll work={args.work_ms:.0f}ms period={args.period_ms:.0f}ms "
+        f"window={args.window:.1f}s (ожидается ~{expected} попыток)"
+    )
+    for title, n in (("work + sleep", naive), ("timing.ticks", fixed)):
+        print(f"  {title} : {n:4d} попыток, период {args.window / n * 1000:.1f}ms")
+    st = timing.stats()
+    print(
+        f"\ntiming.stats: sleeps={st['sleeps']} late_avg={st['late_avg'] * 1000:.3f}ms "
+        f"late_max={st['late_max'] * 1000:.3f}ms"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
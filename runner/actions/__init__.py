@@ -1,9 +1,127 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from typing import Callable, Dict
+import threading
+from functools import wraps
+from importlib import import_module
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-REGISTRY: Dict[str, Callable] = {}
+# Статический манифест: action -> "модуль:функция" (модуль внутри runner.actions).
+# Модуль импортируется только когда действие действительно понадобилось —
+# `runner list`/`runner check` не тянут cv2/numpy/pyautogui/WinAPI.
+MANIFEST: Dict[str, str] = {
+    # run.py
+    "run_program": "run:run_program",
+    "run_ps": "run:run_ps",
+    "run_shell": "run:run_shell",
+    "run_many": "run:run_many",
+    # process.py
+    "wait_process": "process:wait_process",
+    "wait_output": "process:wait_output",
+    # fs.py
+    "wait_file": "fs:wait_file",
+    # net.py
+    "wait_port": "net:wait_port",
+    "wait_http": "net:wait_http",
+    # window.py
+    "wait_window": "window:wait_window",
+    "window_focus": "window:window_focus",
+    # flow.py
+    "log": "flow:action_log",
+    "sleep": "flow:action_sleep",
+    "pause": "flow:action_pause",
+    "checkpoint": "flow:action_checkpoint",
+    "if_condition": "flow:action_if_condition",
+    "if": "flow:action_if",
+    "repeat_until": "flow:action_repeat_until",
+    "parallel": "flow:action_parallel",
+    "wait_any": "flow:action_wait_any",
+    # input.py
+    "type_text": "input:type_text",
+    "press_key": "input:press_key",
+    # vision.py
+    "image_exists": "vision:image_exists",
+    "click_image": "vision:click_image",
+    "pixel_is": "vision:pixel_is",
+    "color_ratio": "vision:color_ratio",
+    "wait_stable": "vision:wait_stable",
+    "wait_vanish": "vision:wait_vanish",
+}
+
+# ключи, под которыми flow-действия держат вложенные списки шагов
+BLOCK_KEYS: Tuple[str, ...] = ("then", "else", "try", "on_success", "on_fail")
+# ключи со списком веток (parallel): ветка — список шагов или {name?, steps}
+BRANCH_KEYS: Tuple[str, ...] = ("branches",)
+# всё, что содержит вложенные шаги: не рендерится вместе с родительским шагом
+NESTED_KEYS: Tuple[str, ...] = BLOCK_KEYS + BRANCH_KEYS
+
+
+def iter_blocks(
+    step: Dict[str, Any],
+) -> Iterator[Tuple[Tuple[Union[str, int], ...], List[Any]]]:
+    """Вложенные списки шагов: (путь внутри шага, список)."""
+    for key in BLOCK_KEYS:
+        sub = step.get(key)
+        if isinstance(sub, list):
+            yield (key,), sub
+    for key in BRANCH_KEYS:
+        branches = step.get(key)
+        if not isinstance(branches, list):
+            continue
+        for i, br in enumerate(branches):
+            if isinstance(br, list):
+                yield (key, i), br
+            elif isinstance(br, dict) and isinstance(br.get("steps"), list):
+                yield (key, i, "steps"), br["steps"]
+
+
+class _LazyRegistry(Dict[str, Callable]):
+    """
+    dict action -> callable, который догружает модуль действия при первом
+    обращении по имени из MANIFEST.
+    """
+
+    def _load(self, name: str) -> Optional[Callable]:
+        target = MANIFEST.get(name)
+        if target is None:
+            return None
+        mod_name, func_name = target.split(":", 1)
+        mod = import_module(f"{__name__}.{mod_name}")  # @register заполнит REGISTRY
+        fn = dict.get(self, name)
+        if fn is None:
+            fn = getattr(mod, func_name)
+            dict.__setitem__(self, name, fn)
+        return fn
+
+    def __missing__(self, name: str) -> Callable:
+        fn = self._load(name)
+        if fn is None:
+            raise KeyError(name)
+        return fn
+
+    def __contains__(self, name: object) -> bool:
+        return dict.__contains__(self, name) or name in MANIFEST
+
+    def get(  # type: ignore[override]
+        self, name: str, default: Optional[Callable] = None
+    ) -> Optional[Callable]:
+        fn = dict.get(self, name)
+        if fn is None:
+            fn = self._load(name)
+        return default if fn is None else fn
+
+
+REGISTRY: Dict[str, Callable] = _LazyRegistry()
 
 
 def register(name: str):
@@ -14,9 +132,35 @@ def register(name: str):
     return deco
 
 
-# важно: импортируем модули, чтобы действия зарегистрировались
-from . import run  # noqa: E402,F401
-from . import window  # noqa: E402,F401
-from . import flow  # noqa: E402,F401
-from . import input  # noqa: E402,F401
-from . import vision  # noqa: E402,F401
+# нативные async-варианты действий для --engine async (заполняются при импорте
+# модуля действия, т.е. вместе с синхронным вариантом из REGISTRY)
+ASYNC_REGISTRY: Dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def register_async(name: str):
+    def deco(func: Callable[..., Awaitable[Any]]):
+        ASYNC_REGISTRY[name] = func
+        return func
+
+    return deco
+
+
+# клавиатура/мышь/фокус — общий ресурс: ветки parallel не должны перемешивать
+# нажатия, поэтому такие действия исполняются под одним замком
+input_lock = threading.RLock()
+
+
+def exclusive_input(func: Callable) -> Callable:
+    """Действие целиком держит input_lock (type_text, press_key, ...)."""
+
+    @wraps(func)
+    def wrapper(ctx: Any, step: Dict[str, Any]) -> Any:
+        with input_lock:
+            return func(ctx, step)
+
+    return wrapper
+
+
+def is_known_action(name: str) -> bool:
+    """Проверка имени действия по манифесту — без импорта кода действий."""
+    return name in MANIFEST or dict.__contains__(REGISTRY, name)
@@ -1,27 +1,32 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import dataclasses
 import re
-import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple, cast
 
 import cv2
-import mss
 import numpy as np
-import psutil
-import pygetwindow as gw
 
+from ..desktop import windows
+from ..utils import processes, timing
 from ..utils.timeparse import parse_duration
-from ..context import Context
-from . import register, REGISTRY
+from ..context import CancelToken, Cancelled, Context
+from . import register, register_async
 from ..vision.grab import grab_bgr
 from ..vision.match import find_template
+from ..vision.probe import probe_color_ratio, probe_pixel
+from ..vision.region import remember_hit, resolve_region
+from ..vision.templates import load_template
 
 PatternStr = re.Pattern[str]
 
 # ===================== helpers =====================
 
 
+@lru_cache(maxsize=256)
 def _re_from_expr(expr: str) -> PatternStr:
     if not isinstance(expr, str):
         raise ValueError("regex expression must be a string")
@@ -39,42 +44,11 @@ def _re_from_optional_expr(expr: Optional[str]) -> Optional[PatternStr]:
     return None if expr is None else _re_from_expr(expr)
 
 
-def _resolve_region(spec: Any, cfg: Dict[str, Any]) -> Tuple[int, int, int, int]:
-    """
-    region: None|"default"|"screen"|"window"|{left,top,width,height}
-    """
-    if spec in (None, "default"):
-        spec = (cfg.get("vision") or {}).get("default_region", "screen")
-
-    if spec == "screen":
-        with mss.mss() as sct:
-            mon = sct.monitors[0]
-            return mon["left"], mon["top"], mon["width"], mon["height"]
-
-    if spec == "window":
-        from ..utils.win_window import get_active_client_bbox
-
-        return get_active_client_bbox()
-
-    if isinstance(spec, dict):
-        return (
-            int(spec["left"]),
-            int(spec["top"]),
-            int(spec["width"]),
-            int(spec["height"]),
-        )
-
-    raise ValueError(f"Unknown region spec: {spec!r}")
-
-
 def _load_template(ctx: Context, path: str) -> np.ndarray:
-    from ..utils.paths import resolve_image_path
+    from ..plan import resolve_asset
 
-    full = resolve_image_path(path, ctx.config)
-    img = cv2.imread(str(full), cv2.IMREAD_COLOR)
-    if img is None:
-        raise FileNotFoundError(f"Template not found or unreadable: {full}")
-    return img
+    full = resolve_asset(ctx, path)
+    return load_template(full, cv2.IMREAD_COLOR)
 
 
 def _scale_range2(val: Any, cfg: Dict[str, Any]) -> Tuple[float, float]:
@@ -106,61 +80,9 @@ def _try_match(
 def _run_steps_inline(
     ctx: Context, steps: List[Dict[str, Any]], parent_name: str | None = None
 ) -> None:
-    from time import perf_counter, sleep
-
-    delay_between = (
-        parse_duration(
-            ((ctx.config.get("settings") or {}).get("defaults") or {}).get(
-                "delay_between_steps"
-            )
-        )
-        or 0.0
-    )
-
-    for idx, step in enumerate(steps, 1):
-        name = step.get("name", f"step #{idx}")
-        action = step.get("action")
-        if not action:
-            raise ValueError(f"Inline step #{idx} '{name}' has no 'action'")
+    from ..plan import run_block
 
-        title = name if not parent_name else f"{parent_name} › {name}"
-        ctx.console.rule(f"[bold]Шаг[/] — {title}  ([dim]{action}[/])")
-
-        delay_before = parse_duration(step.get("delay_before"))
-        delay_after = parse_duration(step.get("delay_after"))
-
-        announce = step.get("announce")
-        if announce:
-            ctx.console.print(announce)
-
-        if delay_before:
-            sleep(delay_before)
-
-        fn = REGISTRY.get(action)
-        if not fn:
-            raise KeyError(f"Unknown action: {action}")
-
-        t0 = perf_counter()
-        try:
-            fn(ctx, step)
-        except Exception:
-            fail_msg = step.get("fail")
-            if fail_msg:
-                ctx.console.print(f"[red]{fail_msg}[/]")
-            raise
-        dt = perf_counter() - t0
-
-        success = step.get("success")
-        if success:
-            ctx.console.print(success)
-
-        ctx.console.print(f"[green]OK[/] ({dt:.2f}s)")
-
-        if delay_after:
-            sleep(delay_after)
-
-        if delay_between > 0:
-            sleep(delay_between)
+    run_block(ctx, steps, parent_name)
 
 
 # ===================== basic actions =====================
@@ -172,19 +94,33 @@ def action_log(ctx: Context, step: Dict[str, Any]) -> None:
     ctx.console.print(msg)
 
 
+def _sleep_duration(ctx: Context, step: Dict[str, Any]) -> Optional[float]:
+    """Длительность sleep или None в dry-run (тогда уже напечатано)."""
+    duration = parse_duration(step.get("duration"))
+    if duration is None:
+        raise ValueError("sleep: 'duration' is required")
+    if ctx.dry_run:
+        ctx.console.print(f"[cyan]DRY[/] sleep: {duration:.3f}s")
+        return None
+    return duration
+
+
 @register("sleep")
 def action_sleep(ctx: Context, step: Dict[str, Any]) -> None:
     """
     params:
       duration: 100ms|2s|1m (или число секунд)
     """
-    duration = parse_duration(step.get("duration"))
-    if duration is None:
-        raise ValueError("sleep: 'duration' is required")
-    if ctx.dry_run:
-        ctx.console.print(f"[cyan]DRY[/] sleep: {duration:.3f}s")
-        return
-    time.sleep(duration)
+    duration = _sleep_duration(ctx, step)
+    if duration is not None:
+        ctx.sleep(duration)
+
+
+@register_async("sleep")
+async def action_sleep_async(ctx: Context, step: Dict[str, Any]) -> None:
+    duration = _sleep_duration(ctx, step)
+    if duration is not None:
+        await ctx.asleep(duration)
 
 
 @register("pause")
@@ -201,14 +137,14 @@ def action_pause(ctx: Context, step: Dict[str, Any]) -> None:
         return
     if timeout is not None:
         ctx.console.print(f"{msg} (продолжу через {timeout:.1f}s)")
-        time.sleep(timeout)
+        ctx.sleep(timeout)
     else:
         ctx.console.print(msg)
         try:
             input()  # блокирующая пауза в консоли
         except EOFError:
             # если ввода нет (запуск без stdin) — fallback на 3 сек
-            time.sleep(3.0)
+            ctx.sleep(3.0)
 
 
 @register("checkpoint")
@@ -227,16 +163,31 @@ def action_checkpoint(ctx: Context, step: Dict[str, Any]) -> None:
 # ===================== conditions =====================
 
 
-def _cond_image_exists(ctx: Context, spec: Dict[str, Any]) -> bool:
+def _image_cond_params(
+    ctx: Context, spec: Dict[str, Any]
+) -> Tuple[str, Tuple[int, int, int, int], float, Tuple[float, float]]:
     path = spec.get("image")
     if not path:
         raise ValueError("image_exists: 'image' is required")
-
-    region = _resolve_region(spec.get("region"), ctx.config)
+    region = resolve_region(spec.get("region"), ctx)
     threshold = float(
         spec.get("threshold", (ctx.config.get("vision") or {}).get("threshold", 0.87))
     )
     scale_range = _scale_range2(spec.get("scale_range"), ctx.config)
+    return str(path), region, threshold, scale_range
+
+
+def _probe_image_exists(ctx: Context, spec: Dict[str, Any]) -> bool:
+    """Один кадр, без ожидания — для планировщика условий."""
+    path, region, threshold, scale_range = _image_cond_params(ctx, spec)
+    hit = _try_match(ctx, region, path, threshold, scale_range)
+    if hit:
+        remember_hit(ctx, spec, path, region, hit)
+    return bool(hit)
+
+
+def _cond_image_exists(ctx: Context, spec: Dict[str, Any]) -> bool:
+    path, region, threshold, scale_range = _image_cond_params(ctx, spec)
     timeout = (
         parse_duration(spec.get("timeout"))
         or parse_duration((ctx.config.get("run") or {}).get("timeout"))
@@ -248,17 +199,16 @@ def _cond_image_exists(ctx: Context, spec: Dict[str, Any]) -> bool:
         or 0.4
     )
 
-    deadline = time.time() + timeout
     best = 0.0
-    while time.time() < deadline:
+    for _ in ctx.ticks(retry_delay, timeout):
         hit = _try_match(ctx, region, path, threshold, scale_range)
         if hit:
+            remember_hit(ctx, spec, path, region, hit)
             return True
         # подсмотрим лучший скор (без порога)
         probe = _try_match(ctx, region, path, 0.0, scale_range)
         if probe:
             best = max(best, float(probe["score"]))
-        time.sleep(retry_delay)
 
     ctx.console.print(f"[dim]image_exists: best={best:.3f} < thr={threshold:.2f}[/dim]")
     return False
@@ -271,29 +221,15 @@ def _cond_window_exists(ctx: Context, spec: Dict[str, Any]) -> bool:
     if title_rx is None and class_rx is None:
         raise ValueError("window_exists: 'title' or 'class' is required")
 
-    for w in gw.getAllWindows():
-        # гарантируем именно str
-        title: str = cast(str, (getattr(w, "title", "") or ""))
-
-        if title_rx is not None:
-            if cast(PatternStr, title_rx).search(title) is None:
-                continue
-
-        if class_rx is not None:
-            cls = ""
-            try:
-                import win32gui  # type: ignore
-
-                cls = win32gui.GetClassName(int(w._hWnd))  # noqa: SLF001
-            except Exception:
-                cls = ""
-            cls = cast(str, (cls or ""))
-            if cast(PatternStr, class_rx).search(cls) is None:
-                continue
-
+    def _match(info: Tuple[int, str, str]) -> bool:
+        _, title, cls = info
+        if title_rx is not None and cast(PatternStr, title_rx).search(title) is None:
+            return False
+        if class_rx is not None and cast(PatternStr, class_rx).search(cls) is None:
+            return False
         return True
 
-    return False
+    return windows.find(_match, windows.ttl_for(ctx.config)) is not None
 
 
 def _cond_process_exists(ctx: Context, spec: Dict[str, Any]) -> bool:
@@ -303,27 +239,17 @@ def _cond_process_exists(ctx: Context, spec: Dict[str, Any]) -> bool:
     if pid_obj is None and not name_expr:
         raise ValueError("process_exists: 'pid' or 'name' is required")
 
+    # общий снимок таблицы процессов на прогон (utils.processes)
+    max_age = processes.interval_for(ctx.config)
     if pid_obj is not None:
-        try:
-            p = psutil.Process(int(pid_obj))
-            return p.is_running()
-        except Exception:
-            return False
+        return processes.alive(int(pid_obj), max_age)
 
     # имя процесса по regex
     assert name_expr is not None
-    name_re = _re_from_expr(name_expr)
-    for p in psutil.process_iter(["name"]):
-        try:
-            nm: str = cast(str, (p.info.get("name") or ""))
-        except Exception:
-            nm = ""
-        if name_re.search(nm) is not None:
-            return True
-    return False
+    return bool(processes.find(_re_from_expr(name_expr), max_age))
 
 
-def _eval_condition(ctx: Context, cond: Dict[str, Any]) -> bool:
+def _eval_leaf(ctx: Context, cond: Dict[str, Any]) -> bool:
     kind = (cond.get("type") or "").strip()
     if kind == "image_exists":
         return _cond_image_exists(ctx, cond)
@@ -331,6 +257,30 @@ def _eval_condition(ctx: Context, cond: Dict[str, Any]) -> bool:
         return _cond_window_exists(ctx, cond)
     if kind == "process_exists":
         return _cond_process_exists(ctx, cond)
+    if kind == "output_matches":
+        from .process import output_matches
+
+        return output_matches(ctx, cond)
+    if kind == "file_exists":
+        from .fs import cond_file_exists
+
+        return cond_file_exists(ctx, cond)
+    if kind == "file_stable":
+        from .fs import cond_file_stable
+
+        return cond_file_stable(ctx, cond)
+    if kind == "port_open":
+        from .net import cond_port_open
+
+        return cond_port_open(ctx, cond)
+    if kind == "http_ok":
+        from .net import cond_http_ok
+
+        return cond_http_ok(ctx, cond)
+    if kind == "pixel_is":
+        return probe_pixel(ctx, cond)[0]
+    if kind == "color_ratio":
+        return probe_color_ratio(ctx, cond)[0]
     if kind == "attempts_ge":
         cid = str(cond.get("counter_id") or "")
         if not cid:
@@ -343,6 +293,175 @@ def _eval_condition(ctx: Context, cond: Dict[str, Any]) -> bool:
     raise ValueError(f"unknown condition type: {kind!r}")
 
 
+def _probe_leaf(ctx: Context, cond: Dict[str, Any]) -> bool:
+    """Одиночная проверка: image_exists — один кадр, остальные и так мгновенные."""
+    if (cond.get("type") or "").strip() == "image_exists":
+        return _probe_image_exists(ctx, cond)
+    return _eval_leaf(ctx, cond)
+
+
+# ===================== condition scheduler =====================
+
+# априорная цена одной проверки (сек), пока в прогоне нет своих замеров
+_COST_PRIOR: Dict[str, float] = {
+    "attempts_ge": 1e-6,
+    "output_matches": 0.0005,
+    "file_exists": 0.0005,
+    "file_stable": 0.0005,
+    "pixel_is": 0.004,
+    "window_exists": 0.005,
+    "color_ratio": 0.008,
+    "port_open": 0.002,
+    "process_exists": 0.005,  # обычно попадание в снимок utils.processes
+    "http_ok": 0.02,
+    "image_exists": 0.06,
+}
+_COST_ALPHA = 0.3  # вес нового замера в EWMA
+# интервал опроса условия ~ cost * _POLL_FACTOR (≈10% времени на проверку)
+_POLL_FACTOR = 10.0
+_POLL_MIN, _POLL_MAX = 0.02, 1.0
+
+
+_GROUP_KEYS = ("any", "all", "not")
+
+
+def _group_kind(cond: Dict[str, Any]) -> Optional[str]:
+    """any/all/not — если условие составное, иначе None."""
+    if "type" in cond:
+        return None
+    for key in _GROUP_KEYS:
+        if key in cond:
+            return key
+    return None
+
+
+def _group_members(cond: Dict[str, Any], kind: str) -> List[Dict[str, Any]]:
+    subs = cond.get(kind)
+    if kind == "not":
+        subs = [subs]
+    if not isinstance(subs, list) or not all(isinstance(c, dict) for c in subs):
+        raise ValueError(f"{kind}: expected a condition or a list of conditions")
+    return cast(List[Dict[str, Any]], subs)
+
+
+def _cond_label(cond: Dict[str, Any]) -> str:
+    kind = _group_kind(cond)
+    if kind is not None:
+        return str(cond.get("id") or kind)
+    kind = str(cond.get("type") or "?")
+    what = (
+        cond.get("id")
+        or cond.get("image")
+        or cond.get("title")
+        or cond.get("name")
+        or cond.get("pid")
+        or cond.get("counter_id")
+    )
+    return f"{kind}({what})" if what else kind
+
+
+def _cond_cost(ctx: Context, cond: Dict[str, Any]) -> float:
+    """
+    Оценка цены одиночной проверки: замер этого прогона или априорная.
+    Для any/all — худший случай (проверены все), для not — цена операнда.
+    """
+    kind = _group_kind(cond)
+    if kind is not None:
+        return sum(_cond_cost(ctx, c) for c in _group_members(cond, kind))
+    got = ctx.costs.get(_cond_label(cond))
+    if got is not None:
+        return got
+    return _COST_PRIOR.get(str(cond.get("type") or ""), 0.01)
+
+
+def _probe_condition(ctx: Context, cond: Dict[str, Any]) -> bool:
+    """
+    Одиночная проверка с замером цены (EWMA в ctx.costs). Операнды any/all
+    проверяются от дешёвых к дорогим с коротким замыканием: дорогой
+    image_exists не снимает экран, если дешёвая проверка уже всё решила.
+    """
+    kind = _group_kind(cond)
+    if kind is not None:
+        subs = sorted(_group_members(cond, kind), key=lambda c: _cond_cost(ctx, c))
+        if kind == "any":
+            return any(_probe_condition(ctx, c) for c in subs)
+        if kind == "all":
+            return all(_probe_condition(ctx, c) for c in subs)
+        return not _probe_condition(ctx, subs[0])
+    t0 = timing.now()
+    ok = _probe_leaf(ctx, cond)
+    dt = timing.now() - t0
+    key = _cond_label(cond)
+    prev = ctx.costs.get(key)
+    ctx.costs[key] = dt if prev is None else prev + _COST_ALPHA * (dt - prev)
+    return ok
+
+
+def _poll_interval(ctx: Context, cond: Dict[str, Any]) -> float:
+    explicit = parse_duration(cond.get("poll"))
+    if explicit is not None:
+        return explicit
+    return min(_POLL_MAX, max(_POLL_MIN, _cond_cost(ctx, cond) * _POLL_FACTOR))
+
+
+def _race(
+    ctx: Context, conds: List[Dict[str, Any]], timeout: float, title: str
+) -> Optional[int]:
+    """
+    Гонка условий в одном цикле с общим дедлайном. У каждого условия свой
+    интервал опроса (по цене), дешёвые проверяются первыми. Возвращает
+    индекс сработавшего условия или None по дедлайну (timeout=0 — один проход).
+    """
+    if not conds:
+        raise ValueError(f"{title}: at least one condition is required")
+    t0 = timing.now()
+    deadline = t0 + timeout
+    due = [t0] * len(conds)
+    while True:
+        now = timing.now()
+        ready = [i for i in range(len(conds)) if due[i] <= now]
+        for i in sorted(ready, key=lambda i: _cond_cost(ctx, conds[i])):
+            if _probe_condition(ctx, conds[i]):
+                dt = timing.now() - t0
+                label = _cond_label(conds[i])
+                ctx.state["condition:fired"] = {
+                    "index": i + 1,
+                    "id": label,
+                    "type": conds[i].get("type") or _group_kind(conds[i]),
+                    "elapsed": dt,
+                }
+                ctx.console.print(
+                    f"[cyan]{title}[/]: #{i + 1} {label} fired ({dt:.2f}s)"
+                )
+                return i
+            # фиксированная частота: время проверки входит в интервал
+            every = _poll_interval(ctx, conds[i])
+            now = timing.now()
+            due[i] = due[i] + every if due[i] + every > now else now + every
+        if timing.now() >= deadline:
+            return None
+        if timing.sleep_until(min(min(due), deadline), ctx.cancel):
+            raise Cancelled("cancelled")
+
+
+def _eval_condition(ctx: Context, cond: Dict[str, Any]) -> bool:
+    """
+    Условие if/repeat_until:
+      - одиночное ({type: ...}; image_exists ждёт свой timeout);
+      - {any: [...], timeout?} — гонка операндов с общим дедлайном;
+      - {all: [...], timeout?} / {not: {...}, timeout?} — одиночные проверки
+        операндов (дешёвые первыми), с timeout — опрос до истинности.
+    Без timeout составное условие проверяется один раз.
+    """
+    kind = _group_kind(cond)
+    if kind is None:
+        return _eval_leaf(ctx, cond)
+    timeout = parse_duration(cond.get("timeout")) or 0.0
+    if kind == "any":
+        return _race(ctx, _group_members(cond, kind), timeout, kind) is not None
+    return _race(ctx, [cond], timeout, kind) is not None
+
+
 # ===================== flow actions =====================
 
 
@@ -353,7 +472,7 @@ def _do_if_like(ctx: Context, step: Dict[str, Any]) -> None:
     branch = "then" if ok else "else"
     substeps: List[Dict[str, Any]] = cast(List[Dict[str, Any]], step.get(branch) or [])
     ctx.console.print(
-        f"[cyan]if[/]: {cond.get('type')} → {'[green]TRUE[/]' if ok else '[red]FALSE[/]'} ({len(substeps)} steps)"
+        f"[cyan]if[/]: {_cond_label(cond)} → {'[green]TRUE[/]' if ok else '[red]FALSE[/]'} ({len(substeps)} steps)"
     )
     if not substeps:
         return
@@ -414,9 +533,11 @@ def action_repeat_until(ctx: Context, step: Dict[str, Any]) -> None:
             f"[dim]repeat_until[/] attempt {attempt}/{max_attempts} (counter_id={cid})"
         )
 
-        # ВАЖНО: try-блок не должен ронять весь repeat
+        # ВАЖНО: try-блок не должен ронять весь repeat (но отмену пропускаем)
         try:
             _run_steps_inline(ctx, tries, parent_name=step.get("name") or "repeat")
+        except Cancelled:
+            raise
         except Exception as e:
             ctx.console.print(f"[dim]repeat_until: try-block error: {e}[/dim]")
 
@@ -425,13 +546,210 @@ def action_repeat_until(ctx: Context, step: Dict[str, Any]) -> None:
             ctx.console.print(
                 f"[green]repeat_until: success on attempt {attempt}[/green]"
             )
-            for sub in cast(List[Dict[str, Any]], step.get("on_success") or []):
-                _run_steps_inline(ctx, [sub], parent_name=step.get("name") or "repeat")
+            on_success = cast(List[Dict[str, Any]], step.get("on_success") or [])
+            if on_success:
+                _run_steps_inline(
+                    ctx, on_success, parent_name=step.get("name") or "repeat"
+                )
             return
 
         if attempt < max_attempts and delay_between > 0:
-            time.sleep(delay_between)
+            ctx.sleep(delay_between)
 
     ctx.console.print(f"[red]repeat_until: failed after {max_attempts} attempts[/red]")
-    for sub in cast(List[Dict[str, Any]], step.get("on_fail") or []):
-        _run_steps_inline(ctx, [sub], parent_name=step.get("name") or "repeat")
+    on_fail = cast(List[Dict[str, Any]], step.get("on_fail") or [])
+    if on_fail:
+        _run_steps_inline(ctx, on_fail, parent_name=step.get("name") or "repeat")
+
+
+@register("wait_any")
+def action_wait_any(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Ждёт первое сработавшее из условий (один цикл, общий дедлайн).
+    params:
+      conditions: [условие, ...]  (у условия можно задать id и poll)
+      timeout?: duration (по умолчанию run.timeout или 10s)
+    Сработавшее условие — в логе и в ctx.state["condition:fired"].
+    """
+    conds = step.get("conditions")
+    if not isinstance(conds, list) or not conds:
+        raise ValueError("wait_any: 'conditions' must be a non-empty list")
+    timeout = (
+        parse_duration(step.get("timeout"))
+        or parse_duration((ctx.config.get("run") or {}).get("timeout"))
+        or 10.0
+    )
+    if ctx.dry_run:
+        labels = ", ".join(_cond_label(c) for c in conds)
+        ctx.console.print(f"[cyan]DRY[/] wait_any: [{labels}] timeout={timeout:.1f}s")
+        return
+    if _race(ctx, conds, timeout, "wait_any") is None:
+        raise TimeoutError(
+            f"wait_any: none of {len(conds)} conditions fired within {timeout:.1f}s"
+        )
+
+
+_JOIN_POLICIES = ("all", "any", "first_success")
+
+
+def _parallel_branches(
+    step: Dict[str, Any], default_timeout: Optional[float]
+) -> List[Tuple[str, List[Dict[str, Any]], Optional[float]]]:
+    """branches -> [(имя, шаги, таймаут)]; ветка — список шагов или {name?, steps}."""
+    raw = step.get("branches")
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("parallel: 'branches' must be a non-empty list")
+    out = []
+    for i, br in enumerate(raw, 1):
+        if isinstance(br, list):
+            out.append((f"branch {i}", br, default_timeout))
+        elif isinstance(br, dict) and isinstance(br.get("steps"), list):
+            t = parse_duration(br.get("timeout"))
+            name = str(br.get("name") or f"branch {i}")
+            out.append((name, br["steps"], default_timeout if t is None else t))
+        else:
+            raise ValueError(
+                f"parallel: branch #{i} must be a list or {{steps: [...]}}"
+            )
+    return out
+
+
+@register("parallel")
+def action_parallel(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Исполняет ветки одновременно, по потоку на ветку.
+    params:
+      branches: [[шаги...], {name?, timeout?, steps: [...]}, ...]
+      join?: all (по умолчанию) | any | first_success
+      timeout?: duration — на каждую ветку (ветка может задать свой)
+    all           — нужны все ветки; первая ошибка отменяет остальные;
+    any           — решает первая завершившаяся ветка (успех или ошибка);
+    first_success — первая успешная ветка; ошибка, только если упали все.
+    Отмена кооперативная: ветка останавливается на границе шага или в
+    ожидании (ctx.sleep). Действия ввода сериализуются через input_lock.
+    """
+    join = str(step.get("join") or "all").strip().lower()
+    if join not in _JOIN_POLICIES:
+        raise ValueError(
+            f"parallel: join must be one of {_JOIN_POLICIES}, got {join!r}"
+        )
+    branches = _parallel_branches(step, parse_duration(step.get("timeout")))
+    title = step.get("name") or "parallel"
+
+    # state и plan общие, токен отмены — свой у каждой ветки
+    children = [
+        dataclasses.replace(ctx, cancel=CancelToken(ctx.cancel)) for _ in branches
+    ]
+
+    started = timing.now()
+    took: Dict[int, float] = {}  # длительность ветки по её собственным часам
+
+    def _branch(i: int) -> float:
+        name, steps, _ = branches[i]
+        # своя линия времени от момента форка (важно для виртуальных часов)
+        with timing.branch(started):
+            try:
+                _run_steps_inline(children[i], steps, parent_name=f"{title} › {name}")
+            finally:
+                took[i] = timing.now() - started
+        return took[i]
+
+    pool = ThreadPoolExecutor(max_workers=len(branches), thread_name_prefix="parallel")
+    futures: Dict[Future, int] = {
+        pool.submit(_branch, i): i for i in range(len(branches))
+    }
+    deadlines = {
+        f: started + t if t is not None else None
+        for f, (_, _, t) in zip(futures, branches)
+    }
+    pending = set(futures)
+    failures: List[Tuple[int, BaseException]] = []
+    winner: Optional[int] = None
+    span = 0.0  # сколько длился блок по часам веток (для виртуальных часов)
+    simulated = timing.clock().simulated
+
+    def _timed_out(i: int) -> None:
+        nonlocal span
+        children[i].cancel.cancel()
+        limit = branches[i][2] or 0.0
+        span = max(span, limit)
+        failures.append((i, TimeoutError(f"timed out after {limit:.1f}s")))
+        ctx.console.print(f"[red]parallel[/]: {branches[i][0]} — timeout")
+
+    try:
+        while pending:
+            now = timing.now()
+            for f in [f for f in pending if (deadlines[f] or float("inf")) <= now]:
+                pending.discard(f)
+                _timed_out(futures[f])
+            if _parallel_decided(join, pending, failures, winner):
+                break
+            if simulated:
+                # виртуальные ветки не ждут по-настоящему: дожидаемся всех
+                # и решаем по их собственному времени, а не по реальному
+                done, _ = wait(pending)
+            else:
+                limits = [d for d in (deadlines[f] for f in pending) if d]
+                done, _ = wait(
+                    pending,
+                    timeout=max(0.0, min(limits) - now) if limits else None,
+                    return_when=FIRST_COMPLETED,
+                )
+            for f in sorted(done, key=lambda f: took[futures[f]]):
+                i = futures[f]
+                pending.discard(f)
+                limit = branches[i][2]
+                err = f.exception()
+                if limit is not None and took[i] > limit:
+                    _timed_out(i)  # закончила, но позже своего дедлайна
+                elif err is None:
+                    span = max(span, took[i])
+                    ctx.console.print(
+                        f"[green]parallel[/]: {branches[i][0]} — OK ({took[i]:.2f}s)"
+                    )
+                    if winner is None:
+                        winner = i
+                else:
+                    span = max(span, took[i])
+                    failures.append((i, err))
+                    ctx.console.print(f"[red]parallel[/]: {branches[i][0]} — {err}")
+                if _parallel_decided(join, pending, failures, winner):
+                    break
+            if _parallel_decided(join, pending, failures, winner):
+                break
+    finally:
+        # проигравшие ветки доработают текущее действие и остановятся сами
+        for f in pending:
+            children[futures[f]].cancel.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+        for c in children:
+            c.cancel.detach()
+
+    ctx.check_cancelled()
+    timing.advance_to(started + span)
+    elapsed = timing.now() - started
+    if join == "first_success" and winner is not None:
+        ctx.console.print(
+            f"[cyan]parallel[/]: first_success → {branches[winner][0]} ({elapsed:.2f}s)"
+        )
+        return
+    if failures and (join != "any" or winner is None):
+        i, err = failures[0]
+        name = branches[i][0]
+        raise RuntimeError(f"parallel: branch '{name}' failed: {err}") from err
+    ctx.console.print(f"[cyan]parallel[/]: join={join} done ({elapsed:.2f}s)")
+
+
+def _parallel_decided(
+    join: str,
+    pending: Any,
+    failures: List[Tuple[int, BaseException]],
+    winner: Optional[int],
+) -> bool:
+    if not pending:
+        return True
+    if join == "all":
+        return bool(failures)
+    if join == "any":
+        return winner is not None or bool(failures)
+    return winner is not None  # first_success
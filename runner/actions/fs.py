@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..context import Context
+from ..utils import timing
+from ..utils.timeparse import parse_duration
+from ..watch import ChangeHub, Stamp, change_hub, file_stamp
+from . import register
+
+# как часто ожидание перепроверяет файл без событий: отмена, таймаут и
+# fallback на случай, когда каталога ещё нет (наблюдать нечего)
+_RECHECK = 0.25
+# file_stable/wait_file.stable: сколько размер и mtime не должны меняться
+_DEFAULT_STABLE = 1.0
+
+
+def _file_path(spec: Dict[str, Any], what: str) -> Path:
+    raw = spec.get("path")
+    if not raw:
+        raise ValueError(f"{what}: 'path' is required")
+    # abspath, а не resolve(): события приходят по пути каталога как есть
+    return Path(os.path.abspath(os.path.expanduser(str(raw))))
+
+
+def _stable_for(spec: Dict[str, Any], key: str) -> float:
+    raw = spec.get(key)
+    if raw is True:
+        return _DEFAULT_STABLE
+    dur = parse_duration(raw)
+    return _DEFAULT_STABLE if dur is None else dur
+
+
+def cond_file_exists(ctx: Context, spec: Dict[str, Any]) -> bool:
+    """Условие file_exists: один stat(), без ожидания."""
+    return _file_path(spec, "file_exists").exists()
+
+
+def cond_file_stable(ctx: Context, spec: Dict[str, Any]) -> bool:
+    """
+    Условие file_stable: файл есть, и его размер/mtime не менялись
+    stable_for (default 1s). Между проверками помнит последний stat
+    в ctx.state["file:stamp:<path>"] — условие копит «тишину» за опросы.
+    """
+    path = _file_path(spec, "file_stable")
+    stable_for = _stable_for(spec, "stable_for")
+    key = f"file:stamp:{path}"
+    st = file_stamp(path)
+    now = timing.now()
+    prev: Optional[Tuple[Stamp, float]] = ctx.state.get(key)
+    if st is None:
+        ctx.state.pop(key, None)
+        return False
+    if prev is None or prev[0] != st:
+        ctx.state[key] = (st, now)
+        return stable_for <= 0
+    return now - prev[1] >= stable_for
+
+
+@register("wait_file")
+def wait_file(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Ждёт появления (exists: true) или исчезновения (exists: false) файла.
+    Ожидание по событиям ОС (inotify / ReadDirectoryChangesW, см. watch.py):
+    шаг просыпается, как только файл создан или изменён, и не тратит CPU
+    в ожидании; без событий — перепроверка раз в 250 мс (заодно ставится
+    наблюдение, если каталога файла при старте ещё не было).
+
+    params:
+      path: str
+      exists?: bool (default: true)
+      stable?: duration | true — ещё и дождаться, пока размер и mtime
+        не меняются столько времени (true — 1s): файл дописан
+      timeout?: duration (default: run.timeout | 20s)
+    """
+    path = _file_path(step, "wait_file")
+    exists = bool(step.get("exists", True))
+    stable = _stable_for(step, "stable") if step.get("stable") else None
+    if stable is not None and not exists:
+        raise ValueError("wait_file: 'stable' needs exists: true")
+    timeout = ctx.step_timeout(step, 20.0)
+
+    verb = "появление" if exists else "исчезновение"
+    ctx.console.print(f"Жду {verb} файла {path} (до {timeout:.1f}s)...")
+    hub = change_hub()
+    live = hub.watch(path)
+    try:
+        dt = _wait_file(ctx, hub, path, exists, stable, timeout, live)
+    finally:
+        hub.unwatch(path)
+    ctx.state["file:last"] = str(path)
+    done = "есть" if exists else "исчез"
+    ctx.console.print(f"Файл {done} за {dt:.2f}s: {path}")
+
+
+def _wait_file(
+    ctx: Context,
+    hub: ChangeHub,
+    path: Path,
+    exists: bool,
+    stable: Optional[float],
+    timeout: float,
+    live: bool,
+) -> float:
+    """Цикл ожидания wait_file; возвращает, сколько ждали."""
+    t0 = timing.now()
+    deadline = t0 + timeout
+    last: Optional[Stamp] = None
+    quiet_since = t0
+    while True:
+        ctx.check_cancelled()
+        if not live:
+            # каталога не было — наблюдение ставится, как только он появится
+            live = hub.retry(path)
+        gen = hub.generation(path)
+        st = file_stamp(path)
+        now = timing.now()
+        nap = _RECHECK
+        if (st is not None) == exists:
+            if stable is None:
+                break
+            if st != last:
+                last, quiet_since = st, now
+            left = stable - (now - quiet_since)
+            if left <= 0:
+                break
+            nap = min(nap, left)
+        if now >= deadline:
+            state = "не появился" if exists else "не исчез"
+            if stable is not None and last is not None:
+                state = "не перестал меняться"
+            raise TimeoutError(f"wait_file: файл {path} {state} за {timeout:.1f}s")
+        # событие по файлу будит сразу; без него — перепроверка по таймеру
+        ctx.wait_event(lambda s: hub.wait(path, gen, s), min(nap, deadline - now))
+
+    return timing.now() - t0
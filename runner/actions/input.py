@@ -3,16 +3,13 @@ from __future__ import annotations
 
 import random
 import sys
-import time
 from typing import Any, Dict, List, Optional
 
-import pyautogui as pag
-import pyperclip
-
+from .. import desktop
+from ..utils import timing
 from ..utils.timeparse import parse_duration
 from ..context import Context
-from ..utils.win_unicode import send_unicode_text, send_unicode_char
-from . import register
+from . import exclusive_input, register
 
 
 def _keys_list(val: Any) -> List[str]:
@@ -105,6 +102,7 @@ def _backend_for_text(step: Dict[str, Any], text: str) -> str:
 
 
 @register("type_text")
+@exclusive_input
 def type_text(ctx: Context, step: Dict[str, Any]) -> None:
     """
     params:
@@ -158,13 +156,13 @@ def type_text(ctx: Context, step: Dict[str, Any]) -> None:
             )
         return
 
-    pag.FAILSAFE = False
+    desk = desktop.current()
 
     def _type_char(ch: str) -> None:
         if backend == "pyautogui":
-            pag.write(ch)
+            desk.write(ch)
         elif backend == "win_unicode":
-            send_unicode_char(ch)
+            desk.send_unicode(ch)
         elif backend == "clipboard":
             raise RuntimeError("clipboard backend does not support char-by-char typing")
 
@@ -221,45 +219,46 @@ def type_text(ctx: Context, step: Dict[str, Any]) -> None:
         # небольшая стартовая пауза (как будто человек «перехватил» фокус)
         sp = h.get("start_pause_ms")
         if isinstance(sp, (list, tuple)) and len(sp) == 2:
-            time.sleep(_rand_ms(float(sp[0]), float(sp[1])))
+            timing.sleep(_rand_ms(float(sp[0]), float(sp[1])))
 
         for ch in text:
             wrong = _maybe_mistype_and_fix(ch, h, backend)
             if wrong:
                 _type_char(wrong)
-                time.sleep(_rand_ms(40.0, 90.0))
-                pag.press("backspace")
+                timing.sleep(_rand_ms(40.0, 90.0))
+                desk.press("backspace")
 
             _type_char(ch)
-            time.sleep(_human_delay_for_char(ch, h))
+            timing.sleep(_human_delay_for_char(ch, h))
         return
 
     # ДЕТЕРМИНИРОВАННЫЙ РЕЖИМ
     if backend == "win_unicode":
-        send_unicode_text(text, per_char_delay=base_delay or 0.0)
+        desk.send_unicode(text, per_char_delay=base_delay or 0.0)
     elif backend == "pyautogui":
         for ch in text:
-            pag.write(ch)
+            desk.write(ch)
             if base_delay:
-                time.sleep(base_delay)
+                timing.sleep(base_delay)
     else:
         prev = None
         try:
             try:
-                prev = pyperclip.paste()
+                prev = desk.clipboard_get()
             except Exception:
                 prev = None
-            pyperclip.copy(text)
-            pag.hotkey("ctrl", "v")
+            desk.clipboard_set(text)
+            desk.hotkey("ctrl", "v")
         finally:
             if prev is not None:
                 try:
-                    pyperclip.copy(prev)
+                    desk.clipboard_set(prev)
                 except Exception:
                     pass
 
 
 @register("press_key")
+@exclusive_input
 def press_key(ctx: Context, step: Dict[str, Any]) -> None:
     key = step.get("key")
     hot = step.get("hotkey")
@@ -273,8 +272,7 @@ def press_key(ctx: Context, step: Dict[str, Any]) -> None:
             ctx.console.print(f"[cyan]DRY[/] key: {key}")
         return
 
-    pag.FAILSAFE = False
     if hot is not None:
-        pag.hotkey(*_keys_list(hot))
+        desktop.current().hotkey(*_keys_list(hot))
     else:
-        pag.press(str(key))
+        desktop.current().press(str(key))
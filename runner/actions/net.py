@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import errno
+import http.client
+import select
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
+from urllib.parse import urlsplit
+
+from ..context import Context
+from ..utils import timing
+from ..utils.timeparse import parse_duration
+from . import register
+from .window import _parse_regex
+
+# опрос с экспоненциальной паузой: сервис обычно готов быстро, а если нет —
+# не долбим его запросами (20ms, 40ms, ... до poll_max)
+_BACKOFF_START = 0.02
+_BACKOFF_MAX = 0.5
+# одна попытка не дольше этого (и не дольше остатка таймаута)
+_ATTEMPT_MAX = 1.0
+# тело ответа для проверки regex читается не больше чем на столько байт
+_BODY_LIMIT = 64 * 1024
+
+
+def _connect(host: str, port: int, timeout: float) -> Optional[str]:
+    """
+    Неблокирующий connect ко всем адресам host (localhost — и ::1, и
+    127.0.0.1). None — соединение установлено, иначе — текст ошибки.
+    """
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        return str(e)
+    socks: List[socket.socket] = []
+    err = "connection refused"
+    try:
+        for family, kind, proto, _, addr in infos:
+            s = socket.socket(family, kind, proto)
+            s.setblocking(False)
+            code = s.connect_ex(addr)
+            if code == 0:
+                s.close()
+                return None
+            if code in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                socks.append(s)
+            else:
+                err = errno.errorcode.get(code, str(code))
+                s.close()
+        if not socks:
+            return err
+        # ждём все адреса разом: ответит первым тот, где сервис слушает
+        # (Windows сообщает об отказе через exceptfds, а не writefds)
+        pending = list(socks)
+        end = time.monotonic() + timeout
+        while pending:
+            left = end - time.monotonic()
+            if left <= 0:
+                return "timed out"
+            _, ready, failed = select.select([], pending, pending, left)
+            for s in set(ready) | set(failed):
+                code = s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if code == 0 and s in ready:
+                    return None
+                err = errno.errorcode.get(code, str(code))
+                pending.remove(s)
+        return err
+    finally:
+        for s in socks:
+            s.close()
+
+
+def _resolve_port(spec: Dict[str, Any], what: str) -> Tuple[str, int]:
+    port = spec.get("port")
+    if port is None:
+        raise ValueError(f"{what}: 'port' is required")
+    return str(spec.get("host") or "127.0.0.1"), int(cast(Any, port))
+
+
+def _statuses(spec: Dict[str, Any]) -> Optional[List[int]]:
+    raw = spec.get("status")
+    if raw is None:
+        return None  # любой 2xx/3xx
+    return [int(x) for x in (raw if isinstance(raw, list) else [raw])]
+
+
+def _get(url: str, timeout: float) -> Tuple[int, str]:
+    """GET url: (статус, начало тела). Ошибки соединения — исключения OSError."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"wait_http: unsupported url {url!r}")
+    conn_cls = (
+        http.client.HTTPSConnection
+        if parts.scheme == "https"
+        else http.client.HTTPConnection
+    )
+    conn = conn_cls(parts.hostname, parts.port, timeout=timeout)
+    try:
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        conn.request("GET", path, headers={"Connection": "close"})
+        resp = conn.getresponse()
+        body = resp.read(_BODY_LIMIT)
+        charset = resp.headers.get_content_charset() or "utf-8"
+        return resp.status, body.decode(charset, errors="replace")
+    finally:
+        conn.close()
+
+
+def _http_check(spec: Dict[str, Any], timeout: float) -> Tuple[bool, str, int]:
+    """Одна проверка wait_http/http_ok: (готов, пояснение, статус или 0)."""
+    url = spec.get("url")
+    if not url:
+        raise ValueError("wait_http: 'url' is required")
+    try:
+        status, body = _get(str(url), timeout)
+    except (OSError, http.client.HTTPException) as e:
+        return False, str(e) or type(e).__name__, 0
+    expected = _statuses(spec)
+    if expected is None and not 200 <= status < 400:
+        return False, f"HTTP {status}", status
+    if expected is not None and status not in expected:
+        return False, f"HTTP {status}, expected {expected}", status
+    body_expr = spec.get("body")
+    if body_expr and _parse_regex(str(body_expr)).search(body) is None:
+        return False, f"HTTP {status}, body does not match '{body_expr}'", status
+    return True, f"HTTP {status}", status
+
+
+def cond_port_open(ctx: Context, spec: Dict[str, Any]) -> bool:
+    """Условие port_open: одна попытка TCP connect."""
+    host, port = _resolve_port(spec, "port_open")
+    limit = parse_duration(spec.get("connect_timeout")) or _ATTEMPT_MAX
+    return _connect(host, port, limit) is None
+
+
+def cond_http_ok(ctx: Context, spec: Dict[str, Any]) -> bool:
+    """Условие http_ok: один GET с проверкой статуса и тела."""
+    limit = parse_duration(spec.get("connect_timeout")) or _ATTEMPT_MAX
+    return _http_check(spec, limit)[0]
+
+
+def _poll(
+    ctx: Context,
+    step: Dict[str, Any],
+    what: str,
+    target: str,
+    probe: Callable[[float], Tuple[bool, str]],
+) -> Tuple[float, str]:
+    """
+    Повторяет probe(attempt_timeout) -> (ok, detail) с экспоненциальной
+    паузой до успеха или таймаута шага; возвращает (время, detail).
+    """
+    timeout = ctx.step_timeout(step, 20.0)
+    poll_max = parse_duration(step.get("poll_max")) or _BACKOFF_MAX
+    ctx.console.print(f"Жду {target} (до {timeout:.1f}s)...")
+
+    t0 = timing.now()
+    deadline = t0 + timeout
+    delay = _BACKOFF_START
+    attempts = 0
+    while True:
+        ctx.check_cancelled()
+        left = deadline - timing.now()
+        ok, detail = probe(max(0.05, min(_ATTEMPT_MAX, left)))
+        attempts += 1
+        if ok:
+            dt = timing.now() - t0
+            ctx.console.print(f"Готово: {target} за {dt:.2f}s (попыток: {attempts})")
+            return dt, detail
+        left = deadline - timing.now()
+        if left <= 0:
+            raise TimeoutError(
+                f"{what}: {target} not ready in {timeout:.1f}s "
+                f"({attempts} attempts, last: {detail})"
+            )
+        ctx.sleep(min(delay, left))
+        delay = min(delay * 2, poll_max)
+
+
+@register("wait_port")
+def wait_port(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Ждёт, пока на порту примут TCP-соединение (сервис, отладочный порт
+    Electron/Chrome) — вместо sleep «на глаз».
+
+    params:
+      port: int
+      host?: str (default: 127.0.0.1; localhost — все его адреса)
+      timeout?: duration (default: run.timeout | 20s)
+      poll_max?: duration — предел паузы между попытками (default: 500ms)
+    """
+    host, port = _resolve_port(step, "wait_port")
+
+    def _probe(limit: float) -> Tuple[bool, str]:
+        err = _connect(host, port, limit)
+        return err is None, err or "connected"
+
+    _poll(ctx, step, "wait_port", f"порт {host}:{port}", _probe)
+
+
+@register("wait_http")
+def wait_http(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Ждёт, пока GET на локальный URL вернёт нужный ответ (health check).
+
+    params:
+      url: str (http/https)
+      status?: int | [int] (default: любой 2xx/3xx)
+      body?: regex '/.../i' или строка — должна найтись в начале тела (64 КБ)
+      timeout?: duration (default: run.timeout | 20s)
+      poll_max?: duration — предел паузы между попытками (default: 500ms)
+    Итог: ctx.state["http:status"].
+    """
+    if not step.get("url"):
+        raise ValueError("wait_http: 'url' is required")
+    last = {"status": 0}
+
+    def _probe(limit: float) -> Tuple[bool, str]:
+        ok, detail, status = _http_check(step, limit)
+        last["status"] = status
+        return ok, detail
+
+    _poll(ctx, step, "wait_http", str(step.get("url")), _probe)
+    ctx.state["http:status"] = last["status"]
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..context import Context
+from ..utils import outputs, processes, timing
+from ..utils.timeparse import parse_duration
+from . import register
+from .run import LAST_PID
+from .window import _parse_regex
+
+
+@register("wait_process")
+def wait_process(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Ждёт появления (exists: true) или завершения (exists: false) процесса.
+    Опрос — по общему снимку utils.processes; процесс, запущенный прогоном,
+    проверяется через его Popen, и для него известен код завершения.
+
+    params:
+      name?: regex '/.../i' или строка (как в wait_window)
+      pid?: int (без name и pid — последний run_program/run_ps с wait=false)
+      exists?: bool (default: true)
+      timeout?: duration (default: run.timeout | 20s)
+      poll?: duration (default: process.snapshot_interval)
+      exit_code?: int — ожидаемый код завершения своего процесса
+    """
+    name_expr = step.get("name")
+    pid_obj = step.get("pid")
+    if name_expr is not None and pid_obj is not None:
+        raise ValueError("wait_process: use either 'name' or 'pid'")
+    if name_expr is None and pid_obj is None:
+        pid_obj = ctx.state.get(LAST_PID)
+        if pid_obj is None:
+            raise ValueError("wait_process: 'name' or 'pid' is required")
+
+    exists = bool(step.get("exists", True))
+    timeout = ctx.step_timeout(step, 20.0)
+    max_age = processes.interval_for(ctx.config)
+    poll = parse_duration(step.get("poll")) or max(0.05, max_age)
+
+    what = f"pid={pid_obj}" if name_expr is None else f"'{name_expr}'"
+    verb = "появление" if exists else "завершение"
+    ctx.console.print(f"Жду {verb} процесса {what} (до {timeout:.1f}s)...")
+
+    name_re = _parse_regex(str(name_expr)) if name_expr is not None else None
+    pid = int(pid_obj) if pid_obj is not None else None
+
+    def _running() -> List[int]:
+        if name_re is not None:
+            return processes.find(name_re, max_age)
+        assert pid is not None
+        return [pid] if processes.alive(pid, max_age) else []
+
+    t0 = timing.now()
+    found: List[int] = []
+    for _ in ctx.ticks(poll, timeout):
+        found = _running()
+        if bool(found) == exists:
+            break
+    else:
+        state = "не появился" if exists else "не завершился"
+        raise TimeoutError(f"wait_process: процесс {what} {state} за {timeout:.1f}s")
+
+    dt = timing.now() - t0
+    if exists:
+        ctx.state[LAST_PID] = found[0]
+        ctx.console.print(f"Процесс {what} есть (pid={found[0]}) за {dt:.2f}s")
+        return
+
+    code: Optional[int] = processes.exit_code(pid) if pid is not None else None
+    ctx.console.print(
+        f"Процесс {what} завершился за {dt:.2f}s"
+        + (f" (код {code})" if code is not None else "")
+    )
+    if code is not None:
+        ctx.state["process:exit_code"] = code
+    expected = step.get("exit_code")
+    if expected is not None:
+        if code is None:
+            raise ValueError(
+                "wait_process: 'exit_code' needs a process started by this run"
+            )
+        if code != int(expected):
+            raise RuntimeError(
+                f"wait_process: {what} exited with {code}, expected {int(expected)}"
+            )
+
+
+_STREAMS = {"stdout": "out", "stderr": "err", "any": None}
+# сколько ждать новой строки за один заход (потом — проверка отмены)
+_WAIT_SLICE = 0.25
+
+
+def _output_of(
+    ctx: Context, spec: Dict[str, Any], what: str
+) -> Tuple[int, outputs.OutputStream]:
+    pid_obj = spec.get("pid", ctx.state.get(LAST_PID))
+    if pid_obj is None:
+        raise ValueError(f"{what}: 'pid' is required (no process started yet)")
+    pid = int(pid_obj)
+    stream = outputs.get(pid)
+    if stream is None:
+        raise ValueError(f"{what}: no captured output for pid={pid}")
+    return pid, stream
+
+
+def _stream_kind(spec: Dict[str, Any], what: str) -> Optional[str]:
+    name = str(spec.get("stream") or "any")
+    if name not in _STREAMS:
+        raise ValueError(f"{what}: 'stream' must be stdout, stderr or any")
+    return _STREAMS[name]
+
+
+def output_matches(ctx: Context, spec: Dict[str, Any]) -> bool:
+    """Условие output_matches: строка в хвосте вывода процесса (без ожидания)."""
+    pattern = spec.get("pattern")
+    if not pattern:
+        raise ValueError("output_matches: 'pattern' is required")
+    _, stream = _output_of(ctx, spec, "output_matches")
+    kind = _stream_kind(spec, "output_matches")
+    return stream.search(_parse_regex(str(pattern)), 0, kind) is not None
+
+
+@register("wait_output")
+def wait_output(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Ждёт строку вывода запущенного процесса: шаг продолжается сразу,
+    как процесс её напечатал (например, «ready» у сервера).
+    Строки, уже совпавшие в прошлых wait_output того же процесса,
+    повторно не учитываются.
+
+    params:
+      pattern: regex '/.../i' или строка (как в wait_window)
+      pid?: int (default: последний run_program/run_ps)
+      stream?: stdout | stderr | any (default: any)
+      timeout?: duration (default: run.timeout | 20s)
+    Итог: ctx.state["output:line"], ctx.state["output:groups"].
+    """
+    pattern = step.get("pattern")
+    if not pattern:
+        raise ValueError("wait_output: 'pattern' is required")
+    pid, stream = _output_of(ctx, step, "wait_output")
+    kind = _stream_kind(step, "wait_output")
+    rx = _parse_regex(str(pattern))
+    timeout = ctx.step_timeout(step, 20.0)
+
+    cursor_key = f"output:cursor:{pid}"
+    since = int(ctx.state.get(cursor_key, 0))
+    ctx.console.print(f"Жду вывод '{pattern}' от pid={pid} (до {timeout:.1f}s)...")
+    t0 = timing.now()
+    deadline = t0 + timeout
+    while True:
+        ctx.check_cancelled()
+        eof = stream.closed
+        nxt = stream.cursor
+        hit = stream.search(rx, since, kind)
+        if hit is not None:
+            break
+        if eof:
+            raise RuntimeError(
+                f"wait_output: pid={pid} closed its output without '{pattern}'"
+                f" (log: {stream.log_path})"
+            )
+        now = timing.now()
+        if now >= deadline:
+            raise TimeoutError(
+                f"wait_output: '{pattern}' not seen from pid={pid} in {timeout:.1f}s"
+                f" (log: {stream.log_path})"
+            )
+        since = nxt
+        # новая строка будит сразу; срез — только для таймаута и отмены
+        ctx.wait_event(
+            lambda s: stream.wait_new(nxt, s), min(_WAIT_SLICE, deadline - now)
+        )
+
+    assert hit is not None
+    seq, _, line = hit
+    ctx.state[cursor_key] = seq + 1
+    m = rx.search(line)
+    ctx.state["output:line"] = line
+    ctx.state["output:groups"] = list(m.groups()) if m is not None else []
+    dt = timing.now() - t0
+    ctx.console.print(f"Вывод за {dt:.2f}s: {line}")
@@ -1,30 +1,31 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import asyncio
+import itertools
+import locale
 import os
 import subprocess
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from rich.markup import escape
+
+from .. import desktop
 from ..context import Context
-from ..utils.timeparse import parse_duration
-from . import register
+from ..utils import outputs, processes, shells, timing
+from ..utils.paths import artifacts_dir, step_stub_name
+from . import register, register_async
 
-
-def _resolve_timeout(ctx: Context, step: Dict[str, Any]) -> Optional[float]:
-    """
-    Цепочка приоритетов:
-    1) step.timeout
-    2) config.run.timeout
-    3) settings.defaults.timeout
-    Возвращает seconds | None.
-    """
-    raw = (
-        step.get("timeout")
-        or (ctx.config.get("run") or {}).get("timeout")
-        or ((ctx.config.get("settings") or {}).get("defaults") or {}).get("timeout")
-    )
-    return parse_duration(raw)
+# pid последнего запуска run_program/run_ps — wait_process без name/pid
+LAST_PID = "process:last_pid"
+# сколько дочитывать вывод после выхода процесса
+_DRAIN_TIMEOUT = 1.0
+# предел длины строки для asyncio.StreamReader (по умолчанию 64 KiB)
+_LINE_LIMIT = 1 << 20
 
 
 def _ensure_path(p: str | Path) -> Path:
@@ -34,17 +35,31 @@ def _ensure_path(p: str | Path) -> Path:
     return q
 
 
-@register("run_program")
-def run_program(ctx: Context, step: Dict[str, Any]) -> None:
-    """
-    params:
-      path: str (exe/bat/cmd)
-      args?: [str, ...]
-      cwd?: str
-      wait?: bool (default: false)
-      timeout?: duration (используется, если wait=true)
-      env?: {k:v} (опционально, поверх текущего env)
-    """
+def _provided(path: str) -> bool:
+    desk = desktop.installed()
+    return desk is not None and desk.provides(path)
+
+
+def _spawn_on_desktop(launch: _Launch) -> Optional[int]:
+    """Запуск, который перехватил подменённый рабочий стол (sim), — его pid."""
+    desk = desktop.installed()
+    return desk.spawn(launch.cmd) if desk is not None else None
+
+
+@dataclass
+class _Launch:
+    """Разобранные параметры запуска (общие для sync и async вариантов)."""
+
+    cmd: List[str]
+    cwd: Optional[Path]
+    env: Optional[Dict[str, str]]
+    wait: bool
+    timeout: Optional[float]
+    # своя группа процессов: по таймауту/остановке убивается и всё дерево
+    group: bool = False
+
+
+def _program_launch(ctx: Context, step: Dict[str, Any]) -> _Launch:
     path = step.get("path")
     if not path:
         raise ValueError("run_program: 'path' is required")
@@ -55,61 +70,20 @@ def run_program(ctx: Context, step: Dict[str, Any]) -> None:
     env_add: Dict[str, str] = dict(step.get("env") or {})
 
     exe = _ensure_path(path)
-    if not exe.exists():
+    if not exe.exists() and not _provided(str(path)):
         raise FileNotFoundError(f"Executable not found: {exe}")
 
     cwd = _ensure_path(cwd_raw) if cwd_raw else None
-    timeout = _resolve_timeout(ctx, step)
-
-    if ctx.dry_run:
-        ctx.console.print(
-            f"[cyan]DRY[/] run_program: {exe} args={args} cwd={cwd} wait={wait} timeout={timeout}"
-        )
-        return
-
-    cmd: List[str] = [str(exe), *args]
-
-    proc = subprocess.Popen(
-        cmd,
-        cwd=str(cwd) if cwd else None,
+    return _Launch(
+        cmd=[str(exe), *args],
+        cwd=cwd,
         env=None if not env_add else {**os.environ, **env_add},
-        shell=False,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
+        wait=wait,
+        timeout=ctx.step_timeout(step),
     )
 
-    if wait:
-        try:
-            out, err = proc.communicate(
-                timeout=timeout if timeout is not None else None
-            )
-        except subprocess.TimeoutExpired:
-            proc.kill()
-            raise TimeoutError(f"run_program: timeout after {timeout:.1f}s: {exe}")
-        if proc.returncode != 0:
-            ctx.console.print(f"[red]run_program non-zero exit {proc.returncode}[/]")
-            if out:
-                ctx.console.print(f"[dim]stdout:[/]\n{out}")
-            if err:
-                ctx.console.print(f"[dim]stderr:[/]\n{err}")
-            raise subprocess.CalledProcessError(proc.returncode, cmd, out, err)
-    else:
-        ctx.console.print(f"Запущено: {exe.name} (pid={proc.pid})")
-
 
-@register("run_ps")
-def run_ps(ctx: Context, step: Dict[str, Any]) -> None:
-    """
-    params:
-      script?: str (путь к .ps1)  — ИЛИ —
-      inline?: str (одной строкой)
-      args?: [str, ...]
-      wait?: bool (default: true)
-      timeout?: duration
-      env?: {k:v}
-      pwsh?: bool (использовать PowerShell 7, по умолчанию Windows PowerShell)
-    """
+def _ps_launch(ctx: Context, step: Dict[str, Any]) -> _Launch:
     script = step.get("script")
     inline = step.get("inline")
     if not script and not inline:
@@ -138,35 +112,547 @@ def run_ps(ctx: Context, step: Dict[str, Any]) -> None:
     else:
         cmd = [ps_exe, "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", inline]
 
-    timeout = _resolve_timeout(ctx, step)
+    return _Launch(
+        cmd=cmd,
+        cwd=None,
+        env=None if not env_add else {**os.environ, **env_add},
+        wait=wait,
+        timeout=ctx.step_timeout(step),
+    )
+
+
+def _ps_command(step: Dict[str, Any]) -> str:
+    """Текст команды run_ps для сессии PowerShell."""
+    script = step.get("script")
+    if script:
+        args = [str(a) for a in step.get("args") or []]
+        return shells.script_command("powershell", str(_ensure_path(script)), args)
+    return str(step.get("inline"))
 
-    if ctx.dry_run:
-        ctx.console.print(f"[cyan]DRY[/] run_ps: {cmd!r} wait={wait} timeout={timeout}")
-        return
 
-    proc = subprocess.Popen(
-        cmd,
+def _popen(launch: _Launch) -> subprocess.Popen:
+    return subprocess.Popen(
+        launch.cmd,
+        cwd=str(launch.cwd) if launch.cwd else None,
+        env=launch.env,
         shell=False,
-        env=None if not env_add else {**os.environ, **env_add},
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
+        errors="replace",
+        **(shells.group_options() if launch.group else {}),
+    )
+
+
+def _output(ctx: Context, step: Dict[str, Any], tag: str) -> outputs.OutputStream:
+    """Лог artifacts/logs/<шаг>_<tag>.log + хвост вывода в памяти."""
+    log = artifacts_dir(ctx.config, "logs") / f"{step_stub_name(step)}_{tag}.log"
+    return outputs.OutputStream(log, outputs.tail_for(ctx.config))
+
+
+def _stream(ctx: Context, step: Dict[str, Any], pid: int) -> outputs.OutputStream:
+    """Вывод процесса pid (доступен wait_output/output_matches)."""
+    stream = _output(ctx, step, str(pid))
+    outputs.register(pid, stream)
+    return stream
+
+
+_session_runs = itertools.count(1)
+
+
+def _session_pool(
+    ctx: Context, step: Dict[str, Any], shell: str
+) -> Optional[shells.ShellPool]:
+    """
+    Пул сессий для шага, который ждёт результат: session: false, env шага
+    (сессия наследует окружение раннера) или shell.pool_size: 0 — без пула.
+    """
+    size, _ = shells.shell_settings(ctx.config)
+    if size <= 0 or not step.get("session", True) or step.get("env"):
+        return None
+    return shells.pool(shell, ctx.config)
+
+
+def _run_in_session(
+    ctx: Context,
+    step: Dict[str, Any],
+    pool: shells.ShellPool,
+    command: str,
+    launch: _Launch,
+) -> Tuple[int, str, str]:
+    """Команда в сессии из пула; вывод — в лог шага, как у отдельного процесса."""
+    stream = _output(ctx, step, f"{pool.shell}{next(_session_runs)}")
+    stream.open_pipe()
+    try:
+        cwd = str(launch.cwd) if launch.cwd else None
+        return pool.run(command, cwd, launch.timeout, stream)
+    finally:
+        stream.close_pipe()
+
+
+def _start(ctx: Context, step: Dict[str, Any], launch: _Launch) -> subprocess.Popen:
+    """Popen + фоновые читатели stdout/stderr: pipe не переполняется."""
+    proc = _popen(launch)
+    stream = _stream(ctx, step, proc.pid)
+    stream.attach("out", proc.stdout)
+    stream.attach("err", proc.stderr)
+    return proc
+
+
+def _kill(proc: subprocess.Popen, launch: _Launch) -> None:
+    if launch.group:
+        shells.kill_group(proc)
+    else:
+        proc.kill()
+
+
+def _wait(proc: subprocess.Popen, launch: _Launch) -> Tuple[int, str, str]:
+    """
+    Как communicate(), но вывод уже читают фоновые потоки (в лог шага);
+    возвращает код и хвосты stdout/stderr. По таймауту процесс убивается.
+    """
+    try:
+        code = proc.wait(timeout=launch.timeout)
+    except subprocess.TimeoutExpired:
+        _kill(proc, launch)
+        proc.wait()
+        raise
+    stream = outputs.get(proc.pid)
+    assert stream is not None
+    stream.join(_DRAIN_TIMEOUT)  # pipe могли унаследовать потомки — их не ждём
+    return code, stream.text("out"), stream.text("err")
+
+
+def _track(ctx: Context, proc: subprocess.Popen) -> None:
+    """Фоновый процесс — в общий реестр (wait_process: жизнь и код выхода)."""
+    processes.track(proc)
+    processes.invalidate()
+    ctx.state[LAST_PID] = proc.pid
+
+
+def _check_exit(
+    ctx: Context, what: str, launch: _Launch, code: int, out: str, err: str
+) -> None:
+    if code != 0:
+        ctx.console.print(f"[red]{what} non-zero exit {code}[/]")
+        if out:
+            ctx.console.print(f"[dim]stdout:[/]\n{out}")
+        if err:
+            ctx.console.print(f"[dim]stderr:[/]\n{err}")
+        raise subprocess.CalledProcessError(code, launch.cmd, out, err)
+
+
+async def _communicate_async(
+    ctx: Context, step: Dict[str, Any], launch: _Launch
+) -> Tuple[int, str, str]:
+    """
+    Дождаться процесса в цикле событий; вывод построчно читают задачи
+    asyncio (в лог шага, как _start). Текст — как у Popen(text=True).
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *launch.cmd,
+        cwd=str(launch.cwd) if launch.cwd else None,
+        env=launch.env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=_LINE_LIMIT,
     )
+    stream = _stream(ctx, step, proc.pid)
+    enc = locale.getpreferredencoding(False)
 
-    if wait:
+    async def _pump(kind: str, pipe: Optional[asyncio.StreamReader]) -> None:
+        if pipe is None:
+            return
+        stream.open_pipe()
         try:
-            out, err = proc.communicate(
-                timeout=timeout if timeout is not None else None
+            async for raw in pipe:
+                stream.feed(kind, raw.decode(enc, errors="replace"))
+        finally:
+            stream.close_pipe()
+
+    async def _run() -> int:
+        await asyncio.gather(_pump("out", proc.stdout), _pump("err", proc.stderr))
+        return await proc.wait()
+
+    try:
+        code = await asyncio.wait_for(_run(), launch.timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        proc.kill()
+        await proc.wait()
+        raise
+    return int(code or 0), stream.text("out"), stream.text("err")
+
+
+@register("run_program")
+def run_program(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    params:
+      path: str (exe/bat/cmd)
+      args?: [str, ...]
+      cwd?: str
+      wait?: bool (default: false)
+      timeout?: duration (используется, если wait=true)
+      env?: {k:v} (опционально, поверх текущего env)
+
+    stdout/stderr пишутся построчно в artifacts/logs/<шаг>_<pid>.log;
+    строку вывода фонового процесса можно дождаться через wait_output.
+    """
+    launch = _program_launch(ctx, step)
+    exe = launch.cmd[0]
+
+    if ctx.dry_run:
+        ctx.console.print(
+            f"[cyan]DRY[/] run_program: {exe} args={launch.cmd[1:]} cwd={launch.cwd} "
+            f"wait={launch.wait} timeout={launch.timeout}"
+        )
+        return
+
+    pid = _spawn_on_desktop(launch)
+    if pid is not None:
+        ctx.console.print(f"Запущено: {Path(exe).name} (pid={pid})")
+        return
+
+    proc = _start(ctx, step, launch)
+
+    if launch.wait:
+        try:
+            code, out, err = _wait(proc, launch)
+        except subprocess.TimeoutExpired:
+            raise TimeoutError(
+                f"run_program: timeout after {launch.timeout:.1f}s: {exe}"
             )
+        _check_exit(ctx, "run_program", launch, code, out, err)
+    else:
+        _track(ctx, proc)
+        ctx.console.print(f"Запущено: {Path(exe).name} (pid={proc.pid})")
+
+
+@register_async("run_program")
+async def run_program_async(ctx: Context, step: Dict[str, Any]) -> None:
+    """run_program для --engine async: ожидание процесса не занимает поток."""
+    launch = _program_launch(ctx, step)
+    if ctx.dry_run or not launch.wait or _provided(launch.cmd[0]):
+        # без ожидания процесс должен пережить цикл событий — обычный Popen
+        run_program(ctx, step)
+        return
+    try:
+        code, out, err = await _communicate_async(ctx, step, launch)
+    except asyncio.TimeoutError:
+        raise TimeoutError(
+            f"run_program: timeout after {launch.timeout:.1f}s: {launch.cmd[0]}"
+        )
+    _check_exit(ctx, "run_program", launch, code, out, err)
+
+
+@register("run_ps")
+def run_ps(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    params:
+      script?: str (путь к .ps1)  — ИЛИ —
+      inline?: str (одной строкой)
+      args?: [str, ...]
+      wait?: bool (default: true)
+      timeout?: duration
+      env?: {k:v}
+      pwsh?: bool (использовать PowerShell 7, по умолчанию Windows PowerShell)
+      session?: bool (default: true) — с wait=true и без env выполнять
+        в долгоживущей сессии из пула (utils.shells), без старта powershell
+    """
+    launch = _ps_launch(ctx, step)
+
+    if ctx.dry_run:
+        ctx.console.print(
+            f"[cyan]DRY[/] run_ps: {launch.cmd!r} "
+            f"wait={launch.wait} timeout={launch.timeout}"
+        )
+        return
+
+    shell = "pwsh" if step.get("pwsh") else "powershell"
+    pool = _session_pool(ctx, step, shell) if launch.wait else None
+    if pool is not None:
+        try:
+            code, out, err = _run_in_session(ctx, step, pool, _ps_command(step), launch)
+        except TimeoutError:
+            raise TimeoutError(f"run_ps: timeout after {launch.timeout:.1f}s")
+        _check_exit(ctx, "run_ps", launch, code, out, err)
+        return
+
+    proc = _start(ctx, step, launch)
+
+    if launch.wait:
+        try:
+            code, out, err = _wait(proc, launch)
         except subprocess.TimeoutExpired:
-            proc.kill()
-            raise TimeoutError(f"run_ps: timeout after {timeout:.1f}s")
-        if proc.returncode != 0:
-            ctx.console.print(f"[red]run_ps non-zero exit {proc.returncode}[/]")
-            if out:
-                ctx.console.print(f"[dim]stdout:[/]\n{out}")
-            if err:
-                ctx.console.print(f"[dim]stderr:[/]\n{err}")
-            raise subprocess.CalledProcessError(proc.returncode, cmd, out, err)
+            raise TimeoutError(f"run_ps: timeout after {launch.timeout:.1f}s")
+        _check_exit(ctx, "run_ps", launch, code, out, err)
     else:
+        _track(ctx, proc)
         ctx.console.print(f"PowerShell запущен (pid={proc.pid})")
+
+
+@register_async("run_ps")
+async def run_ps_async(ctx: Context, step: Dict[str, Any]) -> None:
+    """run_ps для --engine async."""
+    launch = _ps_launch(ctx, step)
+    if ctx.dry_run or not launch.wait:
+        run_ps(ctx, step)
+        return
+    if _session_pool(ctx, step, "pwsh" if step.get("pwsh") else "powershell"):
+        # сессия из пула отвечает через блокирующие очереди — в поток
+        await asyncio.to_thread(run_ps, ctx, step)
+        return
+    try:
+        code, out, err = await _communicate_async(ctx, step, launch)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"run_ps: timeout after {launch.timeout:.1f}s")
+    _check_exit(ctx, "run_ps", launch, code, out, err)
+
+
+def _shell_launch(ctx: Context, step: Dict[str, Any]) -> Tuple[str, str, _Launch]:
+    command = step.get("command")
+    if not command:
+        raise ValueError("run_shell: 'command' is required")
+    shell = str(step.get("shell") or "auto")
+    if shell == "auto":
+        shell = shells.default_shell()
+    if shell in ("powershell", "pwsh"):
+        exe = "powershell.exe" if shell == "powershell" else "pwsh"
+        cmd = [exe, "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", command]
+    elif shell in ("bash", "sh"):
+        cmd = [shell, "-c", command]
+    else:
+        raise ValueError(f"run_shell: unknown shell {shell!r}")
+
+    cwd_raw = step.get("cwd")
+    env_add: Dict[str, str] = dict(step.get("env") or {})
+    launch = _Launch(
+        cmd=cmd,
+        cwd=_ensure_path(cwd_raw) if cwd_raw else None,
+        env=None if not env_add else {**os.environ, **env_add},
+        wait=True,
+        timeout=ctx.step_timeout(step),
+        group=True,
+    )
+    return str(command), shell, launch
+
+
+@register("run_shell")
+def run_shell(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Короткая команда оболочки с ожиданием результата.
+
+    params:
+      command: str
+      shell?: auto | bash | sh | powershell | pwsh
+        (auto: PowerShell на Windows, иначе bash/sh)
+      cwd?: str
+      timeout?: duration
+      env?: {k:v} — только в отдельном процессе (сессия наследует env раннера)
+      session?: bool (default: true) — сессия из пула utils.shells
+      check?: bool (default: true) — ненулевой код завершения = ошибка
+    Итог: ctx.state["shell:code"], ctx.state["shell:output"] (stdout).
+    """
+    command, shell, launch = _shell_launch(ctx, step)
+
+    if ctx.dry_run:
+        ctx.console.print(
+            f"[cyan]DRY[/] run_shell ({shell}): {command!r} timeout={launch.timeout}"
+        )
+        return
+
+    pool = _session_pool(ctx, step, shell)
+    try:
+        if pool is not None:
+            code, out, err = _run_in_session(ctx, step, pool, command, launch)
+        else:
+            code, out, err = _wait(_start(ctx, step, launch), launch)
+    except (TimeoutError, subprocess.TimeoutExpired):
+        raise TimeoutError(f"run_shell: timeout after {launch.timeout:.1f}s")
+
+    ctx.state["shell:code"] = code
+    ctx.state["shell:output"] = out
+    if step.get("check", True):
+        _check_exit(ctx, "run_shell", launch, code, out, err)
+
+
+# run_many: сколько команд одновременно, если не задано ни в шаге, ни в run
+_MANY_CONCURRENCY = 4
+_MANY_POLICIES = ("fail_fast", "collect_all")
+
+
+def _many_launch(
+    ctx: Context, step: Dict[str, Any], i: int, spec: Any
+) -> Tuple[str, _Launch]:
+    """
+    Команда run_many: path — программа, script/inline — PowerShell,
+    command (или просто строка) — оболочка.
+    """
+    if isinstance(spec, str):
+        spec = {"command": spec}
+    if not isinstance(spec, dict):
+        raise ValueError("run_many: each command must be a string or a mapping")
+    spec = {**spec, "wait": True}
+    if spec.get("timeout") is None and step.get("timeout") is not None:
+        spec["timeout"] = step["timeout"]
+    if "path" in spec:
+        launch = _program_launch(ctx, spec)
+        label = Path(launch.cmd[0]).name
+    elif "script" in spec or "inline" in spec:
+        launch = _ps_launch(ctx, spec)
+        label = "powershell"
+    elif "command" in spec:
+        _, label, launch = _shell_launch(ctx, spec)
+    else:
+        raise ValueError(
+            "run_many: command needs 'path', 'script'/'inline' or 'command'"
+        )
+    launch.group = True
+    return str(spec.get("name") or f"{label}-{i + 1}"), launch
+
+
+@register("run_many")
+def run_many(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Независимые команды параллельно, не больше concurrency одновременно.
+
+    params:
+      commands: [команда, ...] — строка (команда оболочки) или
+        {name?, path, args?, cwd?, env?, timeout?} — программа,
+        {name?, script|inline, args?, pwsh?, env?, timeout?} — PowerShell,
+        {name?, command, shell?, cwd?, env?, timeout?} — оболочка
+      concurrency?: int (default: run.concurrency | 4)
+      on_error?: fail_fast (default) | collect_all
+      timeout?: duration — на каждую команду (команда может задать свой)
+
+    Вывод каждой команды — в свой лог artifacts/logs/<шаг>_<имя>_<pid>.log.
+    Итог — ctx.state["run_many"]: [{name, status, code, elapsed, log, error}],
+    status: ok | failed (в т.ч. не запустилась) | timeout |
+    cancelled (остановлена) | skipped.
+    fail_fast — первая ошибка останавливает запущенные и не запускает
+    остальные; collect_all — выполняются все, ошибка — после всех.
+    """
+    specs = step.get("commands")
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("run_many: 'commands' must be a non-empty list")
+    on_error = str(step.get("on_error") or "fail_fast")
+    if on_error not in _MANY_POLICIES:
+        raise ValueError(f"run_many: on_error must be one of {_MANY_POLICIES}")
+    limit = int(
+        step.get("concurrency")
+        or (ctx.config.get("run") or {}).get("concurrency")
+        or _MANY_CONCURRENCY
+    )
+    # все команды разбираются до запуска первой: ошибка в описании — сразу
+    launches = [_many_launch(ctx, step, i, spec) for i, spec in enumerate(specs)]
+
+    if ctx.dry_run:
+        for name, launch in launches:
+            ctx.console.print(
+                f"[cyan]DRY[/] run_many: {name}: {launch.cmd!r} "
+                f"timeout={launch.timeout}"
+            )
+        return
+
+    stub = step_stub_name(step)
+    rows: List[Dict[str, Any]] = [
+        {
+            "name": name,
+            "status": "skipped",
+            "code": None,
+            "elapsed": None,
+            "log": None,
+            "error": None,
+        }
+        for name, _ in launches
+    ]
+    running: Dict[int, Tuple[subprocess.Popen, _Launch]] = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def _launch_one(i: int) -> None:
+        name, launch = launches[i]
+        row = rows[i]
+        with lock:
+            if stop.is_set():
+                return
+            try:
+                proc = _popen(launch)
+            except OSError as e:  # нет исполняемого файла, нет прав, ...
+                row["status"] = "failed"
+                row["error"] = f"cannot start: {e}"
+                raise RuntimeError(f"{name}: {row['error']}") from e
+            running[i] = (proc, launch)
+        stream = _stream(ctx, {"name": f"{stub}_{name}"}, proc.pid)
+        stream.attach("out", proc.stdout)
+        stream.attach("err", proc.stderr)
+        row["log"] = str(stream.log_path)
+        t0 = timing.now()
+        try:
+            code, _, err = _wait(proc, launch)
+        except subprocess.TimeoutExpired:
+            row["status"] = "timeout"
+            row["error"] = f"timeout after {launch.timeout:.1f}s"
+            raise TimeoutError(f"{name}: {row['error']}")
+        finally:
+            row["elapsed"] = round(timing.now() - t0, 3)
+            with lock:
+                running.pop(i, None)
+        row["code"] = code
+        if code != 0 and not stop.is_set():
+            row["status"] = "failed"
+            last = err.splitlines()[-1] if err else ""
+            row["error"] = f"exit {code}" + (f": {last}" if last else "")
+            raise RuntimeError(f"{name}: {row['error']}")
+        row["status"] = "ok" if code == 0 else "cancelled"
+
+    def _one(i: int) -> None:
+        try:
+            _launch_one(i)
+        except Exception:
+            if on_error == "fail_fast":
+                # сразу из рабочего потока: освободившийся поток не должен
+                # успеть взять следующую команду
+                _halt()
+            raise
+
+    def _halt() -> None:
+        """Не запускать оставшиеся и остановить запущенные."""
+        with lock:
+            stop.set()
+            procs = list(running.values())
+        for proc, launch in procs:
+            _kill(proc, launch)
+
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, min(limit, len(launches))), thread_name_prefix="run_many"
+    )
+    pending = {pool.submit(_one, i) for i in range(len(launches))}
+    errors: List[BaseException] = []
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            if ctx.cancel.cancelled:
+                _halt()
+            errors.extend(e for e in (f.exception() for f in done) if e is not None)
+            if errors and on_error == "fail_fast":
+                _halt()
+    finally:
+        if ctx.cancel.cancelled or (errors and on_error == "fail_fast"):
+            _halt()
+        pool.shutdown(wait=True)
+
+    ctx.state["run_many"] = rows
+    for row in rows:
+        color = "green" if row["status"] == "ok" else "red"
+        took = f"{row['elapsed']:.2f}s" if row["elapsed"] is not None else "-"
+        ctx.console.print(
+            f"  [{color}]{row['status']:9}[/] {row['name']}"
+            f" code={row['code']} {took}"
+            + (f" [dim]{escape(row['error'])}[/]" if row["error"] else "")
+        )
+    ctx.check_cancelled()
+    if errors:
+        raise RuntimeError(
+            f"run_many: {len(errors)} of {len(rows)} commands failed;"
+            f" first: {errors[0]}"
+        )
@@ -2,57 +2,34 @@
 from __future__ import annotations
 
 import sys
-import time
 from pathlib import Path
-from typing import Any, Dict, Tuple, Optional
+from typing import Any, Callable, Dict, Tuple, Optional
 
 import cv2
 import numpy as np
-import pyautogui as pag
 
+from .. import desktop
 from ..context import Context
+from ..utils import timing
+from ..utils.paths import artifacts_dir, step_stub_name
 from ..utils.timeparse import parse_duration
 from ..vision.grab import grab_bgr
-from ..vision.match import find_template
-from ..utils.paths import resolve_image_path
-from ..utils.win_window import get_client_rect_abs, get_foreground_hwnd
-from . import register
-
-
-def _resolve_region(spec: Any, ctx: Context) -> Tuple[int, int, int, int]:
-    cfg = ctx.config
-    if spec in (None, "default"):
-        spec = (cfg.get("vision") or {}).get("default_region", "screen")
-
-    if spec == "screen":
-        import mss
-
-        with mss.mss() as sct:
-            mon = sct.monitors[0]
-            return mon["left"], mon["top"], mon["width"], mon["height"]
-
-    if spec == "window":
-        hwnd = ctx.state.get("target_hwnd") or get_foreground_hwnd()
-        if not hwnd:
-            raise RuntimeError("region: window → нет активного окна")
-        return get_client_rect_abs(hwnd)
-
-    if isinstance(spec, dict):
-        return (
-            int(spec["left"]),
-            int(spec["top"]),
-            int(spec["width"]),
-            int(spec["height"]),
-        )
-    raise ValueError(f"Unknown region spec: {spec!r}")
+from ..vision.match import find_template, score_at
+from ..vision.probe import (
+    frame_diff,
+    frame_signature,
+    probe_color_ratio,
+    probe_pixel,
+)
+from ..vision.region import remember_hit, resolve_region
+from ..vision.templates import load_gray_variant, load_template
+from . import input_lock, register
 
 
 def _load_template(ctx: Context, path: str) -> np.ndarray:
-    full = resolve_image_path(path, ctx.config)
-    img = cv2.imread(str(full), cv2.IMREAD_UNCHANGED)
-    if img is None:
-        raise FileNotFoundError(f"Template not found or unreadable: {full}")
-    return img
+    from ..plan import resolve_asset
+
+    return load_template(resolve_asset(ctx, path), cv2.IMREAD_UNCHANGED)
 
 
 def _normalize_scale_range(raw: Any, cfg: Dict[str, Any]) -> Tuple[float, float]:
@@ -124,16 +101,11 @@ def _annotate(
 
 
 def _artifacts_dir(ctx: Context) -> Path:
-    root = Path((ctx.config.get("paths") or {}).get("project_root", "."))
-    d = root / "artifacts" / "vision"
-    d.mkdir(parents=True, exist_ok=True)
-    return d
+    return artifacts_dir(ctx.config, "vision")
 
 
 def _step_stub_name(step: Dict[str, Any]) -> str:
-    n = (step.get("name") or step.get("action") or "vision").strip()
-    safe = "".join(ch for ch in n if ch.isalnum() or ch in ("-", "_", " "))
-    return safe.replace(" ", "_")[:80]
+    return step_stub_name(step, "vision")
 
 
 @register("image_exists")
@@ -142,7 +114,7 @@ def image_exists(ctx: Context, step: Dict[str, Any]) -> None:
     if not path:
         raise ValueError("image_exists: 'image' is required")
 
-    region = _resolve_region(step.get("region"), ctx)
+    region = resolve_region(step.get("region"), ctx)
     threshold = float(
         step.get("threshold", (ctx.config.get("vision") or {}).get("threshold", 0.87))
     )
@@ -178,8 +150,7 @@ def image_exists(ctx: Context, step: Dict[str, Any]) -> None:
     best_rect: Optional[Tuple[int, int, int, int]] = None
     best_method: str = method
 
-    deadline = time.time() + timeout
-    while time.time() < deadline:
+    for _ in ctx.ticks(retry_delay, timeout):
         hit, score, scene = _try_match_with_score(
             ctx,
             region,
@@ -209,13 +180,12 @@ def image_exists(ctx: Context, step: Dict[str, Any]) -> None:
             if show_score:
                 sys.stdout.write("\n")
                 sys.stdout.flush()
+            remember_hit(ctx, step, path, region, hit)
             ctx.console.print(
                 f"Нашёл {path} score={score:.3f} via {hit.get('method', method)}"
             )
             return
 
-        time.sleep(retry_delay)
-
     if show_score:
         sys.stdout.write("\n")
         sys.stdout.flush()
@@ -230,7 +200,7 @@ def click_image(ctx: Context, step: Dict[str, Any]) -> None:
     if not path:
         raise ValueError("click_image: 'image' is required")
 
-    region = _resolve_region(step.get("region"), ctx)
+    region = resolve_region(step.get("region"), ctx)
     threshold = float(
         step.get("threshold", (ctx.config.get("vision") or {}).get("threshold", 0.87))
     )
@@ -269,8 +239,7 @@ def click_image(ctx: Context, step: Dict[str, Any]) -> None:
     best_rect: Optional[Tuple[int, int, int, int]] = None
     best_method: str = method
 
-    deadline = time.time() + timeout
-    while time.time() < deadline:
+    for _ in ctx.ticks(retry_delay, timeout):
         hit, score, scene = _try_match_with_score(
             ctx,
             region,
@@ -304,19 +273,208 @@ def click_image(ctx: Context, step: Dict[str, Any]) -> None:
             if show_score:
                 sys.stdout.write("\n")
                 sys.stdout.flush()
-            pag.FAILSAFE = False
-            pag.moveTo(cx, cy, duration=move_duration)
-            pag.click(cx, cy)
+            remember_hit(ctx, step, path, region, hit)
+            with input_lock:  # поиск идёт параллельно, мышь — по очереди
+                desktop.current().move(cx, cy, duration=move_duration)
+                desktop.current().click(cx, cy)
             ctx.console.print(
                 f"Клик по {path} @ ({cx},{cy}) score={score:.3f} via {hit.get('method', method)}"
             )
             return
 
-        time.sleep(retry_delay)
-
     if show_score:
         sys.stdout.write("\n")
         sys.stdout.flush()
     raise TimeoutError(
         f"click_image: not found {path} within {timeout:.1f}s (best={best_overall:.3f}, matcher={method})"
     )
+
+
+def _wait_probe(
+    ctx: Context,
+    step: Dict[str, Any],
+    kind: str,
+    probe: Callable[[Context, Dict[str, Any]], Tuple[bool, Any]],
+) -> None:
+    """
+    Общий цикл для дешёвых проб: опрашиваем с высокой частотой до timeout.
+    """
+    timeout = (
+        parse_duration(
+            step.get("timeout") or (ctx.config.get("run") or {}).get("timeout")
+        )
+        or 10.0
+    )
+    poll = parse_duration(step.get("poll")) or 0.02
+
+    if ctx.dry_run:
+        ctx.console.print(
+            f"[cyan]DRY[/] {kind}: {step.get('region')} timeout={timeout}"
+        )
+        return
+
+    last: Any = None
+    for _ in ctx.ticks(poll, timeout):
+        ok, last = probe(ctx, step)
+        if ok:
+            ctx.console.print(f"{kind}: совпало ({last})")
+            return
+    raise TimeoutError(f"{kind}: no match within {timeout:.1f}s (last={last})")
+
+
+@register("pixel_is")
+def pixel_is(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    params:
+      x, y: координаты пикселя относительно region
+      color: '#RRGGBB' | [r, g, b]
+      tolerance?: 16 (макс. отклонение по каналу)
+      region?, timeout?, poll?: 20ms
+    """
+    _wait_probe(ctx, step, "pixel_is", probe_pixel)
+
+
+@register("color_ratio")
+def color_ratio(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    params:
+      region?: как у click_image
+      color + tolerance? | lower/upper: диапазон цвета
+      min_ratio?: 0.5, max_ratio?: 1.0 — доля пикселей в диапазоне
+      timeout?, poll?: 20ms
+    """
+    _wait_probe(ctx, step, "color_ratio", probe_color_ratio)
+
+
+@register("wait_stable")
+def wait_stable(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Ждёт, пока region перестанет меняться (анимации/перерисовки закончились).
+    params:
+      region?: как у click_image
+      quiet?: 300ms — сколько область должна оставаться неизменной
+      timeout?: duration
+      poll?: 30ms
+      max_side?: 64 — размер отпечатка (grayscale, уменьшенный)
+      tolerance?: 8 — допустимое поблочное отличие (0..255)
+    """
+    region = resolve_region(step.get("region"), ctx)
+    quiet = parse_duration(step.get("quiet"))
+    if quiet is None:
+        quiet = 0.3
+    timeout = (
+        parse_duration(
+            step.get("timeout") or (ctx.config.get("run") or {}).get("timeout")
+        )
+        or 10.0
+    )
+    poll = parse_duration(step.get("poll")) or 0.03
+    max_side = int(step.get("max_side", 64))
+    tolerance = float(step.get("tolerance", 8))
+
+    if ctx.dry_run:
+        ctx.console.print(
+            f"[cyan]DRY[/] wait_stable: {region} quiet={quiet}s timeout={timeout}s"
+        )
+        return
+
+    t0 = timing.now()
+    prev = None
+    stable_since = t0
+    frames = 0
+    for _ in ctx.ticks(poll, timeout):
+        cur = frame_signature(grab_bgr(region), max_side)
+        frames += 1
+        now = timing.now()
+        if prev is not None and frame_diff(prev, cur) > tolerance:
+            stable_since = now
+        prev = cur
+        if now - stable_since >= quiet:
+            ctx.console.print(f"Область стабильна за {now - t0:.2f}s ({frames} кадров)")
+            return
+    raise TimeoutError(
+        f"wait_stable: region {region} still changing after {timeout:.1f}s"
+    )
+
+
+@register("wait_vanish")
+def wait_vanish(ctx: Context, step: Dict[str, Any]) -> None:
+    """
+    Ждёт исчезновения ранее найденного изображения (кнопка, спиннер).
+    Опрос дешёвый: сверяем только патч на месте последнего попадания,
+    одним масштабом (TM_CCOEFF_NORMED). Полный поиск — лишь для подтверждения.
+    params:
+      anchor?: id якоря (по умолчанию — последнее попадание vision:last_hit)
+      image?: путь (по умолчанию — картинка из попадания)
+      region?: область финальной проверки (по умолчанию — область попадания)
+      threshold?, scale_range?, matcher? — как у image_exists
+      timeout?, poll?: 50ms, pad?: 4 (запас патча в пикселях)
+    """
+    aid = step.get("anchor")
+    rec = ctx.state.get(f"anchor:{aid}" if aid else "vision:last_hit")
+    path = step.get("image") or (rec or {}).get("image")
+    if not path:
+        raise ValueError("wait_vanish: 'image' is required when there is no prior hit")
+    if rec and rec.get("image") != path:
+        rec = None  # попадание о другой картинке — быстрый путь недоступен
+
+    threshold = float(
+        step.get("threshold", (ctx.config.get("vision") or {}).get("threshold", 0.87))
+    )
+    scale_range = _normalize_scale_range(step.get("scale_range"), ctx.config)
+    timeout = (
+        parse_duration(
+            step.get("timeout") or (ctx.config.get("run") or {}).get("timeout")
+        )
+        or 10.0
+    )
+    poll = parse_duration(step.get("poll")) or 0.05
+    pad = int(step.get("pad", 4))
+    method, canny, use_clahe = _matcher_from(step, ctx.config)
+
+    if step.get("region") is not None or not rec:
+        region = resolve_region(step.get("region"), ctx)
+    else:
+        region = tuple(rec["region"])
+
+    if ctx.dry_run:
+        ctx.console.print(
+            f"[cyan]DRY[/] wait_vanish: {path} at {(rec or {}).get('rect')} timeout={timeout}"
+        )
+        return
+
+    from ..plan import resolve_asset
+
+    full = resolve_asset(ctx, path)
+    rect: Optional[Tuple[int, int, int, int]] = tuple(rec["rect"]) if rec else None
+    t0 = timing.now()
+    polls = 0
+    for _ in ctx.ticks(poll, timeout):
+        gone = True
+        if rect is not None:
+            x, y, w, h = rect
+            tmpl_g = load_gray_variant(full, (w, h), clahe=use_clahe)
+            patch = grab_bgr((x - pad, y - pad, w + 2 * pad, h + 2 * pad))
+            gone = score_at(patch, tmpl_g, use_clahe) < threshold
+            polls += 1
+
+        if gone:
+            # подтверждаем полным поиском: вдруг элемент просто сдвинулся
+            hit, score, _ = _try_match_with_score(
+                ctx,
+                region,
+                path,
+                scale_range,
+                steps=9,
+                method=method,
+                canny=canny,
+                use_clahe=use_clahe,
+            )
+            if not hit or score < threshold:
+                ctx.console.print(
+                    f"Исчезло {path} за {timing.now() - t0:.2f}s ({polls} проверок)"
+                )
+                return
+            rect = remember_hit(ctx, step, path, region, hit)["rect"]
+
+    raise TimeoutError(f"wait_vanish: {path} still visible after {timeout:.1f}s")
@@ -8,10 +8,6 @@ import typer
 from rich.console import Console
 from rich.table import Table
 
-from .dsl import load_config, validate_scenario
-from .orchestrator import run_scenario
-
-
 app = typer.Typer(add_completion=False, help="Mini-RPA Runner (skeleton)")
 
 console = Console()
@@ -42,13 +38,31 @@ def list_scenarios() -> None:
 
 @app.command()
 def check(
-    scenario: str = typer.Argument(..., help="Путь к yaml или имя из папки scenarios"),
+    scenario: Optional[str] = typer.Argument(
+        None, help="Путь к yaml или имя из папки scenarios"
+    ),
     profile: Optional[str] = typer.Option(None, help="Имя профиля из configs/profiles"),
     override: List[str] = typer.Option(
         None, "--set", help="Переопределения key=value (можно несколько)"
     ),
+    all_: bool = typer.Option(
+        False, "--all", help="Проверить все сценарии из scenarios/ по схеме DSL"
+    ),
+    jobs: Optional[int] = typer.Option(
+        None, "--jobs", "-j", help="Число процессов для --all (по умолчанию — все ядра)"
+    ),
 ) -> None:
     """Проверить сценарий: загрузка + базовая валидация DSL."""
+    if all_:
+        _check_all(jobs)
+        return
+    if not scenario:
+        console.print("[red]Укажите сценарий или --all[/]")
+        raise typer.Exit(code=2)
+
+    # импорты — внутри команд: `list` не должен платить за yaml/jinja2/действия
+    from .dsl import load_config, validate_scenario
+
     cfg = load_config(ROOT, scenario, profile, override or [])
     errors = validate_scenario(cfg)
     if errors:
@@ -60,6 +74,39 @@ def check(
     console.print(f"[green]OK[/]: версия={cfg.get('version')} шагов={len(steps)}")
 
 
+def _check_all(jobs: Optional[int]) -> None:
+    """`check --all`: схема docs/dsl.schema.json, пул процессов, кэш по хэшу."""
+    import time
+
+    from .schema import check_all
+
+    files = _iter_scenarios()
+    if not files:
+        console.print("[yellow]Сценариев пока нет.[/]")
+        return
+    t0 = time.perf_counter()
+    results = check_all(files, jobs=jobs)
+    dt = time.perf_counter() - t0
+
+    failed = 0
+    cached = 0
+    for path, (errors, from_cache) in results.items():
+        cached += from_cache
+        rel = path.relative_to(ROOT) if path.is_relative_to(ROOT) else path
+        if not errors:
+            console.print(f"[green]OK[/]  {rel}", soft_wrap=True)
+            continue
+        failed += 1
+        console.print(f"[red]ERR[/] {rel}", soft_wrap=True)
+        for e in errors:
+            console.print(f"    {rel}:{e}", markup=False, soft_wrap=True)
+    console.print(
+        f"{len(results)} сценариев, ошибок в {failed}, из кэша {cached} ({dt:.2f}s)"
+    )
+    if failed:
+        raise typer.Exit(code=2)
+
+
 @app.command()
 def run(
     scenario: str = typer.Argument(..., help="Путь к yaml или имя из папки scenarios"),
@@ -70,10 +117,30 @@ def run(
     override: List[str] = typer.Option(
         None, "--set", help="Переопределения key=value (можно несколько)"
     ),
+    engine: str = typer.Option("sync", help="Движок исполнения: sync или async"),
+    virtual_clock: bool = typer.Option(
+        False,
+        "--virtual-clock",
+        help="Не ждать по-настоящему: sleep/таймауты сдвигают виртуальное время",
+    ),
+    sim: Optional[str] = typer.Option(
+        None, help="Синтетический рабочий стол из описания (yaml) вместо настоящего"
+    ),
 ) -> None:
     """
     Выполнить сценарий: грузим конфиг, печатаем сводку, затем исполняем (или dry-run).
     """
+    import time
+
+    from .dsl import load_config, validate_scenario
+    from .orchestrator import ENGINES, run_scenario
+    from .utils.timing import VirtualClock
+
+    if engine not in ENGINES:
+        known = ", ".join(ENGINES)
+        console.print(f"[red]Неизвестный движок: {engine} (есть: {known})[/]")
+        raise typer.Exit(code=2)
+
     cfg = load_config(ROOT, scenario, profile, override or [])
     errors = validate_scenario(cfg)
     if errors:
@@ -88,7 +155,95 @@ def run(
     console.print(f"Шагов: {len(steps)}")
     console.print(f"Dry-run: {dry_run}")
 
-    run_scenario(cfg, dry_run=dry_run)
+    desk = None
+    if sim:
+        from .desktop.sim import SimDesktop
+
+        sim_path = Path(sim) if Path(sim).exists() else ROOT / sim
+        desk = SimDesktop.from_file(sim_path)
+
+    clock = VirtualClock() if virtual_clock else None
+    t0 = time.perf_counter()
+    try:
+        run_scenario(cfg, dry_run=dry_run, engine=engine, clock=clock, desktop=desk)
+    finally:
+        if desk is not None:
+            info = ", ".join(f"{k}={v}" for k, v in desk.summary().items())
+            console.print(f"[dim]Sim: {info}[/]")
+        if clock is not None:
+            real = time.perf_counter() - t0
+            console.print(
+                f"[dim]Виртуальное время: {clock.virtual_elapsed:.2f}s "
+                f"(реально {real:.2f}s, ожиданий: {clock.stats()['sleeps']})[/]"
+            )
+
+
+@app.command()
+def serve(
+    listen: str = typer.Option(
+        "tcp://127.0.0.1:8765", help="tcp://host:port или unix:///path.sock"
+    ),
+) -> None:
+    """Запустить тёплый демон: очередь заданий, прогретые импорты и кэши."""
+    from .daemon import serve as serve_forever
+
+    serve_forever(ROOT, listen, console)
+
+
+@app.command()
+def submit(
+    scenario: str = typer.Argument(..., help="Путь к yaml или имя из папки scenarios"),
+    profile: Optional[str] = typer.Option(None, help="Имя профиля из configs/profiles"),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Ничего не исполнять, только прогнать конфиг"
+    ),
+    override: List[str] = typer.Option(
+        None, "--set", help="Переопределения key=value (можно несколько)"
+    ),
+    listen: str = typer.Option(
+        "tcp://127.0.0.1:8765", help="Адрес демона (как у serve)"
+    ),
+    detach: bool = typer.Option(
+        False, "--detach", help="Только поставить в очередь, не ждать результата"
+    ),
+) -> None:
+    """Отправить сценарий демону `runner serve` и транслировать его лог."""
+    from .daemon import request
+
+    payload = {
+        "op": "submit",
+        "scenario": scenario,
+        "profile": profile,
+        "overrides": override or [],
+        "dry_run": dry_run,
+        "detach": detach,
+    }
+    try:
+        for msg in request(listen, payload):
+            ev = msg.get("event")
+            if ev == "queued":
+                console.print(
+                    f"[dim]job {msg['job']} queued (position {msg['position']}), "
+                    f"log: {msg['log']}[/dim]",
+                    soft_wrap=True,
+                )
+            elif ev == "log":
+                print(msg.get("text", ""))
+            elif ev == "error":
+                console.print(f"[red]{msg.get('error')}[/]")
+                raise typer.Exit(code=2)
+            elif ev == "done":
+                status = str(msg.get("status"))
+                color = "green" if status == "ok" else "red"
+                console.print(
+                    f"[{color}]job {msg['job']}: {status}[/] ({msg['elapsed']:.2f}s)"
+                )
+                if msg.get("error"):
+                    console.print(f"[red]{msg['error']}[/]")
+                raise typer.Exit(code={"ok": 0, "invalid": 2}.get(status, 1))
+    except OSError as e:
+        console.print(f"[red]Демон недоступен ({listen}): {e}[/]")
+        raise typer.Exit(code=3)
 
 
 def main() -> None:
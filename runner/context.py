@@ -1,19 +1,141 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass, field
-from typing import Any, Dict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    overload,
+)
 from rich.console import Console
 
+from .utils import timing
+from .utils.timeparse import parse_duration
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from .plan import ScenarioPlan
+
+
+class Cancelled(Exception):
+    """Исполнение ветки остановлено (проигравшая ветка parallel, таймаут)."""
+
+
+class CancelToken:
+    """
+    Кооперативная отмена. Отмена родителя каскадно отменяет дочерние
+    токены (ветки parallel внутри ветки parallel).
+    """
+
+    def __init__(self, parent: Optional["CancelToken"] = None) -> None:
+        self._event = threading.Event()
+        self._children: List[CancelToken] = []
+        self._lock = threading.Lock()
+        self._parent = parent
+        if parent is not None:
+            with parent._lock:
+                parent._children.append(self)
+            if parent.cancelled:
+                self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            children = list(self._children)
+        for c in children:
+            c.cancel()
+
+    def detach(self) -> None:
+        """Отвязывает токен от родителя (ветка завершилась)."""
+        p = self._parent
+        if p is not None:
+            with p._lock:
+                if self in p._children:
+                    p._children.remove(self)
+            self._parent = None
+
+    def wait(self, seconds: float) -> bool:
+        """Спит до seconds; True — если за это время пришла отмена."""
+        return self._event.wait(seconds) if seconds > 0 else self.cancelled
+
 
 @dataclass
 class Context:
     """
     Выполнение одного сценария. Содержит конфиг, консоль логов,
-    флаг dry_run и общее состояние (state) между шагами.
+    флаг dry_run, общее состояние (state) между шагами,
+    скомпилированный план сценария (plan), токен отмены (cancel),
+    замеренная в этом прогоне цена проверок условий (costs, EWMA, сек)
+    и цикл событий async-движка (loop; None — синхронный движок).
     """
 
     config: Dict[str, Any]
     console: Console
     dry_run: bool = False
     state: Dict[str, Any] = field(default_factory=dict)
+    plan: Optional["ScenarioPlan"] = None
+    cancel: CancelToken = field(default_factory=CancelToken)
+    costs: Dict[str, float] = field(default_factory=dict)
+    loop: Optional["asyncio.AbstractEventLoop"] = None
+
+    def check_cancelled(self) -> None:
+        if self.cancel.cancelled:
+            raise Cancelled("cancelled")
+
+    def sleep(self, seconds: float) -> None:
+        """Точный сон (utils.timing), который прерывается отменой."""
+        if timing.sleep(seconds, self.cancel):
+            raise Cancelled("cancelled")
+
+    def ticks(self, period: float, timeout: Optional[float] = None) -> Iterator[int]:
+        """timing.ticks с отменой: отменённый опрос бросает Cancelled, а не таймаут."""
+        yield from timing.ticks(period, timeout, self.cancel)
+        self.check_cancelled()
+
+    async def asleep(self, seconds: float) -> None:
+        """asyncio-вариант sleep (через те же часы utils.timing)."""
+        if await timing.asleep(seconds, self.cancel):
+            raise Cancelled("cancelled")
+
+    def wait_event(self, wait: Callable[[float], Any], seconds: float) -> None:
+        """
+        Ожидание события не дольше seconds: wait(seconds) — настоящее
+        ожидание (Condition, событие ОС), которое будит сразу по событию.
+        Под виртуальными часами — ctx.sleep: время сдвигается, а не ждётся.
+        """
+        if timing.clock().simulated:
+            self.sleep(seconds)
+        else:
+            wait(seconds)
+
+    @overload
+    def step_timeout(self, step: Dict[str, Any]) -> Optional[float]: ...
+
+    @overload
+    def step_timeout(self, step: Dict[str, Any], default: float) -> float: ...
+
+    def step_timeout(
+        self, step: Dict[str, Any], default: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Таймаут шага в секундах: step.timeout → run.timeout →
+        settings.defaults.timeout → default.
+        """
+        run = self.config.get("run") or {}
+        defaults = (self.config.get("settings") or {}).get("defaults") or {}
+        for raw in (step.get("timeout"), run.get("timeout"), defaults.get("timeout")):
+            seconds = parse_duration(raw)
+            if seconds:
+                return seconds
+        return default
@@ -0,0 +1,519 @@
+# -*- coding: utf-8 -*-
+"""
+Долгоживущий раннер: `runner serve` держит интерпретатор, модули действий,
+кэш шаблонов и mss-сессию прогретыми и исполняет задания из FIFO-очереди.
+`runner submit` — тонкий клиент. Правки configs/, scenarios/, *.assets/ и
+paths.assets_abs подхватываются без перезапуска (см. PlanCache).
+
+Протокол — JSON-строки (одна строка = одно сообщение) поверх TCP или
+Unix-сокета. Запрос:
+    {"op": "submit", "scenario": "...", "profile": null, "overrides": [],
+     "dry_run": false}
+    {"op": "status"}
+Ответ на submit — поток событий до "done":
+    {"event": "queued", "job": "...", "position": 0, "log": "..."}
+    {"event": "started", "job": "..."}
+    {"event": "log", "job": "...", "text": "..."}
+    {"event": "done", "job": "...", "status": "ok"|"failed"|"invalid",
+     "error": "...", "elapsed": 1.23}
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    IO,
+    Optional,
+    Protocol,
+    Set,
+    Tuple,
+    cast,
+)
+
+from rich.console import Console
+
+from .watch import Stamp, Watcher, file_stamp, make_watcher
+
+if TYPE_CHECKING:
+    from .plan import ScenarioPlan
+
+DEFAULT_ADDRESS = "tcp://127.0.0.1:8765"
+# сколько завершённых заданий помнит демон (status показывает последние 50)
+KEEP_FINISHED = 200
+
+
+def parse_address(addr: str) -> Tuple[str, Any]:
+    """
+    'tcp://host:port' | 'unix:///path/to.sock' | 'host:port'
+    -> ("tcp", (host, port)) | ("unix", path)
+    """
+    if addr.startswith("unix://"):
+        return "unix", addr[len("unix://") :]
+    if addr.startswith("tcp://"):
+        addr = addr[len("tcp://") :]
+    host, _, port = addr.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"bad listen address: {addr!r}")
+    return "tcp", (host, int(port))
+
+
+# ---------------------------- задания ----------------------------
+
+
+@dataclass
+class Job:
+    id: str
+    request: Dict[str, Any]
+    log_path: Path
+    status: str = "queued"  # queued|running|ok|failed|invalid
+    error: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    elapsed: Optional[float] = None
+    _subscribers: List["queue.Queue[Dict[str, Any]]"] = field(default_factory=list)
+    _final: Optional[Dict[str, Any]] = None  # событие "done", когда оно было
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in ("queued", "running")
+
+    def subscribe(self) -> "queue.Queue[Dict[str, Any]]":
+        """
+        Подписка на события задания. Подписчик, опоздавший к завершению,
+        сразу получает "done" — иначе он ждал бы его вечно.
+        """
+        q: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        with self._lock:
+            if self._final is not None:
+                q.put(self._final)
+            else:
+                self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: "queue.Queue[Dict[str, Any]]") -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def emit(self, event: str, **data: Any) -> None:
+        msg = {"event": event, "job": self.id, **data}
+        with self._lock:
+            subs = list(self._subscribers)
+            if event == "done":
+                self._final = msg
+                self._subscribers.clear()
+        for q in subs:
+            q.put(msg)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job": self.id,
+            "scenario": self.request.get("scenario"),
+            "status": self.status,
+            "error": self.error,
+            "elapsed": self.elapsed,
+            "log": str(self.log_path),
+        }
+
+
+class _JobStream(io.TextIOBase):
+    """
+    «Файл» для rich.Console: пишет в лог задания и транслирует
+    готовые строки подписчикам (клиенту submit).
+    """
+
+    def __init__(self, job: Job, fh: io.TextIOBase) -> None:
+        self._job = job
+        self._fh = fh
+        self._buf = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        self._fh.write(s)
+        self._buf += s
+        while "\n" in self._buf:
+            line, self._buf = self._buf.split("\n", 1)
+            self._job.emit("log", text=line)
+        return len(s)
+
+    def flush(self) -> None:
+        self._fh.flush()
+
+
+# ---------------------------- кэш конфигов/планов ----------------------------
+
+_IMAGE_EXT = {".png", ".jpg", ".jpeg", ".bmp"}
+_CacheKey = Tuple[str, Optional[str], Tuple[str, ...]]
+
+
+@dataclass
+class _Entry:
+    cfg: Dict[str, Any]
+    plan: Optional["ScenarioPlan"]
+    errors: List[str]
+    deps: Dict[Path, Optional[Stamp]]  # yaml-файлы, из которых собран cfg
+    asset_dirs: Tuple[Path, ...]  # где резолвятся картинки плана
+
+
+class PlanCache:
+    """
+    Разобранные конфиги и скомпилированные планы между заданиями.
+    Запись живёт, пока у её yaml-файлов не поменялись идентичность и mtime;
+    изменение картинки сбрасывает только её кэш шаблонов и планы,
+    резолвящие картинки в том же каталоге.
+    """
+
+    def __init__(self, project_root: Path, watcher: Optional[Watcher] = None) -> None:
+        self.project_root = project_root
+        self.watcher = watcher
+        self._entries: Dict[_CacheKey, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, req: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], "ScenarioPlan", List[str], bool]:
+        """-> (cfg, plan, ошибки валидации, было ли попадание в кэш)"""
+        from .dsl import load_config, resolve_paths, validate_scenario
+        from .plan import compile_plan
+
+        scenario = str(req["scenario"])
+        profile = req.get("profile")
+        overrides = tuple(str(o) for o in (req.get("overrides") or []))
+        key: _CacheKey = (scenario, profile, overrides)
+
+        with self._lock:
+            e = self._entries.get(key)
+        if e is not None and all(file_stamp(p) == st for p, st in e.deps.items()):
+            if e.plan is None:
+                e.plan = compile_plan(e.cfg)
+            return e.cfg, e.plan, e.errors, True
+
+        defaults_p, profile_p, scenario_p = resolve_paths(
+            self.project_root, scenario, profile
+        )
+        deps = {p: file_stamp(p) for p in (defaults_p, profile_p, scenario_p) if p}
+        cfg = load_config(self.project_root, scenario, profile, list(overrides))
+        errors = validate_scenario(cfg)
+        paths = cfg.get("paths") or {}
+        asset_dirs = tuple(
+            Path(paths[k]).resolve()
+            for k in ("scenario_assets", "scenario_dir", "assets_abs")
+            if paths.get(k)
+        )
+        e = _Entry(cfg, compile_plan(cfg), errors, deps, asset_dirs)
+        with self._lock:
+            self._entries[key] = e
+        if self.watcher is not None:
+            self.watcher.add(scenario_p.parent)
+            for d in asset_dirs:
+                if d.exists():
+                    self.watcher.add(d)
+        return e.cfg, cast("ScenarioPlan", e.plan), errors, False
+
+    def on_change(self, changed: Set[Path]) -> List[str]:
+        """Инвалидация по событиям наблюдателя. Возвращает описание сброшенного."""
+        dropped: List[str] = []
+        for raw in changed:
+            path = raw.resolve()
+            with self._lock:
+                for key, e in list(self._entries.items()):
+                    if path in e.deps:
+                        del self._entries[key]
+                        dropped.append(f"config {key[0]}")
+                    elif path.suffix.lower() in _IMAGE_EXT and e.plan is not None:
+                        if any(d in path.parents for d in e.asset_dirs):
+                            e.plan = None
+                            dropped.append(f"plan {key[0]}")
+            if path.suffix.lower() in _IMAGE_EXT:
+                from .vision import templates
+
+                if templates.invalidate(path):
+                    dropped.append(f"template {path.name}")
+        return dropped
+
+
+# ---------------------------- сервер ----------------------------
+
+
+class RunnerDaemon:
+    """
+    Очередь заданий + один рабочий поток. Сценарии исполняются строго
+    по очереди: рабочий стол один, параллельные клики друг другу мешают.
+    """
+
+    def __init__(
+        self,
+        project_root: Path,
+        log_dir: Optional[Path] = None,
+        console: Optional[Console] = None,
+        hot_reload: bool = True,
+    ) -> None:
+        self.project_root = project_root
+        self.log_dir = log_dir or (project_root / "artifacts" / "jobs")
+        self.console = console or Console()
+        self.watcher: Optional[Watcher] = (
+            make_watcher(self._on_files_changed) if hot_reload else None
+        )
+        self.cache = PlanCache(project_root, self.watcher)
+        self.jobs: Dict[str, Job] = {}
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._order: List[str] = []
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(
+            target=self._work, name="runner-worker", daemon=True
+        )
+
+    # ---- прогрев ----
+
+    def warm_up(self, console: Console) -> None:
+        """Импортируем все модули действий заранее — это и есть «тёплый» старт."""
+        from .actions import MANIFEST, REGISTRY
+
+        t0 = time.perf_counter()
+        failed: Dict[str, str] = {}
+        for name in MANIFEST:
+            try:
+                REGISTRY.get(name)
+            except Exception as e:  # например, WinAPI вне Windows
+                failed[MANIFEST[name].split(":", 1)[0]] = str(e)
+        dt = time.perf_counter() - t0
+        console.print(f"[dim]warm-up: actions loaded in {dt:.2f}s[/dim]")
+        for mod, err in failed.items():
+            console.print(f"[yellow]warm-up: {mod} unavailable: {err}[/]")
+
+    # ---- очередь ----
+
+    def start(self) -> None:
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        if self.watcher is not None:
+            for sub in ("configs", "scenarios"):
+                if (self.project_root / sub).exists():
+                    self.watcher.add(self.project_root / sub)
+            self.watcher.start()
+            self.console.print(f"[dim]hot reload: {type(self.watcher).__name__}[/dim]")
+        self._worker.start()
+
+    def stop(self) -> None:
+        if self.watcher is not None:
+            self.watcher.stop()
+        self._queue.put(None)
+
+    def _on_files_changed(self, changed: Set[Path]) -> None:
+        for what in self.cache.on_change(changed):
+            self.console.print(f"[dim]reload: {what}[/dim]")
+
+    def create(self, request: Dict[str, Any]) -> Job:
+        """Новое задание, ещё не в очереди: на него можно подписаться заранее."""
+        job_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        return Job(id=job_id, request=request, log_path=self.log_dir / f"{job_id}.log")
+
+    def enqueue(self, job: Job) -> int:
+        """Ставит задание в очередь; возвращает число заданий перед ним."""
+        with self._lock:
+            position = sum(1 for j in self.jobs.values() if not j.finished)
+            self.jobs[job.id] = job
+            self._order.append(job.id)
+            self._prune()
+        self._queue.put(job)
+        return position
+
+    def submit(self, request: Dict[str, Any]) -> Tuple[Job, int]:
+        job = self.create(request)
+        return job, self.enqueue(job)
+
+    def _prune(self) -> None:
+        """Забывает самые старые завершённые задания сверх KEEP_FINISHED."""
+        done = [j for j in self._order if self.jobs[j].finished]
+        extra = set(done[: max(0, len(done) - KEEP_FINISHED)])
+        if extra:
+            self._order = [j for j in self._order if j not in extra]
+            for j in extra:
+                del self.jobs[j]
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self.jobs[j].summary() for j in self._order[-50:]]
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run_job(job)
+
+    def _run_job(self, job: Job) -> None:
+        from .orchestrator import run_scenario
+
+        req = job.request
+        job.status = "running"
+        job.emit("started")
+        t0 = time.perf_counter()
+        with job.log_path.open("w", encoding="utf-8") as fh:
+            stream = cast(IO[str], _JobStream(job, fh))
+            console = Console(file=stream, width=100, force_terminal=False)
+            try:
+                cfg, plan, errors, cached = self.cache.get(req)
+                console.print(f"[dim]config: {'cached' if cached else 'loaded'}[/dim]")
+                if errors:
+                    for e in errors:
+                        console.print(f" - {e}")
+                    job.status = "invalid"
+                    job.error = "; ".join(errors)
+                else:
+                    run_scenario(
+                        cfg,
+                        dry_run=bool(req.get("dry_run")),
+                        plan=plan,
+                        console=console,
+                    )
+                    job.status = "ok"
+            except Exception as e:
+                console.print(traceback.format_exc().rstrip())
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+        job.elapsed = time.perf_counter() - t0
+        job.emit("done", status=job.status, error=job.error, elapsed=job.elapsed)
+        with self._lock:
+            self._prune()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, msg: Dict[str, Any]) -> None:
+        self.wfile.write((json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        raw = self.rfile.readline()
+        if not raw:
+            return
+        try:
+            req = json.loads(raw.decode("utf-8"))
+        except ValueError as e:
+            self._send({"event": "error", "error": f"bad request: {e}"})
+            return
+
+        daemon = cast(_DaemonServer, self.server).daemon_ref
+        op = req.get("op")
+        if op == "status":
+            self._send({"event": "status", "jobs": daemon.status()})
+            return
+        if op != "submit" or not req.get("scenario"):
+            self._send({"event": "error", "error": f"unknown op: {op!r}"})
+            return
+
+        # подписываемся до постановки в очередь: быстрое задание не успеет
+        # разослать события (и "done") раньше, чем клиент их ждёт
+        job = daemon.create(req)
+        events = job.subscribe()
+        position = daemon.enqueue(job)
+        try:
+            self._send(
+                {
+                    "event": "queued",
+                    "job": job.id,
+                    "position": position,
+                    "log": str(job.log_path),
+                }
+            )
+            if req.get("detach"):
+                return
+            while True:
+                msg = events.get()
+                self._send(msg)
+                if msg["event"] == "done":
+                    return
+        except OSError:
+            pass  # клиент отвалился — задание продолжает выполняться
+        finally:
+            job.unsubscribe(events)
+
+
+class _DaemonServer(Protocol):
+    """Сервер, который обслуживает демон (так его видит _Handler)."""
+
+    daemon_ref: RunnerDaemon
+
+
+class _ServerMixin:
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _TCPServer(_ServerMixin, socketserver.ThreadingTCPServer):
+    daemon_ref: RunnerDaemon
+
+
+# unix-сокеты socketserver есть везде, кроме Windows
+if sys.platform != "win32":
+
+    class _UnixServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+        daemon_ref: RunnerDaemon
+
+
+def serve(project_root: Path, address: str, console: Console) -> None:
+    """Блокирующий цикл сервера (Ctrl+C — остановка)."""
+    kind, addr = parse_address(address)
+    daemon = RunnerDaemon(project_root, console=console)
+    daemon.warm_up(console)
+    daemon.start()
+
+    server: socketserver.BaseServer
+    if kind == "tcp":
+        server = _TCPServer(addr, _Handler)
+    elif sys.platform != "win32":
+        if os.path.exists(addr):
+            os.unlink(addr)
+        server = _UnixServer(addr, _Handler)
+    else:
+        raise RuntimeError("unix sockets are not supported on this platform")
+    cast(_DaemonServer, server).daemon_ref = daemon
+
+    console.print(f"[green]runner serve[/]: listening on {address}")
+    try:
+        server.serve_forever(poll_interval=0.2)
+    except KeyboardInterrupt:
+        console.print("[dim]stopping…[/dim]")
+    finally:
+        server.server_close()
+        daemon.stop()
+        if kind == "unix" and os.path.exists(addr):
+            os.unlink(addr)
+
+
+# ---------------------------- клиент ----------------------------
+
+
+def request(address: str, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Отправляет запрос демону и отдаёт поток ответных сообщений."""
+    kind, addr = parse_address(address)
+    if kind == "unix":
+        sock = socket.socket(getattr(socket, "AF_UNIX"), socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    with sock:
+        sock.connect(addr)
+        sock.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as rf:
+            for line in rf:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Рабочий стол, с которым работают действия: захват экрана, окна, мышь,
+клавиатура, буфер обмена и запуск GUI-программ.
+
+  - native (по умолчанию) — mss + user32 + pyautogui/SendInput + pyperclip;
+  - sim — синтетический рабочий стол (desktop.sim.SimDesktop): кадры из
+    numpy-буфера, окна и реакции из описания, ввод записывается.
+
+Подменяется на время прогона (use_desktop), как часы в utils.timing.
+Модуль лёгкий: WinAPI/mss/pyautogui грузит только native при первом
+обращении, поэтому действия импортируются и на машине без GUI.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+Rect = Tuple[int, int, int, int]
+# (hwnd, title, class) — видимые окна с заголовком, верхние первыми
+WindowInfo = Tuple[int, str, str]
+
+
+class Desktop:
+    """Интерфейс рабочего стола; реализации — native и sim."""
+
+    name = "base"
+
+    # --- экран ---
+    def screen_rect(self) -> Rect:
+        raise NotImplementedError
+
+    def grab(self, bbox: Rect) -> "np.ndarray":
+        """Кадр bbox=(left, top, width, height) в BGR."""
+        raise NotImplementedError
+
+    # --- окна ---
+    def windows(self) -> List[WindowInfo]:
+        raise NotImplementedError
+
+    def find_window(self, match: Callable[[WindowInfo], bool]) -> Optional[WindowInfo]:
+        """Первое подходящее окно; реализация может не перечислять остальные."""
+        return next((w for w in self.windows() if match(w)), None)
+
+    def foreground(self) -> int:
+        raise NotImplementedError
+
+    def client_rect(self, hwnd: int) -> Rect:
+        raise NotImplementedError
+
+    def focus(self, hwnd: int) -> bool:
+        raise NotImplementedError
+
+    # --- мышь и клавиатура ---
+    def move(self, x: int, y: int, duration: float = 0.0) -> None:
+        raise NotImplementedError
+
+    def click(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def write(self, text: str) -> None:
+        """Печать клавишами раскладки (pyautogui.write)."""
+        raise NotImplementedError
+
+    def send_unicode(self, text: str, per_char_delay: float = 0.0) -> None:
+        """Печать Unicode-символами (SendInput KEYEVENTF_UNICODE)."""
+        raise NotImplementedError
+
+    def press(self, key: str) -> None:
+        raise NotImplementedError
+
+    def hotkey(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def clipboard_get(self) -> Optional[str]:
+        raise NotImplementedError
+
+    def clipboard_set(self, text: str) -> None:
+        raise NotImplementedError
+
+    # --- программы ---
+    def provides(self, path: str) -> bool:
+        """Программу path запускает сам рабочий стол (без файла на диске)."""
+        return False
+
+    def spawn(self, cmd: Sequence[str]) -> Optional[int]:
+        """Перехват запуска: pid — запустил сам; None — обычный Popen."""
+        return None
+
+
+_desktop: Optional[Desktop] = None
+
+
+def current() -> Desktop:
+    global _desktop
+    if _desktop is None:
+        from .native import NativeDesktop
+
+        _desktop = NativeDesktop()
+    return _desktop
+
+
+def installed() -> Optional[Desktop]:
+    """
+    Уже выбранный рабочий стол или None. Для запуска программ: настоящий
+    стол ничего не перехватывает, и грузить ради этого pyautogui/mss незачем.
+    """
+    return _desktop
+
+
+def set_desktop(new: Optional[Desktop]) -> Optional[Desktop]:
+    """Подменяет рабочий стол процесса, возвращает прежний (None — native)."""
+    global _desktop
+    prev, _desktop = _desktop, new
+    return prev
+
+
+@contextmanager
+def use_desktop(new: Desktop) -> Iterator[Desktop]:
+    prev = set_desktop(new)
+    try:
+        yield new
+    finally:
+        set_desktop(prev)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Настоящий рабочий стол Windows: mss (захват), user32 (окна, SendInput),
+pyautogui (мышь, клавиши), pyperclip (буфер обмена).
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, List, Optional
+
+import mss
+import numpy as np
+import pyautogui as pag
+import pyperclip
+
+from ..utils import win_unicode, win_window
+from . import Desktop, Rect, WindowInfo
+
+pag.FAILSAFE = False
+
+
+class NativeDesktop(Desktop):
+    name = "native"
+
+    def __init__(self) -> None:
+        # mss-сессия живёт в потоке: открывать её на каждый кадр дороже захвата
+        self._local = threading.local()
+
+    def _session(self) -> "mss.base.MSSBase":
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def screen_rect(self) -> Rect:
+        mon = self._session().monitors[0]
+        return mon["left"], mon["top"], mon["width"], mon["height"]
+
+    def grab(self, bbox: Rect) -> np.ndarray:
+        left, top, width, height = bbox
+        region = {
+            "left": int(left),
+            "top": int(top),
+            "width": int(width),
+            "height": int(height),
+        }
+        shot = self._session().grab(region)  # BGRA
+        arr = np.array(shot, dtype=np.uint8)
+        return arr[:, :, :3]  # BGR
+
+    def windows(self) -> List[WindowInfo]:
+        return win_window.enum_windows()
+
+    def find_window(self, match: Callable[[WindowInfo], bool]) -> Optional[WindowInfo]:
+        return win_window.find_window(match)
+
+    def foreground(self) -> int:
+        return win_window.get_foreground_hwnd()
+
+    def client_rect(self, hwnd: int) -> Rect:
+        return win_window.get_client_rect_abs(hwnd)
+
+    def focus(self, hwnd: int) -> bool:
+        return win_window.focus_window(hwnd)
+
+    def move(self, x: int, y: int, duration: float = 0.0) -> None:
+        pag.moveTo(x, y, duration=duration)
+
+    def click(self, x: int, y: int) -> None:
+        pag.click(x, y)
+
+    def write(self, text: str) -> None:
+        pag.write(text)
+
+    def send_unicode(self, text: str, per_char_delay: float = 0.0) -> None:
+        if len(text) == 1 and text != "\n":
+            win_unicode.send_unicode_char(text)
+        else:
+            win_unicode.send_unicode_text(text, per_char_delay=per_char_delay)
+
+    def press(self, key: str) -> None:
+        pag.press(key)
+
+    def hotkey(self, *keys: str) -> None:
+        pag.hotkey(*keys)
+
+    def clipboard_get(self) -> Optional[str]:
+        return pyperclip.paste()
+
+    def clipboard_set(self, text: str) -> None:
+        pyperclip.copy(text)
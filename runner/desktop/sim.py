@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+"""
+Синтетический рабочий стол: сценарии целиком, без GUI (CI, бенчмарки).
+
+  - окна (заголовок, класс, клиентская область, заливка, картинки-элементы)
+    складываются в numpy-кадр, grab отдаёт из него вырезки;
+  - перечисление окон, foreground и фокус — по этой модели;
+  - клики, клавиши, набранный текст и запуски записываются в events;
+  - реакции: "на клик по элементу через 200 мс показать окно" и т.п.
+    Время реакций — по utils.timing, так что с VirtualClock прогон
+    проходит мгновенно, а задержки интерфейса всё равно учитываются.
+
+Описание (yaml; пути картинок — от файла описания):
+
+  screen: [1920, 1080]
+  background: "#202020"
+  programs: [notepad.exe]          # запуск перехватывается, файла не нужно
+  windows:
+    - id: notepad
+      title: "Безымянный — Блокнот"
+      class: Notepad
+      rect: [200, 120, 960, 640]   # клиентская область, экранные координаты
+      fill: "#ffffff"
+      visible: false
+      elements:
+        - {id: menu_file, image: menu_file.png, at: [8, 4]}
+  reactions:
+    - when: spawn                  # start|spawn|click|key|hotkey|text|focus
+      target: notepad.exe          # программа | id элемента/окна | клавиша | текст
+      after: 300ms
+      once: true
+      do: [{show: notepad}, {focus: notepad}]
+
+Эффекты: show, hide, focus (id окна); title: {window, text};
+add: {window, id, image, at}; remove: id элемента; clear_text: id окна.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+import yaml
+
+from ..utils import timing
+from ..utils.timeparse import parse_duration
+from . import Desktop, Rect, WindowInfo
+
+BGR = Tuple[int, int, int]
+_EVENTS = ("start", "spawn", "click", "key", "hotkey", "text", "focus")
+
+
+def _bgr(color: Any) -> BGR:
+    """'#RRGGBB' | [r, g, b] → (b, g, r)."""
+    if isinstance(color, str):
+        c = color.lstrip("#")
+        if len(c) != 6:
+            raise ValueError(f"sim: bad color {color!r}")
+        r, g, b = int(c[0:2], 16), int(c[2:4], 16), int(c[4:6], 16)
+    else:
+        r, g, b = (int(v) for v in color)
+    return b, g, r
+
+
+@dataclass
+class SimElement:
+    id: str
+    image: np.ndarray  # BGR
+    at: Tuple[int, int]  # от левого верхнего угла клиентской области
+
+
+@dataclass
+class SimWindow:
+    id: str
+    hwnd: int
+    title: str
+    cls: str
+    rect: Rect
+    fill: BGR
+    visible: bool = True
+    elements: List[SimElement] = field(default_factory=list)
+    text: str = ""  # всё, что в окно напечатали
+
+
+@dataclass
+class Reaction:
+    on: str
+    target: str
+    effects: List[Dict[str, Any]]
+    after: float = 0.0
+    once: bool = False
+    fired: int = 0
+
+
+class SimDesktop(Desktop):
+    name = "sim"
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = (1920, 1080),
+        background: Any = "#202020",
+        base_dir: Optional[Path] = None,
+    ) -> None:
+        self.size = (int(size[0]), int(size[1]))
+        self.background = _bgr(background)
+        self.base_dir = base_dir or Path.cwd()
+        self.clipboard: Optional[str] = ""
+        self.mouse: Tuple[int, int] = (0, 0)
+        self.events: List[Tuple[float, str, Any]] = []  # (время, вид, детали)
+        self.frames = 0
+
+        self._lock = threading.RLock()
+        self._windows: Dict[str, SimWindow] = {}
+        self._z: List[str] = []  # снизу вверх
+        self._focus: Optional[str] = None
+        self._programs: Dict[str, int] = {}  # имя exe → сколько раз запущено
+        self._reactions: List[Reaction] = []
+        self._pending: List[Tuple[float, int, List[Dict[str, Any]]]] = []
+        self._seq = itertools.count()
+        self._hwnds = itertools.count(0x10010, 0x10)
+        self._pids = itertools.count(40000, 4)
+        self._frame: Optional[np.ndarray] = None
+        self._started = False
+
+    # ------------------------------------------------------------------
+    # построение
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "SimDesktop":
+        p = Path(path)
+        spec = yaml.safe_load(p.read_text(encoding="utf-8")) or {}
+        return cls.from_spec(spec, base_dir=p.parent)
+
+    @classmethod
+    def from_spec(
+        cls, spec: Dict[str, Any], base_dir: Optional[Path] = None
+    ) -> "SimDesktop":
+        sim = cls(
+            size=tuple(spec.get("screen") or (1920, 1080)),  # type: ignore[arg-type]
+            background=spec.get("background", "#202020"),
+            base_dir=base_dir,
+        )
+        for name in spec.get("programs") or []:
+            sim.add_program(str(name))
+        for w in spec.get("windows") or []:
+            sim.add_window(
+                str(w["id"]),
+                title=str(w.get("title", "")),
+                cls=str(w.get("class", "")),
+                rect=tuple(w.get("rect") or (0, 0, 640, 480)),  # type: ignore[arg-type]
+                fill=w.get("fill", "#ffffff"),
+                visible=bool(w.get("visible", True)),
+            )
+            for el in w.get("elements") or []:
+                sim.add_element(str(w["id"]), str(el["id"]), el["image"], el["at"])
+        for r in spec.get("reactions") or []:
+            sim.on(
+                str(r["when"]),  # не "on": в YAML 1.1 это True
+                str(r.get("target", "")),
+                list(r.get("do") or []),
+                after=parse_duration(r.get("after")) or 0.0,
+                once=bool(r.get("once", False)),
+            )
+        return sim
+
+    def add_program(self, name: str) -> None:
+        self._programs.setdefault(Path(name).name.lower(), 0)
+
+    def add_window(
+        self,
+        wid: str,
+        *,
+        title: str,
+        cls: str = "",
+        rect: Rect = (0, 0, 640, 480),
+        fill: Any = "#ffffff",
+        visible: bool = True,
+    ) -> SimWindow:
+        with self._lock:
+            if wid in self._windows:
+                raise ValueError(f"sim: duplicate window id {wid!r}")
+            win = SimWindow(
+                id=wid,
+                hwnd=next(self._hwnds),
+                title=title,
+                cls=cls,
+                rect=tuple(int(v) for v in rect),  # type: ignore[arg-type]
+                fill=_bgr(fill),
+                visible=visible,
+            )
+            self._windows[wid] = win
+            self._z.append(wid)
+            if visible and self._focus is None:
+                self._focus = wid
+            self._frame = None
+            return win
+
+    def add_element(
+        self,
+        window: str,
+        eid: str,
+        image: Union[str, Path, np.ndarray],
+        at: Sequence[int],
+    ) -> SimElement:
+        img = self._load_image(image)
+        el = SimElement(id=eid, image=img, at=(int(at[0]), int(at[1])))
+        with self._lock:
+            self._window(window).elements.append(el)
+            self._frame = None
+        return el
+
+    def _load_image(self, image: Union[str, Path, np.ndarray]) -> np.ndarray:
+        if isinstance(image, np.ndarray):
+            return image[:, :, :3] if image.ndim == 3 else cv2.merge([image] * 3)
+        path = Path(image)
+        if not path.is_absolute():
+            path = self.base_dir / path
+        img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if img is None:
+            raise FileNotFoundError(f"sim: image not found: {path}")
+        return img
+
+    def _preload(self, eff: Dict[str, Any]) -> Dict[str, Any]:
+        """Картинка эффекта add читается один раз, а не при каждой реакции."""
+        add = eff.get("add")
+        if not isinstance(add, dict):
+            return eff
+        return {**eff, "add": {**add, "image": self._load_image(add["image"])}}
+
+    def on(
+        self,
+        event: str,
+        target: str,
+        effects: List[Dict[str, Any]],
+        *,
+        after: float = 0.0,
+        once: bool = False,
+    ) -> Reaction:
+        if event not in _EVENTS:
+            raise ValueError(f"sim: unknown event {event!r} (one of {_EVENTS})")
+        effects = [self._preload(eff) for eff in effects]
+        r = Reaction(event, target.lower(), effects, after=after, once=once)
+        with self._lock:
+            self._reactions.append(r)
+        return r
+
+    # ------------------------------------------------------------------
+    # модель
+    # ------------------------------------------------------------------
+    def _window(self, wid: str) -> SimWindow:
+        try:
+            return self._windows[wid]
+        except KeyError:
+            raise KeyError(f"sim: unknown window {wid!r}") from None
+
+    def _by_hwnd(self, hwnd: int) -> Optional[SimWindow]:
+        for w in self._windows.values():
+            if w.hwnd == int(hwnd):
+                return w
+        return None
+
+    def window(self, wid: str) -> SimWindow:
+        with self._lock:
+            self._settle()
+            return self._window(wid)
+
+    def _record(self, kind: str, detail: Any) -> None:
+        self.events.append((timing.now(), kind, detail))
+
+    def _emit(self, event: str, *targets: str) -> None:
+        keys = {t.lower() for t in targets}
+        for r in self._reactions:
+            if r.on != event or r.target not in keys or (r.once and r.fired):
+                continue
+            r.fired += 1
+            if r.after > 0:
+                due = timing.now() + r.after
+                heapq.heappush(self._pending, (due, next(self._seq), r.effects))
+            else:
+                self._apply(r.effects)
+
+    def _settle(self) -> None:
+        """Применяет реакции, чьё время подошло (по часам utils.timing)."""
+        if not self._started:
+            self._started = True
+            self._emit("start", "")
+        now = timing.now()
+        while self._pending and self._pending[0][0] <= now:
+            _, _, effects = heapq.heappop(self._pending)
+            self._apply(effects)
+
+    def _apply(self, effects: List[Dict[str, Any]]) -> None:
+        for eff in effects:
+            for kind, arg in eff.items():
+                self._apply_one(kind, arg)
+        self._frame = None
+
+    def _apply_one(self, kind: str, arg: Any) -> None:
+        if kind == "show":
+            self._window(str(arg)).visible = True
+            self._raise(str(arg))
+        elif kind == "hide":
+            win = self._window(str(arg))
+            win.visible = False
+            if self._focus == win.id:
+                self._focus = next(
+                    (w for w in reversed(self._z) if self._windows[w].visible), None
+                )
+        elif kind == "focus":
+            self._raise(str(arg))
+            self._focus = str(arg)
+        elif kind == "title":
+            self._window(str(arg["window"])).title = str(arg["text"])
+        elif kind == "add":
+            wid, eid = str(arg["window"]), str(arg["id"])
+            self.add_element(wid, eid, arg["image"], arg["at"])
+        elif kind == "remove":
+            for w in self._windows.values():
+                w.elements = [e for e in w.elements if e.id != str(arg)]
+        elif kind == "clear_text":
+            self._window(str(arg)).text = ""
+        else:
+            raise ValueError(f"sim: unknown effect {kind!r}")
+
+    def _raise(self, wid: str) -> None:
+        self._z.remove(wid)
+        self._z.append(wid)
+        self._frame = None
+
+    def _render(self) -> np.ndarray:
+        if self._frame is not None:
+            return self._frame
+        sw, sh = self.size
+        frame = np.empty((sh, sw, 3), dtype=np.uint8)
+        frame[:] = self.background
+        for wid in self._z:
+            w = self._windows[wid]
+            if not w.visible:
+                continue
+            left, top, width, height = w.rect
+            _blit_fill(frame, left, top, width, height, w.fill)
+            for el in w.elements:
+                _blit(frame, el.image, left + el.at[0], top + el.at[1], w.rect)
+        self._frame = frame
+        return frame
+
+    def _hit(self, x: int, y: int) -> Tuple[Optional[SimWindow], Optional[SimElement]]:
+        for wid in reversed(self._z):
+            w = self._windows[wid]
+            left, top, width, height = w.rect
+            if not w.visible or not (
+                left <= x < left + width and top <= y < top + height
+            ):
+                continue
+            for el in reversed(w.elements):
+                eh, ew = el.image.shape[:2]
+                ex, ey = left + el.at[0], top + el.at[1]
+                if ex <= x < ex + ew and ey <= y < ey + eh:
+                    return w, el
+            return w, None
+        return None, None
+
+    def _type(self, ch: str) -> None:
+        self._record("type", ch)
+        win = self._windows.get(self._focus or "")
+        if win is None:
+            return
+        win.text += ch
+        typed = win.text.lower()
+        hits = {r.target for r in self._reactions if r.on == "text" and r.target}
+        for target in hits:
+            if typed.endswith(target):
+                self._emit("text", target)
+
+    # ------------------------------------------------------------------
+    # Desktop
+    # ------------------------------------------------------------------
+    def screen_rect(self) -> Rect:
+        return 0, 0, self.size[0], self.size[1]
+
+    def grab(self, bbox: Rect) -> np.ndarray:
+        left, top, width, height = (int(v) for v in bbox)
+        out = np.zeros((max(0, height), max(0, width), 3), dtype=np.uint8)
+        with self._lock:
+            self._settle()
+            frame = self._render()
+            self.frames += 1
+            sh, sw = frame.shape[:2]
+            x0, y0 = max(0, left), max(0, top)
+            x1, y1 = min(sw, left + width), min(sh, top + height)
+            if x1 > x0 and y1 > y0:
+                out[y0 - top : y1 - top, x0 - left : x1 - left] = frame[y0:y1, x0:x1]
+        return out
+
+    def windows(self) -> List[WindowInfo]:
+        with self._lock:
+            self._settle()
+            return [
+                (w.hwnd, w.title, w.cls)
+                for w in (self._windows[wid] for wid in reversed(self._z))
+                if w.visible and w.title
+            ]
+
+    def foreground(self) -> int:
+        with self._lock:
+            self._settle()
+            win = self._windows.get(self._focus or "")
+            return win.hwnd if win is not None and win.visible else 0
+
+    def client_rect(self, hwnd: int) -> Rect:
+        with self._lock:
+            win = self._by_hwnd(hwnd)
+            if win is None:
+                raise RuntimeError(f"sim: no window with hwnd={hwnd:#x}")
+            return win.rect
+
+    def focus(self, hwnd: int) -> bool:
+        with self._lock:
+            self._settle()
+            win = self._by_hwnd(hwnd)
+            if win is None or not win.visible:
+                return False
+            self._raise(win.id)
+            self._focus = win.id
+            self._record("focus", win.id)
+            self._emit("focus", win.id)
+            return True
+
+    def move(self, x: int, y: int, duration: float = 0.0) -> None:
+        if duration > 0:
+            timing.sleep(duration)  # указатель едет столько же, сколько в жизни
+        with self._lock:
+            self.mouse = (int(x), int(y))
+            self._record("move", self.mouse)
+
+    def click(self, x: int, y: int) -> None:
+        with self._lock:
+            self._settle()
+            self.mouse = (int(x), int(y))
+            win, el = self._hit(int(x), int(y))
+            self._record("click", (int(x), int(y), el.id if el else None))
+            if win is None:
+                return
+            if self._focus != win.id:
+                self._raise(win.id)
+                self._focus = win.id
+            self._emit("click", win.id, *((el.id,) if el else ()))
+
+    def write(self, text: str) -> None:
+        with self._lock:
+            for ch in text:
+                self._type(ch)
+
+    def send_unicode(self, text: str, per_char_delay: float = 0.0) -> None:
+        for ch in text.replace("\r", "\n"):
+            with self._lock:
+                self._type(ch)
+            if per_char_delay > 0:
+                timing.sleep(per_char_delay)
+
+    def press(self, key: str) -> None:
+        with self._lock:
+            self._settle()
+            k = key.lower()
+            self._record("key", k)
+            win = self._windows.get(self._focus or "")
+            if win is not None:
+                if k == "backspace":
+                    win.text = win.text[:-1]
+                elif k == "enter":
+                    win.text += "\n"
+            self._emit("key", k)
+
+    def hotkey(self, *keys: str) -> None:
+        with self._lock:
+            self._settle()
+            combo = "+".join(k.lower() for k in keys)
+            self._record("hotkey", combo)
+            if combo == "ctrl+v" and self.clipboard:
+                for ch in self.clipboard:
+                    self._type(ch)
+            self._emit("hotkey", combo)
+
+    def clipboard_get(self) -> Optional[str]:
+        return self.clipboard
+
+    def clipboard_set(self, text: str) -> None:
+        self.clipboard = text
+
+    def provides(self, path: str) -> bool:
+        return Path(path.replace("\\", "/")).name.lower() in self._programs
+
+    def spawn(self, cmd: Sequence[str]) -> Optional[int]:
+        name = Path(str(cmd[0]).replace("\\", "/")).name.lower()
+        with self._lock:
+            if name not in self._programs:
+                return None
+            self._programs[name] += 1
+            self._record("spawn", list(cmd))
+            self._emit("spawn", name)
+            return next(self._pids)
+
+    # ------------------------------------------------------------------
+    def summary(self) -> Dict[str, int]:
+        """Сколько чего произошло: кадры, клики, клавиши, символы, запуски."""
+        with self._lock:
+            out = {"frames": self.frames}
+            for _, kind, _ in self.events:
+                out[kind] = out.get(kind, 0) + 1
+            return out
+
+
+def _blit_fill(frame: np.ndarray, x: int, y: int, w: int, h: int, color: BGR) -> None:
+    sh, sw = frame.shape[:2]
+    x0, y0, x1, y1 = max(0, x), max(0, y), min(sw, x + w), min(sh, y + h)
+    if x1 > x0 and y1 > y0:
+        frame[y0:y1, x0:x1] = color
+
+
+def _blit(frame: np.ndarray, img: np.ndarray, x: int, y: int, clip: Rect) -> None:
+    """Картинка в кадр, обрезанная по клиентской области окна и по экрану."""
+    sh, sw = frame.shape[:2]
+    cl, ct, cw, ch = clip
+    ih, iw = img.shape[:2]
+    x0, y0 = max(x, cl, 0), max(y, ct, 0)
+    x1, y1 = min(x + iw, cl + cw, sw), min(y + ih, ct + ch, sh)
+    if x1 > x0 and y1 > y0:
+        frame[y0:y1, x0:x1] = img[y0 - y : y1 - y, x0 - x : x1 - x]
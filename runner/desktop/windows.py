@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Окна через текущий рабочий стол (native или sim) с общим снимком списка.
+
+  - snapshot(max_age) — список окон не старше max_age: параллельные
+    ветки и условия window_exists в одной гонке делят одно перечисление;
+  - find(match, max_age) — первое подходящее окно: из свежего снимка,
+    а если его нет — перечислением с ранним выходом (native останавливает
+    EnumWindows на первом совпадении). Перечисление без совпадения обошло
+    все окна — оно и становится снимком для остальных опросов;
+  - invalidate() — после собственных действий с окнами (фокус).
+
+Время — по utils.timing, так что TTL работает и с виртуальными часами;
+снимок помнит часы, по которым снят, и после их смены (timing.use_clock)
+считается устаревшим — отметки разных часов несравнимы.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils import timing
+from ..utils.timeparse import parse_duration
+from . import Desktop, WindowInfo, current
+
+# окна появляются/исчезают за десятки-сотни мс; 50 мс — почти бесплатно
+DEFAULT_TTL = 0.05
+
+_lock = threading.Lock()
+_snap: Optional[List[WindowInfo]] = None
+_snap_at = 0.0
+_snap_of: Optional[Desktop] = None
+_snap_clock: Optional[timing.Clock] = None
+_stats: Dict[str, int] = {"full": 0, "early": 0, "cached": 0}
+
+
+def ttl_for(config: Dict[str, Any]) -> float:
+    """window.snapshot_ttl из конфига (0 — снимок не переиспользуется)."""
+    ttl = parse_duration((config.get("window") or {}).get("snapshot_ttl"))
+    return DEFAULT_TTL if ttl is None else ttl
+
+
+def _fresh(desk: Desktop, max_age: float) -> Optional[List[WindowInfo]]:
+    if _snap is None or _snap_of is not desk or _snap_clock is not timing.clock():
+        return None
+    if timing.now() - _snap_at > max_age:
+        return None
+    return _snap
+
+
+def snapshot(max_age: float = DEFAULT_TTL) -> List[WindowInfo]:
+    """Видимые окна с заголовком (верхние первыми), не старше max_age секунд."""
+    global _snap, _snap_at, _snap_of, _snap_clock
+    desk = current()
+    with _lock:
+        snap = _fresh(desk, max_age)
+        if snap is not None:
+            _stats["cached"] += 1
+            return snap
+    items = desk.windows()
+    with _lock:
+        _snap, _snap_at, _snap_of = items, timing.now(), desk
+        _snap_clock = timing.clock()
+        _stats["full"] += 1
+    return items
+
+
+def find(
+    match: Callable[[WindowInfo], bool], max_age: float = DEFAULT_TTL
+) -> Optional[WindowInfo]:
+    global _snap, _snap_at, _snap_of, _snap_clock
+    desk = current()
+    with _lock:
+        snap = _fresh(desk, max_age)
+        if snap is not None:
+            _stats["cached"] += 1
+    if snap is not None:
+        return next((w for w in snap if match(w)), None)
+
+    seen: List[WindowInfo] = []
+
+    def _visit(info: WindowInfo) -> bool:
+        seen.append(info)
+        return match(info)
+
+    hit = desk.find_window(_visit)
+    with _lock:
+        if hit is None:
+            # не нашли — значит, обошли все окна: это и есть полный снимок
+            _snap, _snap_at, _snap_of = seen, timing.now(), desk
+            _snap_clock = timing.clock()
+            _stats["full"] += 1
+        else:
+            _stats["early"] += 1
+    return hit
+
+
+def invalidate() -> None:
+    global _snap
+    with _lock:
+        _snap = None
+
+
+def stats() -> Dict[str, int]:
+    """Сколько было полных перечислений, с ранним выходом и попаданий в снимок."""
+    with _lock:
+        return dict(_stats)
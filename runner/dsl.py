@@ -1,24 +1,31 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, cast
+from typing import Any, Dict, Iterator, List, Mapping, Tuple, Union
 import json
 import re
 
 import yaml
-from jinja2 import Environment, StrictUndefined
+from jinja2 import Environment, StrictUndefined, Template
+from .actions import BRANCH_KEYS, is_known_action, iter_blocks
 from .utils.paths import ensure_paths_in_config
 
-
 # ---------- базовые utils ----------
 
 
 def _deep_merge(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Иммутабельный глубинный мердж: возвращает новый словарь.
+    Иммутабельный глубинный мердж с copy-on-write: входы не меняются,
+    копируются только словари на пути пересечения ключей, остальные
+    поддеревья (в т.ч. списки steps) переиспользуются по ссылке.
     Значения из b перекрывают a.
     """
+    if not b:
+        return a
+    if not a:
+        return b
     out = dict(a)
     for k, v in b.items():
         if k in out and isinstance(out[k], dict) and isinstance(v, dict):
@@ -83,12 +90,68 @@ def parse_overrides(pairs: List[str]) -> Dict[str, Any]:
     return root
 
 
+# libyaml (C) в разы быстрее чистого Python-лоадера; если его нет — fallback
+_YamlLoader: Any = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# путь -> ((mtime_ns, size), документ)
+_yaml_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
 def load_yaml(path: Path) -> Dict[str, Any]:
+    """
+    Разбор YAML с кэшем по (путь, mtime, размер). Возвращаемый документ
+    общий для всех вызовов — его нельзя менять на месте.
+    """
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = str(path)
+    hit = _yaml_cache.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
     with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = yaml.load(f, Loader=_YamlLoader) or {}
         if not isinstance(data, dict):
             raise ValueError(f"YAML root must be a mapping: {path}")
-        return data
+    _yaml_cache[key] = (stamp, data)
+    return data
+
+
+# путь внутри документа: ("steps", 0, "then", 1, ...)
+DocPath = Tuple[Union[str, int], ...]
+
+
+def iter_unknown_actions(
+    steps: List[Any], path: DocPath = ("steps",)
+) -> Iterator[Tuple[DocPath, str]]:
+    """
+    Имена действий сверяем с манифестом (без импорта кода действий),
+    рекурсивно по вложенным блокам then/else/try/branches/...
+    Отдаёт (путь к шагу, имя действия).
+    """
+    for i, st in enumerate(steps):
+        if not isinstance(st, dict):
+            continue
+        action = st.get("action")
+        if action is not None and not is_known_action(str(action)):
+            yield path + (i,), str(action)
+        for sub_path, sub in iter_blocks(st):
+            yield from iter_unknown_actions(sub, path + (i,) + sub_path)
+
+
+def _step_label(path: DocPath) -> str:
+    """("steps", 0, "then", 1) -> "step #1.then › step #2"."""
+    parts: List[str] = []
+    branch = False
+    for item in path[1:]:
+        if isinstance(item, int) and branch:
+            parts[-1] += f" #{item + 1}"  # номер ветки parallel
+            branch = False
+        elif isinstance(item, int):
+            parts.append(f"step #{item + 1}")
+        elif item != "steps":
+            parts[-1] += f".{item}"
+            branch = item in BRANCH_KEYS
+    return " › ".join(parts)
 
 
 def validate_scenario(doc: Dict[str, Any]) -> List[str]:
@@ -107,6 +170,8 @@ def validate_scenario(doc: Dict[str, Any]) -> List[str]:
                 errors.append(f"step #{i} missing 'action'")
             if "name" not in st:
                 errors.append(f"step #{i} missing 'name'")
+        for path, action in iter_unknown_actions(steps):
+            errors.append(f"{_step_label(path)}: unknown action '{action}'")
     return errors
 
 
@@ -137,27 +202,62 @@ def resolve_paths(
     return defaults, prof, s
 
 
-def _render_templates(cfg: Dict[str, Any]) -> Dict[str, Any]:
+# одно окружение на процесс; скомпилированные шаблоны кэшируются по исходнику
+_jinja_env = Environment(undefined=StrictUndefined)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(source: str) -> Template:
+    return _jinja_env.from_string(source)
+
+
+def has_template(x: Any) -> bool:
+    """Есть ли в значении (рекурсивно) строки-шаблоны Jinja2."""
+    if isinstance(x, str):
+        return "{{" in x
+    if isinstance(x, dict):
+        return any(has_template(v) for v in x.values())
+    if isinstance(x, list):
+        return any(has_template(v) for v in x)
+    return False
+
+
+def render_tree(x: Any, variables: Mapping[str, Any]) -> Any:
     """
-    Рендерит шаблоны Jinja2 в строковых значениях на основе settings.vars.
-    Гарантирует, что на выходе остаётся словарь.
+    Рендерит шаблоны в строках значения. Поддеревья без шаблонов
+    возвращаются как есть (без копирования).
     """
-    vars_ = ((cfg.get("settings") or {}).get("vars") or {}).copy()
-    env = Environment(undefined=StrictUndefined)
+    if isinstance(x, str):
+        return compile_template(x).render(variables) if "{{" in x else x
+    if isinstance(x, dict):
+        out_d: Dict[Any, Any] | None = None
+        for k, v in x.items():
+            nv = render_tree(v, variables)
+            if nv is not v and out_d is None:
+                out_d = dict(x)
+            if out_d is not None:
+                out_d[k] = nv
+        return x if out_d is None else out_d
+    if isinstance(x, list):
+        out_l: List[Any] | None = None
+        for i, v in enumerate(x):
+            nv = render_tree(v, variables)
+            if nv is not v and out_l is None:
+                out_l = list(x)
+            if out_l is not None:
+                out_l[i] = nv
+        return x if out_l is None else out_l
+    return x
 
-    def _walk(x: Any) -> Any:
-        if isinstance(x, str) and "{{" in x:
-            return env.from_string(x).render(**vars_)
-        if isinstance(x, dict):
-            return {k: _walk(v) for k, v in x.items()}
-        if isinstance(x, list):
-            return [_walk(i) for i in x]
-        return x
 
-    rendered = _walk(cfg)
-    if not isinstance(rendered, dict):
-        raise TypeError("Rendered config must be a mapping")
-    return cast(Dict[str, Any], rendered)
+def _render_templates(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Рендерит шаблоны Jinja2 в строковых значениях на основе settings.vars —
+    всё, кроме steps: шаги рендерятся лениво, в момент исполнения
+    (см. plan.StepPlan.render), и видят ещё и состояние прогона.
+    """
+    vars_ = ((cfg.get("settings") or {}).get("vars") or {}).copy()
+    return {k: v if k == "steps" else render_tree(v, vars_) for k, v in cfg.items()}
 
 
 def load_config(
@@ -168,7 +268,8 @@ def load_config(
 ) -> Dict[str, Any]:
     """
     Загружает defaults → profile → scenario → CLI overrides,
-    затем делает рендер шаблонов Jinja2.
+    затем делает рендер шаблонов Jinja2 (кроме шагов — они рендерятся
+    при исполнении).
     """
     defaults_p, profile_p, scenario_p = resolve_paths(project_root, scenario, profile)
 
@@ -188,6 +289,12 @@ def load_config(
     if overrides:
         result = _deep_merge(result, parse_overrides(overrides))
 
+    # документы из кэша общие: то, что ensure_paths_in_config меняет на месте,
+    # копируем (copy-on-write)
+    result = dict(result)
+    for key in ("paths", "profile"):
+        if isinstance(result.get(key), dict):
+            result[key] = dict(result[key])
     ensure_paths_in_config(result, project_root, scenario_p, profile)
     result = _render_templates(result)
     return result
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Асинхронный движок (`runner run --engine async`).
+
+Семантика шагов та же, что у plan.execute_steps (заголовки, анонсы,
+задержки, success/fail, отмена) — общие части берутся оттуда же.
+Отличается только способ исполнения действия:
+  - нативные async-действия (ASYNC_REGISTRY: sleep, run_program, run_ps)
+    работают прямо в цикле событий;
+  - остальные — в пуле потоков (asyncio.to_thread).
+Вложенные блоки (if/repeat_until/parallel) исполняет синхронный код
+действия в своём потоке, но шаги блока он отправляет обратно в цикл
+(run_block_from_thread), так что вложенные sleep/run_* тоже асинхронные.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+from .actions import ASYNC_REGISTRY
+from .context import Context
+from .plan import StepPlan, begin_step, execute_steps, plan_for, report_step
+from .utils import timing
+
+# каждый уровень вложенности держит поток, пока цикл исполняет его блок
+_EXECUTOR_THREADS = 64
+
+
+async def execute_steps_async(
+    ctx: Context,
+    steps: Sequence[StepPlan],
+    parent_name: Optional[str] = None,
+    *,
+    top_level: bool = False,
+) -> None:
+    """Аналог plan.execute_steps для цикла событий."""
+    delay_between = plan_for(ctx).delay_between
+
+    for sp in steps:
+        sp = begin_step(ctx, sp, parent_name, top_level)
+
+        if sp.delay_before:
+            await ctx.asleep(sp.delay_before)
+
+        if sp.fn is None:
+            raise KeyError(f"Unknown action: {sp.action}")
+
+        native = ASYNC_REGISTRY.get(sp.action or "")
+        t0 = timing.now()
+        try:
+            if native is not None:
+                await native(ctx, sp.spec)
+            else:
+                await asyncio.to_thread(sp.fn, ctx, sp.spec)
+        except asyncio.CancelledError:
+            ctx.cancel.cancel()  # синхронное действие в потоке тоже остановится
+            raise
+        except Exception:
+            report_step(ctx, sp, None)
+            raise
+        report_step(ctx, sp, timing.now() - t0)
+
+        if sp.delay_after:
+            await ctx.asleep(sp.delay_after)
+
+        if delay_between > 0:
+            await ctx.asleep(delay_between)
+
+
+def run_block_from_thread(
+    ctx: Context, block: Sequence[StepPlan], parent_name: Optional[str]
+) -> None:
+    """
+    Вызов из потока синхронного действия: блок исполняется в цикле
+    событий, поток ждёт результат (исключения пробрасываются как есть).
+    """
+    loop = ctx.loop
+    assert loop is not None
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        # мы и есть цикл (не должно случаться) — не блокируем его
+        execute_steps(ctx, block, parent_name=parent_name)
+        return
+    fut = asyncio.run_coroutine_threadsafe(
+        execute_steps_async(ctx, block, parent_name), loop
+    )
+    fut.result()
+
+
+async def run_plan_async(ctx: Context) -> None:
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=_EXECUTOR_THREADS, thread_name_prefix="step")
+    )
+    ctx.loop = loop
+    try:
+        await execute_steps_async(ctx, plan_for(ctx).steps, top_level=True)
+    finally:
+        ctx.loop = None
+
+
+def run_async(ctx: Context) -> None:
+    asyncio.run(run_plan_async(ctx))
@@ -1,73 +1,52 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from typing import Any, Dict
-from time import perf_counter, sleep
+from contextlib import ExitStack
+from typing import Any, Dict, Optional
 from rich.console import Console
 
+from . import desktop as _desktop
 from .context import Context
-from .actions import REGISTRY  # импорт из __init__.py подтянет плагины
-from .utils.timeparse import parse_duration
-
-
-def run_scenario(cfg: Dict[str, Any], *, dry_run: bool = False) -> None:
-    console = Console()
-    ctx = Context(config=cfg, console=console, dry_run=dry_run)
-    steps = cfg.get("steps") or []
-
-    # глобальная пауза между шагами (необязательная)
-    delay_between = (
-        parse_duration(
-            ((cfg.get("settings") or {}).get("defaults") or {}).get(
-                "delay_between_steps"
-            )
-        )
-        or 0.0
-    )
-
-    for idx, step in enumerate(steps, 1):
-        name = step.get("name", f"step #{idx}")
-        action = step.get("action")
-        if not action:
-            raise ValueError(f"Step #{idx} '{name}' has no 'action'")
-
-        console.rule(f"[bold]Шаг {idx}[/] — {name}  ([dim]{action}[/])")
-
-        # пер- и пост-задержки на уровне шага
-        delay_before = parse_duration(step.get("delay_before"))
-        delay_after = parse_duration(step.get("delay_after"))
-
-        # «анонс» перед выполнением
-        announce = step.get("announce")
-        if announce:
-            console.print(announce)
-
-        if delay_before:
-            sleep(delay_before)
-
-        fn = REGISTRY.get(action)
-        if not fn:
-            raise KeyError(f"Unknown action: {action}")
-
-        t0 = perf_counter()
-        try:
-            fn(ctx, step)
-        except Exception:
-            fail_msg = step.get("fail")
-            if fail_msg:
-                console.print(f"[red]{fail_msg}[/]")
-            raise
-        dt = perf_counter() - t0
-
-        # успех
-        success = step.get("success")
-        if success:
-            console.print(success)
-
-        console.print(f"[green]OK[/] ({dt:.2f}s)")
-
-        if delay_after:
-            sleep(delay_after)
-
-        if delay_between > 0:
-            sleep(delay_between)
+from .plan import ScenarioPlan, compile_plan, execute_steps
+from .utils import outputs, processes, timing
+
+ENGINES = ("sync", "async")
+
+
+def run_scenario(
+    cfg: Dict[str, Any],
+    *,
+    dry_run: bool = False,
+    plan: Optional[ScenarioPlan] = None,
+    console: Optional[Console] = None,
+    engine: str = "sync",
+    clock: Optional[timing.Clock] = None,
+    desktop: Optional[_desktop.Desktop] = None,
+) -> None:
+    """
+    Компилирует сценарий в план (один раз) и исполняет его.
+    Готовый plan можно передать, чтобы не компилировать повторно;
+    console — куда писать лог (по умолчанию stdout);
+    engine — sync (по умолчанию) или async (engine_async, asyncio);
+    clock — часы на время прогона (timing.VirtualClock — без реальных ожиданий);
+    desktop — рабочий стол на время прогона (desktop.sim.SimDesktop — без GUI).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r} (expected one of {ENGINES})")
+    console = console if console is not None else Console()
+    plan = plan if plan is not None else compile_plan(cfg)
+    ctx = Context(config=cfg, console=console, dry_run=dry_run, plan=plan)
+    with ExitStack() as stack:
+        # вывод и Popen завершившихся процессов прогона больше не нужны
+        stack.callback(processes.prune)
+        stack.callback(outputs.prune)
+        if clock is not None:
+            stack.enter_context(timing.use_clock(clock))
+        if desktop is not None:
+            stack.enter_context(_desktop.use_desktop(desktop))
+        if engine == "async":
+            from .engine_async import run_async
+
+            run_async(ctx)
+            return
+        execute_steps(ctx, plan.steps, top_level=True)
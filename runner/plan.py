@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .actions import NESTED_KEYS, REGISTRY, iter_blocks
+from .context import Context
+from .dsl import has_template, render_tree
+from .utils import timing
+from .utils.paths import resolve_image_path
+from .utils.timeparse import parse_duration
+
+
+class StepPlan:
+    """
+    Скомпилированный шаг: всё, что не зависит от состояния прогона,
+    вычислено один раз (задержки, привязанное действие).
+    spec — исходный словарь шага, его и получает действие.
+    templated — поля с шаблонами Jinja2; они рендерятся в render()
+    непосредственно перед исполнением шага.
+    """
+
+    __slots__ = (
+        "index",
+        "name",
+        "action",
+        "fn",
+        "spec",
+        "delay_before",
+        "delay_after",
+        "announce",
+        "success",
+        "fail",
+        "templated",
+    )
+
+    def __init__(
+        self, index: int, spec: Dict[str, Any], *, rendered: bool = False
+    ) -> None:
+        self.index = index
+        self.spec = spec
+        # вложенные блоки рендерятся сами, когда до них дойдёт исполнение
+        self.templated: Tuple[str, ...] = (
+            ()
+            if rendered
+            else tuple(
+                k for k, v in spec.items() if k not in NESTED_KEYS and has_template(v)
+            )
+        )
+        self.name: str = str(spec.get("name", f"step #{index}"))
+        self.action: Optional[str] = spec.get("action")
+        self.fn: Optional[Callable[[Context, Dict[str, Any]], Any]] = (
+            REGISTRY.get(self.action) if self.action else None
+        )
+        self.delay_before = self._delay("delay_before")
+        self.delay_after = self._delay("delay_after")
+        self.announce = spec.get("announce")
+        self.success = spec.get("success")
+        self.fail = spec.get("fail")
+
+    def _delay(self, key: str) -> Optional[float]:
+        # шаблонная задержка разбирается уже после рендера
+        return None if key in self.templated else parse_duration(self.spec.get(key))
+
+    def render(self, variables: Mapping[str, Any]) -> "StepPlan":
+        """
+        Шаг с отрендеренными полями (или сам шаг, если шаблонов нет).
+        Скомпилированные шаблоны кэшируются по исходнику (dsl.compile_template),
+        вложенные списки шагов передаются по ссылке — план находит их по id.
+        """
+        if not self.templated:
+            return self
+        spec = dict(self.spec)
+        for key in self.templated:
+            spec[key] = render_tree(spec[key], variables)
+        return StepPlan(self.index, spec, rendered=True)
+
+
+class ScenarioPlan:
+    """
+    План сценария: корневой список шагов + все вложенные блоки
+    (then/else/try/...), проиндексированные по id исходного списка.
+    Исходные списки удерживаются планом, поэтому их id стабильны.
+    """
+
+    __slots__ = ("config", "steps", "delay_between", "assets", "variables", "_blocks")
+
+    def __init__(self, cfg: Dict[str, Any]) -> None:
+        self.config = cfg
+        self.variables: Dict[str, Any] = dict(
+            (cfg.get("settings") or {}).get("vars") or {}
+        )
+        self.delay_between: float = (
+            parse_duration(
+                ((cfg.get("settings") or {}).get("defaults") or {}).get(
+                    "delay_between_steps"
+                )
+            )
+            or 0.0
+        )
+        self.assets: Dict[str, Path] = {}
+        self._blocks: Dict[int, Tuple[List[Dict[str, Any]], List[StepPlan]]] = {}
+        self.steps: List[StepPlan] = self.block(cfg.get("steps") or [])
+
+    def block(self, steps: List[Dict[str, Any]]) -> List[StepPlan]:
+        """Скомпилированный блок для исходного списка шагов (с кэшем по id)."""
+        hit = self._blocks.get(id(steps))
+        if hit is not None and hit[0] is steps:
+            return hit[1]
+        compiled = [self._compile(i, st) for i, st in enumerate(steps, 1)]
+        self._blocks[id(steps)] = (steps, compiled)
+        return compiled
+
+    def _compile(self, index: int, spec: Dict[str, Any]) -> StepPlan:
+        sp = StepPlan(index, spec)
+        self._collect_assets(spec)
+        cond = spec.get("condition")
+        if isinstance(cond, dict):
+            self._collect_assets(cond)
+        for _, sub in iter_blocks(spec):
+            self.block(sub)
+        return sp
+
+    def _collect_assets(self, spec: Dict[str, Any]) -> None:
+        img = spec.get("image")
+        # путь с шаблоном известен только при исполнении (см. resolve_asset)
+        if isinstance(img, str) and "{{" not in img and img not in self.assets:
+            self.assets[img] = resolve_image_path(img, self.config)
+
+
+def compile_plan(cfg: Dict[str, Any]) -> ScenarioPlan:
+    return ScenarioPlan(cfg)
+
+
+def plan_for(ctx: Context) -> ScenarioPlan:
+    """План текущего прогона (компилируется лениво, если контекст собран вручную)."""
+    if ctx.plan is None:
+        ctx.plan = compile_plan(ctx.config)
+    return ctx.plan
+
+
+def template_vars(ctx: Context) -> Dict[str, Any]:
+    """
+    Контекст рендера шагов: settings.vars + `state` — read-only вид
+    на ctx.state (счётчики, попадания vision, target_hwnd, ...).
+    """
+    return {**plan_for(ctx).variables, "state": MappingProxyType(ctx.state)}
+
+
+def resolve_asset(ctx: Context, path: str) -> Path:
+    """Путь к картинке, разрешённый на этапе компиляции (или сейчас, если нет)."""
+    full = plan_for(ctx).assets.get(path)
+    return full if full is not None else resolve_image_path(path, ctx.config)
+
+
+def begin_step(
+    ctx: Context, sp: StepPlan, parent_name: Optional[str], top_level: bool
+) -> StepPlan:
+    """
+    Общее для движков начало шага: отмена, рендер, проверка action,
+    заголовок и «анонс». Возвращает (возможно отрендеренный) шаг.
+    """
+    ctx.check_cancelled()
+    if sp.templated:
+        sp = sp.render(template_vars(ctx))
+
+    if not sp.action:
+        where = "Step" if top_level else "Inline step"
+        raise ValueError(f"{where} #{sp.index} '{sp.name}' has no 'action'")
+
+    console = ctx.console
+    if top_level:
+        console.rule(f"[bold]Шаг {sp.index}[/] — {sp.name}  ([dim]{sp.action}[/])")
+    else:
+        title = sp.name if not parent_name else f"{parent_name} › {sp.name}"
+        console.rule(f"[bold]Шаг[/] — {title}  ([dim]{sp.action}[/])")
+
+    # «анонс» перед выполнением
+    if sp.announce:
+        console.print(sp.announce)
+    return sp
+
+
+def report_step(ctx: Context, sp: StepPlan, dt: Optional[float]) -> None:
+    """Итог шага: fail-сообщение (dt=None) или success + OK с длительностью."""
+    if dt is None:
+        if sp.fail:
+            ctx.console.print(f"[red]{sp.fail}[/]")
+        return
+    if sp.success:
+        ctx.console.print(sp.success)
+    ctx.console.print(f"[green]OK[/] ({dt:.2f}s)")
+
+
+def execute_steps(
+    ctx: Context,
+    steps: Sequence[StepPlan],
+    parent_name: Optional[str] = None,
+    *,
+    top_level: bool = False,
+) -> None:
+    """
+    Исполняет скомпилированные шаги: корневой уровень сценария (top_level)
+    или вложенный блок if/repeat_until/... (parent_name — для заголовков).
+    """
+    delay_between = plan_for(ctx).delay_between
+
+    for sp in steps:
+        sp = begin_step(ctx, sp, parent_name, top_level)
+
+        if sp.delay_before:
+            ctx.sleep(sp.delay_before)
+
+        if sp.fn is None:
+            raise KeyError(f"Unknown action: {sp.action}")
+
+        t0 = timing.now()
+        try:
+            sp.fn(ctx, sp.spec)
+        except Exception:
+            report_step(ctx, sp, None)
+            raise
+        report_step(ctx, sp, timing.now() - t0)
+
+        if sp.delay_after:
+            ctx.sleep(sp.delay_after)
+
+        if delay_between > 0:
+            ctx.sleep(delay_between)
+
+
+def run_block(
+    ctx: Context, steps: List[Dict[str, Any]], parent_name: Optional[str] = None
+) -> None:
+    """
+    Вложенный блок (then/else/try/ветка parallel) — тем движком, которым
+    идёт прогон: в async-режиме шаги блока возвращаются в цикл событий.
+    """
+    block = plan_for(ctx).block(steps)
+    if ctx.loop is not None:
+        from .engine_async import run_block_from_thread
+
+        run_block_from_thread(ctx, block, parent_name)
+    else:
+        execute_steps(ctx, block, parent_name=parent_name)
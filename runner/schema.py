@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+"""
+Быстрая проверка сценариев по docs/dsl.schema.json.
+
+Схема один раз компилируется в дерево замыканий (подмножество JSON Schema,
+которое реально используется в dsl.schema.json: type/const/enum/required/
+properties/additionalProperties/items/min*/max*/pattern/allOf/anyOf/oneOf/
+not/if-then-else/$ref); незнакомое ключевое слово — ошибка компиляции.
+Ошибки — с путём в документе и строкой/колонкой YAML.
+
+`check_all` раскидывает файлы по пулу процессов и кэширует результат
+по хэшу содержимого файла (artifacts/cache/check.json).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+from .actions import MANIFEST
+from .dsl import DocPath, _YamlLoader, iter_unknown_actions
+
+ROOT = Path(__file__).resolve().parents[1]
+SCHEMA_PATH = ROOT / "docs" / "dsl.schema.json"
+CACHE_PATH = ROOT / "artifacts" / "cache" / "check.json"
+
+Error = Tuple[DocPath, str]
+Check = Callable[[Any, DocPath], List[Error]]
+
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda x: isinstance(x, dict),
+    "array": lambda x: isinstance(x, list),
+    "string": lambda x: isinstance(x, str),
+    "integer": lambda x: isinstance(x, int) and not isinstance(x, bool),
+    "number": lambda x: isinstance(x, (int, float)) and not isinstance(x, bool),
+    "boolean": lambda x: isinstance(x, bool),
+    "null": lambda x: x is None,
+}
+
+# ключи-аннотации, на валидацию не влияют
+_IGNORED = {"$schema", "$defs", "definitions", "title", "description", "default"}
+# читаются соседним ключевым словом (if), своей проверки не имеют
+_CONSUMED = {"then", "else"}
+
+
+def _ok(x: Any, path: DocPath) -> List[Error]:
+    return []
+
+
+class _Compiler:
+    """Компилирует узлы схемы в функции check(value, path) -> [ошибки]."""
+
+    def __init__(self, root: Dict[str, Any]) -> None:
+        self.root = root
+        self._refs: Dict[str, Check] = {}
+
+    def ref(self, pointer: str) -> Check:
+        hit = self._refs.get(pointer)
+        if hit is not None:
+            return hit
+        # ссылки рекурсивны (step -> if -> then -> step): регистрируем
+        # прокладку до компиляции цели
+        cell: List[Check] = []
+
+        def deref(x: Any, path: DocPath) -> List[Error]:
+            return cell[0](x, path)
+
+        self._refs[pointer] = deref
+        node: Any = self.root
+        for part in pointer.lstrip("#/").split("/"):
+            if part:
+                node = node[part.replace("~1", "/").replace("~0", "~")]
+        cell.append(self.compile(node))
+        return deref
+
+    def compile(self, node: Any) -> Check:
+        if node is True or node == {}:
+            return _ok
+        if node is False:
+            return lambda x, path: [(path, "no value is allowed here")]
+
+        type_check: Optional[Callable[[Any], bool]] = None
+        checks: List[Check] = []
+        for kw, arg in node.items():
+            if kw == "type":
+                type_check = self._type(arg)
+            elif kw not in _IGNORED and kw not in _CONSUMED:
+                make = getattr(self, "_kw_" + kw.lstrip("$"), None)
+                if make is None:
+                    # молча пропущенное слово — валидатор, который пускает лишнее
+                    raise ValueError(f"schema keyword {kw!r} is not supported")
+                checks.append(make(arg, node))
+        type_names = node.get("type")
+
+        def run(x: Any, path: DocPath) -> List[Error]:
+            # шаблон Jinja2 станет значением только при исполнении шага
+            if isinstance(x, str) and "{{" in x:
+                return []
+            if type_check is not None and not type_check(x):
+                return [(path, f"{x!r} is not of type {type_names!r}")]
+            errors: List[Error] = []
+            for c in checks:
+                errors.extend(c(x, path))
+            return errors
+
+        return run
+
+    # ---------- ключевые слова ----------
+
+    @staticmethod
+    def _type(arg: Any) -> Callable[[Any], bool]:
+        names = [arg] if isinstance(arg, str) else list(arg)
+        preds = [_TYPES[n] for n in names]
+        if len(preds) == 1:
+            return preds[0]
+        return lambda x: any(p(x) for p in preds)
+
+    def _kw_ref(self, arg: str, node: Dict[str, Any]) -> Check:
+        return self.ref(arg)
+
+    def _kw_const(self, arg: Any, node: Dict[str, Any]) -> Check:
+        def check(x: Any, path: DocPath) -> List[Error]:
+            return [] if x == arg else [(path, f"{arg!r} was expected")]
+
+        return check
+
+    def _kw_enum(self, arg: List[Any], node: Dict[str, Any]) -> Check:
+        def check(x: Any, path: DocPath) -> List[Error]:
+            return [] if x in arg else [(path, f"{x!r} is not one of {arg!r}")]
+
+        return check
+
+    def _kw_required(self, arg: List[str], node: Dict[str, Any]) -> Check:
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if not isinstance(x, dict):
+                return []
+            return [(path, f"{k!r} is a required property") for k in arg if k not in x]
+
+        return check
+
+    def _kw_properties(self, arg: Dict[str, Any], node: Dict[str, Any]) -> Check:
+        props = {k: self.compile(v) for k, v in arg.items()}
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if not isinstance(x, dict):
+                return []
+            errors: List[Error] = []
+            for k, c in props.items():
+                if k in x:
+                    errors.extend(c(x[k], path + (k,)))
+            return errors
+
+        return check
+
+    def _kw_additionalProperties(self, arg: Any, node: Dict[str, Any]) -> Check:
+        known = set(node.get("properties") or ())
+        if arg is True:
+            return _ok
+        if arg is False:
+
+            def forbid(x: Any, path: DocPath) -> List[Error]:
+                if not isinstance(x, dict):
+                    return []
+                extra = [k for k in x if k not in known]
+                if not extra:
+                    return []
+                names = ", ".join(repr(k) for k in extra)
+                return [(path, f"Additional properties are not allowed ({names})")]
+
+            return forbid
+        sub = self.compile(arg)
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if not isinstance(x, dict):
+                return []
+            errors: List[Error] = []
+            for k, v in x.items():
+                if k not in known:
+                    errors.extend(sub(v, path + (k,)))
+            return errors
+
+        return check
+
+    def _kw_items(self, arg: Any, node: Dict[str, Any]) -> Check:
+        sub = self.compile(arg)
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if not isinstance(x, list):
+                return []
+            errors: List[Error] = []
+            for i, v in enumerate(x):
+                errors.extend(sub(v, path + (i,)))
+            return errors
+
+        return check
+
+    def _kw_minItems(self, arg: int, node: Dict[str, Any]) -> Check:
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if isinstance(x, list) and len(x) < arg:
+                return [(path, f"expected at least {arg} item(s), got {len(x)}")]
+            return []
+
+        return check
+
+    def _kw_maxItems(self, arg: int, node: Dict[str, Any]) -> Check:
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if isinstance(x, list) and len(x) > arg:
+                return [(path, f"expected at most {arg} item(s), got {len(x)}")]
+            return []
+
+        return check
+
+    def _kw_minimum(self, arg: float, node: Dict[str, Any]) -> Check:
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if _TYPES["number"](x) and x < arg:
+                return [(path, f"{x!r} is less than the minimum of {arg!r}")]
+            return []
+
+        return check
+
+    def _kw_maximum(self, arg: float, node: Dict[str, Any]) -> Check:
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if _TYPES["number"](x) and x > arg:
+                return [(path, f"{x!r} is greater than the maximum of {arg!r}")]
+            return []
+
+        return check
+
+    def _kw_pattern(self, arg: str, node: Dict[str, Any]) -> Check:
+        rx = re.compile(arg)
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if isinstance(x, str) and not rx.search(x):
+                return [(path, f"{x!r} does not match {arg!r}")]
+            return []
+
+        return check
+
+    def _kw_allOf(self, arg: List[Any], node: Dict[str, Any]) -> Check:
+        subs = [self.compile(s) for s in arg]
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            errors: List[Error] = []
+            for s in subs:
+                errors.extend(s(x, path))
+            return errors
+
+        return check
+
+    def _kw_anyOf(self, arg: List[Any], node: Dict[str, Any]) -> Check:
+        subs = [self.compile(s) for s in arg]
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            results = []
+            for s in subs:
+                errs = s(x, path)
+                if not errs:
+                    return []
+                results.append(errs)
+            # форма совпала по структуре, ошибки глубже — покажем их
+            deep = [r for r in results if all(len(p) > len(path) for p, _ in r)]
+            if deep:
+                return min(deep, key=len)
+            return [(path, f"{x!r} does not match any of the allowed forms")]
+
+        return check
+
+    def _kw_oneOf(self, arg: List[Any], node: Dict[str, Any]) -> Check:
+        subs = [self.compile(s) for s in arg]
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            n = sum(1 for s in subs if not s(x, path))
+            if n == 1:
+                return []
+            what = "none" if n == 0 else "more than one"
+            return [(path, f"{what} of the alternatives matched (oneOf)")]
+
+        return check
+
+    def _kw_not(self, arg: Any, node: Dict[str, Any]) -> Check:
+        sub = self.compile(arg)
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            if sub(x, path):
+                return []
+            return [(path, f"should not be valid under {arg!r}")]
+
+        return check
+
+    def _kw_if(self, arg: Any, node: Dict[str, Any]) -> Check:
+        cond = self.compile(arg)
+        then = self.compile(node.get("then", True))
+        other = self.compile(node.get("else", True))
+
+        def check(x: Any, path: DocPath) -> List[Error]:
+            return then(x, path) if not cond(x, path) else other(x, path)
+
+        return check
+
+
+def load_schema(path: Path = SCHEMA_PATH) -> Dict[str, Any]:
+    raw = path.read_bytes()
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("cp1251")  # исторически схема лежит в cp1251
+    return json.loads(text)
+
+
+def compile_schema(schema: Dict[str, Any]) -> Check:
+    return _Compiler(schema).compile(schema)
+
+
+@lru_cache(maxsize=4)
+def _validator(schema_path: str) -> Check:
+    """Один скомпилированный валидатор на процесс (в т.ч. на воркер пула)."""
+    return compile_schema(load_schema(Path(schema_path)))
+
+
+# ---------- позиции в YAML ----------
+
+
+def format_path(path: DocPath) -> str:
+    out = ""
+    for item in path:
+        out += f"[{item}]" if isinstance(item, int) else (f".{item}" if out else item)
+    return out or "<root>"
+
+
+def _locate(node: Optional[yaml.Node], path: DocPath) -> Tuple[int, int]:
+    """Строка/колонка (с 1) самого глубокого узла, до которого доходит путь."""
+    if node is None:
+        return 1, 1
+    cur = node
+    for item in path:
+        nxt: Optional[yaml.Node] = None
+        if isinstance(cur, yaml.MappingNode):
+            for k, v in cur.value:
+                if k.value == item:
+                    nxt = v
+                    break
+        elif isinstance(cur, yaml.SequenceNode) and isinstance(item, int):
+            if item < len(cur.value):
+                nxt = cur.value[item]
+        if nxt is None:
+            break
+        cur = nxt
+    return cur.start_mark.line + 1, cur.start_mark.column + 1
+
+
+def check_text(text: str, schema_path: str = str(SCHEMA_PATH)) -> List[str]:
+    """
+    Проверяет YAML-документ сценария. Ошибки: "строка:колонка: путь: текст".
+    Документ проверяется как есть (без defaults/profile).
+    """
+    try:
+        doc = yaml.load(text, Loader=_YamlLoader)
+    except yaml.MarkedYAMLError as e:
+        mark = e.problem_mark or e.context_mark
+        line, col = (mark.line + 1, mark.column + 1) if mark else (1, 1)
+        return [f"{line}:{col}: YAML: {e.problem or e}"]
+
+    errors = _validator(schema_path)(doc, ())
+    if isinstance(doc, dict) and isinstance(doc.get("steps"), list):
+        for path, action in iter_unknown_actions(doc["steps"]):
+            errors.append((path + ("action",), f"unknown action {action!r}"))
+    if not errors:
+        return []
+
+    # позиции нужны только при ошибках — второй проход (compose) только тогда
+    root = yaml.compose(text, Loader=_YamlLoader)
+    located = sorted(
+        (_locate(root, path), format_path(path), msg) for path, msg in errors
+    )
+    return [f"{line}:{col}: {where}: {msg}" for (line, col), where, msg in located]
+
+
+def _decode(raw: bytes) -> Tuple[Optional[str], List[str]]:
+    """Текст сценария или ошибка «не UTF-8» в формате ошибок проверки."""
+    try:
+        return raw.decode("utf-8"), []
+    except UnicodeDecodeError as e:
+        head = raw[: e.start]
+        line = head.count(b"\n") + 1
+        col = e.start - (head.rfind(b"\n") + 1) + 1
+        return None, [f"{line}:{col}: encoding: file is not valid UTF-8 ({e.reason})"]
+
+
+def check_file(path: str, schema_path: str = str(SCHEMA_PATH)) -> List[str]:
+    text, errors = _decode(Path(path).read_bytes())
+    return errors if text is None else check_text(text, schema_path)
+
+
+# ---------- кэш и пул ----------
+
+
+def _salt(schema_path: Path) -> str:
+    """Результаты зависят от схемы, валидатора и набора известных действий."""
+    h = hashlib.sha1(schema_path.read_bytes())
+    h.update(Path(__file__).read_bytes())
+    h.update("\0".join(sorted(MANIFEST)).encode())
+    return h.hexdigest()
+
+
+def _load_cache(path: Path, salt: str) -> Dict[str, List[str]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("salt") != salt:
+        return {}
+    files = data.get("files")
+    return files if isinstance(files, dict) else {}
+
+
+def _save_cache(path: Path, salt: str, files: Dict[str, List[str]]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"salt": salt, "files": files}), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # кэш — оптимизация, его отсутствие не ошибка
+
+
+def check_all(
+    files: Sequence[Path],
+    *,
+    jobs: Optional[int] = None,
+    schema_path: Path = SCHEMA_PATH,
+    cache_path: Optional[Path] = CACHE_PATH,
+) -> Dict[Path, Tuple[List[str], bool]]:
+    """
+    Проверяет набор сценариев. Возвращает {файл: (ошибки, взято_из_кэша)}.
+    Неизменённые файлы (по sha1 содержимого) берутся из кэша, остальные
+    проверяются в пуле процессов.
+    """
+    salt = _salt(schema_path)
+    cache = _load_cache(cache_path, salt) if cache_path else {}
+
+    results: Dict[Path, Tuple[List[str], bool]] = {}
+    pending: List[Tuple[Path, str, str]] = []
+    live = set()
+    for f in files:
+        raw = f.read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        live.add(digest)
+        hit = cache.get(digest)
+        if hit is not None:
+            results[f] = (hit, True)
+            continue
+        text, errors = _decode(raw)
+        if text is None:
+            # битая кодировка — ошибка этого файла, а не всей проверки
+            results[f] = (errors, False)
+            cache[digest] = errors
+        else:
+            pending.append((f, digest, text))
+
+    if pending:
+        workers = min(jobs or os.cpu_count() or 1, len(pending))
+        texts = [t for _, _, t in pending]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunk = max(1, len(texts) // (workers * 4))
+                outs = list(
+                    pool.map(
+                        check_text,
+                        texts,
+                        [str(schema_path)] * len(texts),
+                        chunksize=chunk,
+                    )
+                )
+        else:
+            outs = [check_text(t, str(schema_path)) for t in texts]
+        for (f, digest, _), errs in zip(pending, outs):
+            results[f] = (errs, False)
+            cache[digest] = errs
+    if cache_path and not all(hit for _, hit in results.values()):
+        _save_cache(cache_path, salt, {k: v for k, v in cache.items() if k in live})
+
+    return {f: results[f] for f in files}
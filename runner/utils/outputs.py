@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Потоковый вывод запущенных процессов (run_program, run_ps).
+
+Каждый поток (stdout/stderr) читается построчно сразу, как только дочерний
+процесс пишет: фоновым потоком для Popen (attach) или задачей asyncio
+(feed/close_pipe из engine async). Строки уходят в лог шага на диске целиком,
+а в памяти остаётся только хвост из tail_lines строк — болтливый процесс
+не блокируется на заполненном pipe и не раздувает память.
+
+wait_output и условие output_matches ищут regex по хвосту и ждут новых
+строк на Condition — шаг продолжается в момент появления строки.
+
+Реестр pid -> поток ограничен: потоки живых процессов хранятся всегда,
+дочитанных до EOF — не больше KEEP_CLOSED последних; после прогона
+оркестратор забывает дочитанные (prune) — тёплый демон и run_many
+не копят хвосты завершившихся процессов.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from pathlib import Path
+from typing import IO, Any, Deque, Dict, List, Optional, Pattern, Tuple
+
+DEFAULT_TAIL = 1000
+# сколько дочитанных потоков помнит реестр (для output_matches после выхода)
+KEEP_CLOSED = 32
+# в хвосте строка обрезается: лог на диске хранит её полностью
+_MAX_LINE = 4096
+
+# (номер строки, поток "out"|"err", текст без перевода строки)
+Line = Tuple[int, str, str]
+
+
+class OutputStream:
+    """Вывод одного процесса: лог на диске + ограниченный хвост в памяти."""
+
+    def __init__(self, log_path: Optional[Path], tail_lines: int = DEFAULT_TAIL):
+        self.log_path = log_path
+        self._tail: Deque[Line] = deque(maxlen=max(1, tail_lines))
+        self._seq = 0
+        self._open = 0
+        self._cond = threading.Condition()
+        self._log: Optional[IO[str]] = None
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(log_path, "w", encoding="utf-8")
+
+    # --- запись ---
+    def open_pipe(self) -> None:
+        with self._cond:
+            self._open += 1
+
+    def feed(self, kind: str, line: str) -> None:
+        text = line.rstrip("\r\n")
+        with self._cond:
+            if self._log is not None:
+                self._log.write(f"{text}\n" if kind == "out" else f"! {text}\n")
+            self._tail.append((self._seq, kind, text[:_MAX_LINE]))
+            self._seq += 1
+            self._cond.notify_all()
+
+    def close_pipe(self) -> None:
+        with self._cond:
+            self._open -= 1
+            if self._open <= 0 and self._log is not None:
+                self._log.close()
+                self._log = None
+            self._cond.notify_all()
+
+    def attach(self, kind: str, pipe: Optional[IO[str]]) -> None:
+        """Читать pipe построчно в фоновом потоке до EOF."""
+        if pipe is None:
+            return
+        self.open_pipe()
+
+        def _pump() -> None:
+            try:
+                for line in pipe:
+                    self.feed(kind, line)
+            except (OSError, ValueError):
+                pass  # pipe закрыли (kill) — дочитывать нечего
+            finally:
+                self.close_pipe()
+
+        threading.Thread(target=_pump, name=f"output-{kind}", daemon=True).start()
+
+    # --- чтение ---
+    @property
+    def closed(self) -> bool:
+        """Все потоки дочитаны до EOF (процесс закрыл вывод)."""
+        with self._cond:
+            return self._open <= 0
+
+    @property
+    def cursor(self) -> int:
+        """Номер следующей строки: поиск с него — только новые строки."""
+        with self._cond:
+            return self._seq
+
+    def lines(self, since: int = 0, kind: Optional[str] = None) -> List[Line]:
+        with self._cond:
+            return [
+                ln
+                for ln in self._tail
+                if ln[0] >= since and (kind is None or ln[1] == kind)
+            ]
+
+    def text(self, kind: str) -> str:
+        """Хвост потока одной строкой (для сообщений об ошибках)."""
+        return "\n".join(ln[2] for ln in self.lines(kind=kind))
+
+    def search(
+        self, rx: Pattern[str], since: int = 0, kind: Optional[str] = None
+    ) -> Optional[Line]:
+        """Первая строка хвоста с номера since, где есть совпадение rx."""
+        for ln in self.lines(since, kind):
+            if rx.search(ln[2]) is not None:
+                return ln
+        return None
+
+    def wait_new(self, since: int, seconds: float) -> bool:
+        """Ждёт строку с номером >= since или EOF; True — если дождались."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._seq > since or self._open <= 0, seconds
+            )
+
+    def join(self, seconds: Optional[float] = None) -> bool:
+        """Дождаться EOF всех потоков (после завершения процесса)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._open <= 0, seconds)
+
+
+_lock = threading.Lock()
+_streams: Dict[int, OutputStream] = {}
+
+
+def tail_for(config: Dict[str, Any]) -> int:
+    """process.output_tail — сколько последних строк вывода держать в памяти."""
+    raw = (config.get("process") or {}).get("output_tail")
+    return DEFAULT_TAIL if raw is None else int(raw)
+
+
+def _drop_closed(keep: int) -> int:
+    """Забыть самые старые дочитанные потоки сверх keep (под _lock)."""
+    closed = [pid for pid, s in _streams.items() if s.closed]
+    stale = closed[: max(0, len(closed) - keep)]
+    for pid in stale:
+        del _streams[pid]
+    return len(stale)
+
+
+def register(pid: int, stream: OutputStream) -> None:
+    with _lock:
+        _streams.pop(pid, None)  # pid переиспользован — в конец очереди
+        _streams[pid] = stream
+        _drop_closed(KEEP_CLOSED)
+
+
+def prune() -> int:
+    """Забыть все дочитанные потоки (конец прогона). Возвращает их число."""
+    with _lock:
+        return _drop_closed(0)
+
+
+def get(pid: int) -> Optional[OutputStream]:
+    with _lock:
+        return _streams.get(pid)
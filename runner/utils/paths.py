@@ -92,3 +92,18 @@ def resolve_image_path(p: str, cfg: Dict[str, Any]) -> Path:
         return cand.resolve()
 
     return (assets_abs / p).resolve()
+
+
+def artifacts_dir(cfg: Dict[str, Any], kind: str) -> Path:
+    """<project_root>/artifacts/<kind>/ (создаётся при первом обращении)."""
+    root = Path((cfg.get("paths") or {}).get("project_root", "."))
+    d = root / "artifacts" / kind
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def step_stub_name(step: Dict[str, Any], fallback: str = "step") -> str:
+    """Имя шага (или действия) в виде, пригодном для имени файла артефакта."""
+    n = (step.get("name") or step.get("action") or fallback).strip()
+    safe = "".join(ch for ch in n if ch.isalnum() or ch in ("-", "_", " "))
+    return safe.replace(" ", "_")[:80]
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Общий снимок таблицы процессов для условий process_exists и wait_process.
+
+  - таблица перечисляется (psutil.process_iter) не чаще раза в max_age:
+    условия гонки, ветки parallel и опросы wait_process делят один обход;
+  - индексы pid -> имя и имя -> pid'ы: проверка pid — словарь,
+    regex по имени — по уникальным именам, а не по всем процессам;
+  - track(proc) — процессы, запущенные прогоном (run_program): их жизнь
+    и код завершения берутся у Popen без обхода таблицы. Завершившийся
+    процесс забывается, как только его код прочитан (exit_code), а
+    непрочитанные — после прогона (prune) и сверх KEEP_FINISHED.
+
+Время — по utils.timing, так что интервал работает и с виртуальными часами;
+снимок помнит часы, по которым снят, и после их смены (timing.use_clock)
+считается устаревшим — отметки разных часов несравнимы.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import threading
+from typing import Any, Dict, List, Optional, Pattern
+
+from . import timing
+from .timeparse import parse_duration
+
+# полный обход таблицы — единицы-десятки мс; 250 мс — заметно реже опросов
+DEFAULT_INTERVAL = 0.25
+# сколько завершившихся, но не прочитанных своих процессов помнить
+KEEP_FINISHED = 32
+
+_lock = threading.Lock()
+_by_pid: Dict[int, str] = {}
+_by_name: Dict[str, List[int]] = {}
+_taken_at: Optional[float] = None
+_taken_by: Optional[timing.Clock] = None
+_spawned: Dict[int, subprocess.Popen] = {}
+_stats: Dict[str, int] = {"full": 0, "cached": 0, "spawned": 0}
+
+
+def interval_for(config: Dict[str, Any]) -> float:
+    """process.snapshot_interval из конфига (0 — обход на каждую проверку)."""
+    raw = (config.get("process") or {}).get("snapshot_interval")
+    interval = parse_duration(raw)
+    return DEFAULT_INTERVAL if interval is None else interval
+
+
+def _refresh(max_age: float) -> None:
+    global _by_pid, _by_name, _taken_at, _taken_by
+    with _lock:
+        if (
+            _taken_at is not None
+            and _taken_by is timing.clock()
+            and timing.now() - _taken_at <= max_age
+        ):
+            _stats["cached"] += 1
+            return
+    import psutil
+
+    by_pid: Dict[int, str] = {}
+    by_name: Dict[str, List[int]] = {}
+    for p in psutil.process_iter(["name"]):
+        try:
+            name = str(p.info.get("name") or "")
+        except Exception:
+            name = ""
+        by_pid[p.pid] = name
+        by_name.setdefault(name, []).append(p.pid)
+    with _lock:
+        _by_pid, _by_name, _taken_at = by_pid, by_name, timing.now()
+        _taken_by = timing.clock()
+        _stats["full"] += 1
+
+
+def _drop_finished(keep: int) -> int:
+    """Забыть самые старые завершившиеся процессы сверх keep (под _lock)."""
+    done = [pid for pid, p in _spawned.items() if p.poll() is not None]
+    stale = done[: max(0, len(done) - keep)]
+    for pid in stale:
+        del _spawned[pid]
+    return len(stale)
+
+
+def track(proc: subprocess.Popen) -> None:
+    """Запомнить процесс, запущенный прогоном (для alive/exit_code)."""
+    with _lock:
+        _spawned.pop(proc.pid, None)
+        _spawned[proc.pid] = proc
+        _drop_finished(KEEP_FINISHED)
+
+
+def exit_code(pid: int) -> Optional[int]:
+    """
+    Код завершения запущенного нами процесса; None — жив или не наш.
+    Прочитанный код больше не хранится: процесс забывается.
+    """
+    with _lock:
+        proc = _spawned.get(pid)
+        code = None if proc is None else proc.poll()
+        if code is not None:
+            del _spawned[pid]
+    return code
+
+
+def prune() -> int:
+    """Забыть все завершившиеся свои процессы (конец прогона)."""
+    with _lock:
+        return _drop_finished(0)
+
+
+def alive(pid: int, max_age: float = DEFAULT_INTERVAL) -> bool:
+    with _lock:
+        proc = _spawned.get(pid)
+        if proc is not None:
+            _stats["spawned"] += 1
+    if proc is not None:
+        # свой процесс: poll() точнее снимка и не требует обхода
+        return proc.poll() is None
+    _refresh(max_age)
+    with _lock:
+        return pid in _by_pid
+
+
+def find(name_re: Pattern[str], max_age: float = DEFAULT_INTERVAL) -> List[int]:
+    """pid'ы процессов, чьё имя подходит под regex (по снимку не старше max_age)."""
+    _refresh(max_age)
+    with _lock:
+        by_name = _by_name
+    hits: List[int] = []
+    for name, pids in by_name.items():
+        if name_re.search(name) is not None:
+            hits.extend(pids)
+    return hits
+
+
+def invalidate() -> None:
+    """Сбросить снимок (после собственного запуска/остановки процессов)."""
+    global _taken_at
+    with _lock:
+        _taken_at = None
+
+
+def stats() -> Dict[str, int]:
+    """Полные обходы таблицы, попадания в снимок и проверки своих процессов."""
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+Пул долгоживущих сессий оболочки для коротких команд (run_ps, run_shell).
+
+Запуск powershell.exe стоит сотни миллисекунд; сессия из пула принимает
+команды через stdin и отвечает без повторного старта интерпретатора:
+
+  - команда передаётся целиком (PowerShell — base64, sh — quoted heredoc),
+    после неё сессия печатает в stdout и stderr строку-маркер с токеном
+    сессии; в stdout маркер несёт код завершения команды;
+  - sh выполняет команду в подоболочке, PowerShell — в дочерней области
+    видимости между Push-Location/Pop-Location с восстановлением окружения
+    процесса; сессию, в которой команда изменила $global:, пул заменяет:
+    переменные, $env: и каталог не протекают между командами разных шагов;
+  - stdin команды пуст (sh — /dev/null, PowerShell — $null): stdin сессии
+    занят под канал команд;
+  - сессия, которая умерла (exit в команде, краш) или выполнила
+    max_commands команд, закрывается; пул создаёт новую по требованию;
+  - по таймауту команды сессия убивается вместе со всеми процессами,
+    запущенными командой: сессия живёт в своей группе процессов (POSIX —
+    отдельная сессия, Windows — своя группа и taskkill /T).
+
+Пулы — на процесс: тёплый демон (runner serve) держит сессии между заданиями.
+"""
+
+from __future__ import annotations
+
+import atexit
+import base64
+import os
+import queue
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from .outputs import OutputStream
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_COMMANDS = 100
+
+# вид оболочки -> исполняемый файл
+_EXES = {
+    "powershell": "powershell.exe",
+    "pwsh": "pwsh",
+    "bash": "bash",
+    "sh": "sh",
+}
+
+
+def shell_settings(config: Dict[str, Any]) -> Tuple[int, int]:
+    """(shell.pool_size, shell.max_commands); pool_size 0 — пул выключен."""
+    sec = config.get("shell") or {}
+    size = sec.get("pool_size")
+    limit = sec.get("max_commands")
+    return (
+        DEFAULT_POOL_SIZE if size is None else int(size),
+        DEFAULT_MAX_COMMANDS if limit is None else int(limit),
+    )
+
+
+def default_shell() -> str:
+    """auto: PowerShell на Windows, иначе bash (или sh, если bash нет)."""
+    if sys.platform == "win32":
+        return "powershell"
+    return "bash" if shutil.which("bash") else "sh"
+
+
+def _ps_quote(s: str) -> str:
+    return "'" + s.replace("'", "''") + "'"
+
+
+def _sh_quote(s: str) -> str:
+    return "'" + s.replace("'", "'\\''") + "'"
+
+
+# глобальные переменные PowerShell без служебных (автоматических и $__ рамки)
+_PS_AUTO = (
+    "^(__|[?^$_]$|args$|input$|Error$|LASTEXITCODE$|Matches$|MyInvocation$"
+    "|PSItem$|PWD$|StackTrace$|foreach$|switch$|this$)"
+)
+_PS_GLOBALS = (
+    "@(Get-Variable -Scope Global | Where-Object { $_.Name -notmatch "
+    f"'{_PS_AUTO}' }}) | ForEach-Object -Begin {{ $__h = @{{}} }} "
+    "-Process { $__h[$_.Name] = ([psobject]$_.Value).BaseObject } -End { $__h }"
+)
+# окружение процесса — как до команды: лишнее удалить, прежнее вернуть
+_PS_RESTORE_ENV = (
+    "foreach ($__k in @([Environment]::GetEnvironmentVariables().Keys)) "
+    "{ if (-not $__env.Contains($__k)) "
+    "{ [Environment]::SetEnvironmentVariable($__k, $null) } }; "
+    "foreach ($__k in $__env.Keys) "
+    "{ [Environment]::SetEnvironmentVariable($__k, $__env[$__k]) }"
+)
+
+
+def group_options() -> Dict[str, Any]:
+    """Popen-параметры: процесс и его потомки — в отдельной группе процессов."""
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_group(proc: subprocess.Popen) -> None:
+    """Убивает процесс, запущенный с group_options(), и всех его потомков."""
+    if sys.platform == "win32":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass  # группы уже нет
+    if proc.poll() is None:
+        proc.kill()
+
+
+class ShellSession:
+    """Один процесс оболочки; команды выполняются строго по одной."""
+
+    def __init__(self, shell: str) -> None:
+        self.shell = shell
+        self.commands = 0
+        # команда оставила состояние, которое рамка не откатывает ($global:)
+        self.dirty = False
+        self._token = f"__RPA_{uuid.uuid4().hex}__"
+        self._done = re.compile(rf"^(.*){self._token} (-?\d+)$")
+        exe = _EXES[shell]
+        if self._powershell:
+            argv = [exe, "-NoLogo", "-NoProfile", "-NonInteractive"]
+            argv += ["-ExecutionPolicy", "Bypass", "-Command", "-"]
+        else:
+            argv = [exe, "-s"]
+        self.proc = subprocess.Popen(
+            argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            **group_options(),
+        )
+        self._out: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._err: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._pump(self.proc.stdout, self._out)
+        self._pump(self.proc.stderr, self._err)
+        if self._powershell:
+            # вывод в UTF-8; полоски прогресса в pipe только мешают
+            self._send(
+                "[Console]::OutputEncoding = [Text.Encoding]::UTF8; "
+                "$ProgressPreference = 'SilentlyContinue'"
+            )
+
+    @property
+    def _powershell(self) -> bool:
+        return self.shell in ("powershell", "pwsh")
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    @staticmethod
+    def _pump(pipe: Optional[IO[str]], q: "queue.Queue[Optional[str]]") -> None:
+        def _read() -> None:
+            try:
+                if pipe is not None:
+                    for line in pipe:
+                        q.put(line.rstrip("\r\n"))
+            except (OSError, ValueError):
+                pass
+            finally:
+                # pipe закрывает читатель: close() из другого потока ждал бы
+                # этот поток, пока пишущие потомки не закроют свой конец
+                if pipe is not None:
+                    try:
+                        pipe.close()
+                    except OSError:
+                        pass
+                q.put(None)  # EOF
+
+        threading.Thread(target=_read, name="shell-reader", daemon=True).start()
+
+    def _send(self, text: str) -> None:
+        assert self.proc.stdin is not None
+        self.proc.stdin.write(text + "\n")
+        self.proc.stdin.flush()
+
+    def _frame(self, command: str, cwd: Optional[str]) -> str:
+        tok = self._token
+        if self._powershell:
+            b64 = base64.b64encode(command.encode("utf-8")).decode("ascii")
+            loc = f"Set-Location -LiteralPath {_ps_quote(cwd)}; " if cwd else ""
+            # каталог и окружение восстанавливаются в finally; изменённые
+            # $global: не откатить — маркер в stderr просит сменить сессию
+            return (
+                "$global:LASTEXITCODE = 0; $__ok = $true; "
+                "$__env = [Environment]::GetEnvironmentVariables(); "
+                f"$__vars = {_PS_GLOBALS}; Push-Location; "
+                f"try {{ {loc}$null | & ([ScriptBlock]::Create([Text.Encoding]::"
+                f"UTF8.GetString([Convert]::FromBase64String('{b64}')))); "
+                "$__ok = $? } "
+                "catch { [Console]::Error.WriteLine($_); $__ok = $false } "
+                f"finally {{ Pop-Location; {_PS_RESTORE_ENV} }}; "
+                "$__c = if ($LASTEXITCODE) { $LASTEXITCODE } "
+                "elseif ($__ok) { 0 } else { 1 }; "
+                f"$__now = {_PS_GLOBALS}; $__dirty = 0; "
+                "foreach ($__k in $__now.Keys) { "
+                "if (-not $__vars.ContainsKey($__k) -or -not "
+                "[object]::ReferenceEquals($__vars[$__k], $__now[$__k])) "
+                "{ $__dirty = 1 } }; "
+                f"[Console]::Out.WriteLine('{tok} ' + $__c); "
+                f"[Console]::Error.WriteLine('{tok} ' + $__dirty)"
+            )
+        cd = f"cd {_sh_quote(cwd)} || exit 1\n" if cwd else ""
+        return (
+            f"( {cd}eval \"$(cat <<'{tok}CMD'\n{command}\n{tok}CMD\n)\"\n"
+            f") </dev/null; __c=$?\n"
+            f"printf '%s %s\\n' '{tok}' \"$__c\"; printf '%s 0\\n' '{tok}' >&2"
+        )
+
+    def _collect(
+        self,
+        q: "queue.Queue[Optional[str]]",
+        kind: str,
+        deadline: Optional[float],
+        sink: Optional[OutputStream],
+    ) -> Tuple[List[str], Optional[int]]:
+        """Строки до маркера; код из маркера или None, если сессия умерла."""
+        lines: List[str] = []
+        while True:
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left <= 0:
+                raise TimeoutError
+            try:
+                line = q.get(timeout=left)
+            except queue.Empty:
+                raise TimeoutError
+            if line is None:
+                return lines, None
+            m = self._done.match(line)
+            if m is not None:
+                line = m.group(1)
+            if m is None or line:
+                lines.append(line)
+                if sink is not None:
+                    sink.feed(kind, line)
+            if m is not None:
+                return lines, int(m.group(2))
+
+    def run(
+        self,
+        command: str,
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = None,
+        sink: Optional[OutputStream] = None,
+    ) -> Tuple[int, str, str]:
+        """Выполнить команду: (код, stdout, stderr). TimeoutError — по таймауту."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.commands += 1
+        try:
+            self._send(self._frame(command, cwd))
+            out, code = self._collect(self._out, "out", deadline, sink)
+            err, dirty = self._collect(self._err, "err", deadline, sink)
+            self.dirty = bool(dirty)
+        except TimeoutError:
+            self.close(kill_tree=True)
+            raise
+        except OSError:
+            # stdin закрыт: сессия умерла раньше, чем приняла команду
+            out, err, code = [], [], None
+        if code is None:
+            # команда завершила саму оболочку (exit) — её код и есть код выхода
+            code = self.proc.wait()
+        return code, "\n".join(out), "\n".join(err)
+
+    def close(self, kill_tree: bool = False) -> None:
+        """
+        Завершает сессию. kill_tree — и всё, что запустили её команды
+        (таймаут); иначе фоновые процессы команд переживают сессию.
+        """
+        if kill_tree:
+            kill_group(self.proc)
+        elif self.alive:
+            self.proc.kill()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        if self.proc.stdin is not None:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+
+
+class ShellPool:
+    """До size сессий одной оболочки; занятые ждут освобождения."""
+
+    def __init__(self, shell: str, size: int, max_commands: int) -> None:
+        self.shell = shell
+        self.size = max(1, size)
+        self.max_commands = max(1, max_commands)
+        self._idle: List[ShellSession] = []
+        self._count = 0
+        self._cond = threading.Condition()
+        self.started = 0
+
+    def _acquire(self) -> ShellSession:
+        with self._cond:
+            while True:
+                while self._idle:
+                    sess = self._idle.pop()
+                    if sess.alive:
+                        return sess
+                    sess.close()
+                    self._count -= 1
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                self._cond.wait()
+        try:
+            sess = ShellSession(self.shell)
+        except BaseException:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+        self.started += 1
+        return sess
+
+    def _release(self, sess: ShellSession) -> None:
+        retire = not sess.alive or sess.dirty or sess.commands >= self.max_commands
+        if retire:
+            sess.close()
+        with self._cond:
+            if retire:
+                self._count -= 1
+            else:
+                self._idle.append(sess)
+            self._cond.notify()
+
+    def run(
+        self,
+        command: str,
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = None,
+        sink: Optional[OutputStream] = None,
+    ) -> Tuple[int, str, str]:
+        sess = self._acquire()
+        try:
+            return sess.run(command, cwd, timeout, sink)
+        finally:
+            self._release(sess)
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+        for sess in idle:
+            sess.close()
+
+
+_lock = threading.Lock()
+_pools: Dict[str, ShellPool] = {}
+
+
+def pool(shell: str, config: Dict[str, Any]) -> ShellPool:
+    """Общий пул сессий оболочки shell (размеры — из config.shell)."""
+    if shell not in _EXES:
+        raise ValueError(f"unknown shell: {shell!r}")
+    size, limit = shell_settings(config)
+    with _lock:
+        p = _pools.get(shell)
+        if p is None:
+            p = _pools[shell] = ShellPool(shell, size, limit)
+        else:
+            p.size, p.max_commands = max(1, size), max(1, limit)
+        return p
+
+
+def close_all() -> None:
+    with _lock:
+        pools = list(_pools.values())
+    for p in pools:
+        p.close()
+
+
+atexit.register(close_all)
+
+
+def script_command(shell: str, path: str, args: List[str]) -> str:
+    """Вызов файла скрипта с аргументами как команда сессии."""
+    if shell in ("powershell", "pwsh"):
+        return "& " + " ".join(_ps_quote(x) for x in [path, *args])
+    return " ".join(_sh_quote(x) for x in [path, *args])
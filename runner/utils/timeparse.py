@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 
 def parse_duration(text: str | int | float | None) -> float | None:
     """
@@ -11,7 +13,13 @@ def parse_duration(text: str | int | float | None) -> float | None:
         return None
     if isinstance(text, (int, float)):
         return float(text)
-    s = str(text).strip().lower()
+    return _parse_duration_str(str(text))
+
+
+@lru_cache(maxsize=512)
+def _parse_duration_str(text: str) -> float:
+    # строки из сценариев повторяются (циклы, опросы) — парсим один раз
+    s = text.strip().lower()
     if s.endswith("ms"):
         return float(s[:-2]) / 1000.0
     if s.endswith("s"):
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Единый источник времени для раннера: монотонные часы, точный сон
+и опрос с фиксированной частотой.
+
+  - всё время — time.perf_counter (монотонно, не зависит от перевода часов);
+  - sleep_until спит "грубо" до дедлайна минус _SPIN, остаток добирает
+    коротким циклом с time.sleep(0) — на Windows обычный sleep квантуется
+    по ~15 мс, а задержки в 10–20 мс в сценариях встречаются часто;
+  - ticks отдаёт попытки опроса по сетке start + k*period: время работы
+    попытки входит в период, а не прибавляется к нему; пропущенные из-за
+    долгой попытки тики не "догоняются" пачкой.
+
+Задержки шагов (delay_before/delay_after/delay_between_steps), sleep,
+паузы опроса vision/window — всё идёт через этот модуль, поэтому
+stats() показывает, сколько раннер проспал и насколько опаздывал.
+
+Часы подменяемы (use_clock): VirtualClock не спит, а сдвигает время,
+так что сценарий с минутами ожиданий проходит за миллисекунды, а
+virtual_elapsed показывает, сколько он шёл бы на самом деле.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, Optional, Protocol
+
+# на Windows до 3.11 time.sleep квантуется таймером ОС (~15.6 мс);
+# с 3.11 там high-resolution waitable timer, как и на прочих ОС
+if sys.platform == "win32" and sys.version_info < (3, 11):
+    _SPIN = 0.016
+else:
+    _SPIN = 0.002
+
+
+class Waiter(Protocol):
+    """То, что умеет прерывать сон (CancelToken)."""
+
+    @property
+    def cancelled(self) -> bool: ...
+
+    def wait(self, seconds: float) -> bool: ...
+
+
+class Clock:
+    """Монотонные часы + сон до дедлайна со статистикой опозданий."""
+
+    simulated = False
+    sleeps: int
+    slept: float
+    late_total: float
+    late_max: float
+
+    def __init__(self, spin: float = _SPIN) -> None:
+        self.spin = spin
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep_until(self, deadline: float, cancel: Optional[Waiter] = None) -> bool:
+        """Спит до момента deadline (по now()). True — если пришла отмена."""
+        t0 = self.now()
+        while True:
+            left = deadline - self.now()
+            if left <= 0:
+                break
+            if left > self.spin:
+                coarse = left - self.spin
+                if cancel is not None:
+                    if cancel.wait(coarse):
+                        return True
+                else:
+                    time.sleep(coarse)
+            else:
+                if cancel is not None and cancel.cancelled:
+                    return True
+                time.sleep(0)  # отдаём квант другим потокам, но не засыпаем
+        self._account(t0, deadline)
+        return False
+
+    def sleep(self, seconds: float, cancel: Optional[Waiter] = None) -> bool:
+        if seconds <= 0:
+            return cancel is not None and cancel.cancelled
+        return self.sleep_until(self.now() + seconds, cancel)
+
+    async def asleep_until(
+        self, deadline: float, cancel: Optional[Waiter] = None
+    ) -> bool:
+        """asyncio-вариант: отмена проверяется не реже раза в 50 мс."""
+        import asyncio
+
+        t0 = self.now()
+        while True:
+            if cancel is not None and cancel.cancelled:
+                return True
+            left = deadline - self.now()
+            if left <= 0:
+                break
+            await asyncio.sleep(min(left, 0.05))
+        self._account(t0, deadline)
+        return False
+
+    def branch(self, start: float) -> ContextManager[None]:
+        """Ветка parallel, начатая в момент start (у реальных часов — no-op)."""
+        return nullcontext()
+
+    def advance_to(self, t: float) -> None:
+        """Реальное время само дошло до t; виртуальное — подтягивается."""
+
+    def _account(self, t0: float, deadline: float) -> None:
+        end = self.now()
+        late = max(0.0, end - deadline)
+        with self._lock:
+            self.sleeps += 1
+            self.slept += end - t0
+            self.late_total += late
+            self.late_max = max(self.late_max, late)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.sleeps = 0
+            self.slept = 0.0
+            self.late_total = 0.0
+            self.late_max = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            n = self.sleeps
+            return {
+                "sleeps": n,
+                "slept": self.slept,
+                "late_avg": self.late_total / n if n else 0.0,
+                "late_max": self.late_max,
+            }
+
+
+class _Timeline:
+    __slots__ = ("t",)
+
+    def __init__(self, t: float) -> None:
+        self.t = t
+
+
+class VirtualClock(Clock):
+    """
+    Симулированное время: sleep/sleep_until не ждут, а сдвигают часы до
+    дедлайна; дедлайны ticks и таймауты опроса считаются по ним же.
+    Ветки parallel идут по своим линиям времени от момента форка (branch),
+    а сам parallel после join сдвигается на самую долгую учтённую ветку —
+    так виртуальное время параллельного блока равно max, а не сумме.
+    Работа (поиск шаблонов, процессы) времени не занимает: считается
+    только ожидание.
+    """
+
+    simulated = True
+
+    def __init__(self, start: float = 0.0) -> None:
+        super().__init__(spin=0.0)
+        self.start = start
+        self._root = _Timeline(start)
+        self._line: contextvars.ContextVar[_Timeline] = contextvars.ContextVar(
+            "timeline"
+        )
+
+    def _timeline(self) -> _Timeline:
+        return self._line.get(self._root)
+
+    def now(self) -> float:
+        return self._timeline().t
+
+    def advance_to(self, t: float) -> None:
+        line = self._timeline()
+        with self._lock:
+            line.t = max(line.t, t)
+
+    def advance(self, seconds: float) -> None:
+        self.advance_to(self.now() + seconds)
+
+    def sleep_until(self, deadline: float, cancel: Optional[Waiter] = None) -> bool:
+        if cancel is not None and cancel.cancelled:
+            return True
+        t0 = self.now()
+        self.advance_to(deadline)
+        self._account(t0, deadline)
+        time.sleep(0)  # даём ход другим потокам (ветки, отмена)
+        return False
+
+    async def asleep_until(
+        self, deadline: float, cancel: Optional[Waiter] = None
+    ) -> bool:
+        import asyncio
+
+        if cancel is not None and cancel.cancelled:
+            return True
+        t0 = self.now()
+        self.advance_to(deadline)
+        self._account(t0, deadline)
+        await asyncio.sleep(0)
+        return False
+
+    @contextmanager
+    def branch(self, start: float) -> Iterator[None]:
+        token = self._line.set(_Timeline(start))
+        try:
+            yield
+        finally:
+            self._line.reset(token)
+
+    @property
+    def virtual_elapsed(self) -> float:
+        """Сколько времени прошло бы по-настоящему (по корневой линии)."""
+        return self._root.t - self.start
+
+
+_clock: Clock = Clock()
+
+
+def clock() -> Clock:
+    return _clock
+
+
+def set_clock(new: Clock) -> Clock:
+    """Подменяет часы процесса, возвращает прежние."""
+    global _clock
+    prev, _clock = _clock, new
+    return prev
+
+
+@contextmanager
+def use_clock(new: Clock) -> Iterator[Clock]:
+    prev = set_clock(new)
+    try:
+        yield new
+    finally:
+        set_clock(prev)
+
+
+def now() -> float:
+    return _clock.now()
+
+
+def sleep(seconds: float, cancel: Optional[Waiter] = None) -> bool:
+    """Точный сон на seconds. True — если сон прерван отменой."""
+    return _clock.sleep(seconds, cancel)
+
+
+def sleep_until(deadline: float, cancel: Optional[Waiter] = None) -> bool:
+    return _clock.sleep_until(deadline, cancel)
+
+
+async def asleep(seconds: float, cancel: Optional[Waiter] = None) -> bool:
+    return await _clock.asleep_until(_clock.now() + seconds, cancel)
+
+
+def branch(start: float) -> ContextManager[None]:
+    return _clock.branch(start)
+
+
+def advance_to(t: float) -> None:
+    _clock.advance_to(t)
+
+
+def stats() -> Dict[str, float]:
+    return _clock.stats()
+
+
+def ticks(
+    period: float,
+    timeout: Optional[float] = None,
+    cancel: Optional[Waiter] = None,
+) -> Iterator[int]:
+    """
+    Попытки опроса с фиксированной частотой: 0, 1, 2, ... Первая — сразу,
+    k-я — в start + k*period. Если попытка заняла дольше периода, следующая
+    идёт на ближайшем будущем тике (без серии "догоняющих" попыток).
+    timeout ограничивает последний тик: после дедлайна попыток нет.
+    Отмена просто завершает итерацию — решение за вызывающим.
+    """
+    period = max(0.0, period)
+    start = _clock.now()
+    deadline = None if timeout is None else start + timeout
+    k = 0
+    while True:
+        yield k
+        k += 1
+        now = _clock.now()
+        due = start + k * period
+        if due < now and period > 0:
+            k = int((now - start) // period) + 1
+            due = start + k * period
+        if deadline is not None and due >= deadline:
+            return
+        if _clock.sleep_until(due, cancel):
+            return
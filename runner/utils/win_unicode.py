@@ -3,9 +3,10 @@ from __future__ import annotations
 
 import ctypes
 from ctypes import wintypes
-import time
 from typing import Callable, Optional, Sequence
 
+from . import timing
+
 # user32 с корректной обработкой ошибок
 user32 = ctypes.WinDLL("user32", use_last_error=True)
 
@@ -119,6 +120,6 @@ def send_unicode_text(
             send_unicode_char(ch)
 
         if delay_fn is not None:
-            time.sleep(max(0.0, float(delay_fn(ch))))
+            timing.sleep(max(0.0, float(delay_fn(ch))))
         elif per_char_delay > 0:
-            time.sleep(per_char_delay)
+            timing.sleep(per_char_delay)
@@ -2,8 +2,11 @@
 from __future__ import annotations
 
 import ctypes
+import threading
 from ctypes import wintypes
-from typing import Tuple
+from typing import Callable, List, Optional, Tuple
+
+from . import timing
 
 user32 = ctypes.WinDLL("user32", use_last_error=True)
 
@@ -22,6 +25,35 @@ ClientToScreen = user32.ClientToScreen
 ClientToScreen.argtypes = (wintypes.HWND, ctypes.POINTER(wintypes.POINT))
 ClientToScreen.restype = wintypes.BOOL
 
+GetWindowTextW = user32.GetWindowTextW
+GetWindowTextW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+GetWindowTextW.restype = ctypes.c_int
+
+GetWindowTextLengthW = user32.GetWindowTextLengthW
+GetWindowTextLengthW.argtypes = (wintypes.HWND,)
+GetWindowTextLengthW.restype = ctypes.c_int
+
+GetClassNameW = user32.GetClassNameW
+GetClassNameW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+GetClassNameW.restype = ctypes.c_int
+
+IsWindowVisible = user32.IsWindowVisible
+IsWindowVisible.argtypes = (wintypes.HWND,)
+IsWindowVisible.restype = wintypes.BOOL
+
+EnumWindows = user32.EnumWindows
+EnumWindows.restype = wintypes.BOOL  # сигнатура колбэка — EnumWindowsProc ниже
+
+SetForegroundWindow = user32.SetForegroundWindow
+SetForegroundWindow.argtypes = (wintypes.HWND,)
+SetForegroundWindow.restype = wintypes.BOOL
+
+ShowWindow = user32.ShowWindow
+ShowWindow.argtypes = (wintypes.HWND, ctypes.c_int)
+ShowWindow.restype = wintypes.BOOL
+
+SW_RESTORE = 9
+
 
 def get_foreground_hwnd() -> int:
     return int(GetForegroundWindow())
@@ -60,3 +92,108 @@ def get_active_client_bbox() -> Tuple[int, int, int, int]:
     if hwnd == 0:
         raise RuntimeError("No foreground window")
     return get_client_rect_abs(hwnd)
+
+
+# Один колбэк EnumWindows на процесс: WINFUNCTYPE-обёртка и буферы
+# создаются однажды, а что делать с окном, решает visitor текущего потока.
+# BOOL CALLBACK EnumWindowsProc(HWND hwnd, LPARAM lParam)
+EnumWindowsProc = ctypes.WINFUNCTYPE(ctypes.c_bool, wintypes.HWND, wintypes.LPARAM)
+_tls = threading.local()
+_BUF_LEN = 512
+
+
+def _buffer() -> ctypes.Array:
+    buf = getattr(_tls, "buf", None)
+    if buf is None:
+        buf = _tls.buf = ctypes.create_unicode_buffer(_BUF_LEN)
+    return buf
+
+
+def _get_text(hwnd: int) -> str:
+    buf = _buffer()
+    n = GetWindowTextW(hwnd, buf, _BUF_LEN)
+    if n < _BUF_LEN - 1:
+        return buf.value if n > 0 else ""
+    # длинный заголовок — редкость, тогда уже спрашиваем длину
+    n = GetWindowTextLengthW(hwnd)
+    big = ctypes.create_unicode_buffer(n + 1)
+    GetWindowTextW(hwnd, big, n + 1)
+    return big.value or ""
+
+
+def _get_class(hwnd: int) -> str:
+    buf = _buffer()
+    GetClassNameW(hwnd, buf, 256)
+    return buf.value or ""
+
+
+def _visit(hwnd, lparam):
+    try:
+        if not IsWindowVisible(hwnd):
+            return True
+        title = _get_text(hwnd)
+        if not title:
+            return True
+        if _tls.visitor((int(hwnd), title, _get_class(hwnd))):
+            return True
+        _tls.stopped = True
+        return False
+    except Exception:
+        # не роняем перечисление
+        return True
+
+
+_enum_cb = EnumWindowsProc(_visit)
+
+
+def _enumerate(visitor: Callable[[Tuple[int, str, str]], bool]) -> None:
+    """visitor((hwnd, title, class)) -> продолжать ли перечисление."""
+    prev = getattr(_tls, "visitor", None), getattr(_tls, "stopped", False)
+    _tls.visitor, _tls.stopped = visitor, False
+    try:
+        ctypes.set_last_error(0)
+        # остановку visitor'ом не проверяем по last error: его перезаписывают
+        # GetWindowTextW/GetClassNameW внутри колбэка (окно могло исчезнуть)
+        if not EnumWindows(_enum_cb, 0) and not _tls.stopped:
+            code = ctypes.get_last_error()
+            if code:
+                raise ctypes.WinError(code)
+    finally:
+        _tls.visitor, _tls.stopped = prev
+
+
+def enum_windows() -> List[Tuple[int, str, str]]:
+    """Видимые окна с заголовком: (hwnd, title, class), в z-порядке."""
+    items: List[Tuple[int, str, str]] = []
+
+    def _add(info: Tuple[int, str, str]) -> bool:
+        items.append(info)
+        return True
+
+    _enumerate(_add)
+    return items
+
+
+def find_window(
+    match: Callable[[Tuple[int, str, str]], bool],
+) -> Optional[Tuple[int, str, str]]:
+    """Первое окно (в z-порядке), для которого match — True; дальше не перечисляем."""
+    found: List[Tuple[int, str, str]] = []
+
+    def _check(info: Tuple[int, str, str]) -> bool:
+        if match(info):
+            found.append(info)
+            return False
+        return True
+
+    _enumerate(_check)
+    return found[0] if found else None
+
+
+def focus_window(hwnd: int) -> bool:
+    """Восстанавливает окно и выводит на передний план (повтор через 50 мс)."""
+    ShowWindow(hwnd, SW_RESTORE)
+    if SetForegroundWindow(hwnd):
+        return True
+    timing.sleep(0.05)
+    return bool(SetForegroundWindow(hwnd))
@@ -3,19 +3,11 @@ from __future__ import annotations
 
 from typing import Tuple
 import numpy as np
-import mss
+
+from .. import desktop
 
 
 # bbox: (left, top, width, height)
 def grab_bgr(bbox: Tuple[int, int, int, int]) -> np.ndarray:
-    left, top, width, height = bbox
-    region = {
-        "left": int(left),
-        "top": int(top),
-        "width": int(width),
-        "height": int(height),
-    }
-    with mss.mss() as sct:
-        shot = sct.grab(region)  # BGRA
-        arr = np.array(shot, dtype=np.uint8)
-        return arr[:, :, :3]  # BGR
+    """Кадр из текущего рабочего стола (native — mss, sim — синтетический буфер)."""
+    return desktop.current().grab(bbox)
@@ -199,6 +199,25 @@ def _search_orb(scene_g: np.ndarray, tmpl_g: np.ndarray) -> Optional[MatchResult
 # ------------------------------- public API -------------------------------
 
 
+def score_at(
+    scene_bgr: np.ndarray, tmpl_g: np.ndarray, use_clahe: bool = True
+) -> float:
+    """
+    Одномасштабная проверка: лучший TM_CCOEFF_NORMED шаблона (уже grayscale,
+    уже в нужном масштабе) внутри небольшого патча сцены. use_clahe — как
+    у find_template: шаблон тогда ждём уже выровненным (load_gray_variant
+    с clahe=True), а патч выравниваем здесь, чтобы метрика была та же.
+    """
+    s_g = _to_gray(scene_bgr)
+    if use_clahe:
+        s_g = _clahe(s_g)
+    th, tw = tmpl_g.shape[:2]
+    if th == 0 or tw == 0 or th > s_g.shape[0] or tw > s_g.shape[1]:
+        return 0.0
+    score, _ = _best_of_tm(s_g, tmpl_g)
+    return score
+
+
 def find_template(
     scene_bgr: np.ndarray,
     tmpl_bgr: np.ndarray,
@@ -227,20 +246,21 @@ def find_template(
         lo, hi = hi, lo
     steps = max(1, int(steps))
 
+    def _res(
+        rect: Tuple[int, int, int, int], score: float, method: str
+    ) -> Dict[str, Any]:
+        return {"rect": rect, "score": float(score), "method": method}
+
     # 2) единичные режимы
     if method == "tm":
         score, rect = _search_tm_multiscale(s_g, t_g, (lo, hi), steps)
-        return {"rect": rect, "score": float(score), "method": "tm"}
+        return _res(rect, score, "tm")
     if method == "edges":
         score, rect = _search_edges_multiscale(s_g, t_g, (lo, hi), steps, canny=canny)
-        return {"rect": rect, "score": float(score), "method": "edges"}
+        return _res(rect, score, "edges")
     if method == "orb":
         m = _search_orb(s_g, t_g)
-        return (
-            None
-            if m is None
-            else {"rect": m.rect, "score": float(m.score), "method": "orb"}
-        )
+        return None if m is None else _res(m.rect, m.score, "orb")
 
     # 3) hybrid: берём максимум TM/Edges
     if method == "hybrid":
@@ -249,8 +269,8 @@ def find_template(
             s_g, t_g, (lo, hi), steps, canny=canny
         )
         if score_ed >= score_tm:
-            return {"rect": rect_ed, "score": float(score_ed), "method": "edges"}
-        return {"rect": rect_tm, "score": float(score_tm), "method": "tm"}
+            return _res(rect_ed, score_ed, "edges")
+        return _res(rect_tm, score_tm, "tm")
 
     # 4) auto: TM vs Edges → если оба слабы — ORB
     score_tm, rect_tm = _search_tm_multiscale(s_g, t_g, (lo, hi), steps)
@@ -261,13 +281,13 @@ def find_template(
 
     if max(score_tm, score_ed_cal) >= max(threshold, 0.55):
         if score_ed_cal >= score_tm:
-            return {"rect": rect_ed, "score": float(score_ed), "method": "edges"}
-        return {"rect": rect_tm, "score": float(score_tm), "method": "tm"}
+            return _res(rect_ed, score_ed, "edges")
+        return _res(rect_tm, score_tm, "tm")
 
     # Слабо? Пробуем ORB как fallback
     m = _search_orb(s_g, t_g)
     if m is not None:
-        return {"rect": m.rect, "score": float(m.score), "method": "orb"}
+        return _res(m.rect, m.score, "orb")
 
     # Совсем не нашли
     return None
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple
+
+import cv2
+import numpy as np
+
+from ..context import Context
+from .grab import grab_bgr
+from .region import resolve_region
+
+BGR = Tuple[int, int, int]
+
+
+def parse_color(val: Any) -> BGR:
+    """
+    Цвет в DSL задаётся как '#RRGGBB' или [r, g, b].
+    Возвращает BGR (как в кадре mss/OpenCV).
+    """
+    if isinstance(val, str):
+        s = val.strip().lstrip("#")
+        if len(s) != 6:
+            raise ValueError(f"color must be '#RRGGBB', got {val!r}")
+        r, g, b = int(s[0:2], 16), int(s[2:4], 16), int(s[4:6], 16)
+    elif isinstance(val, (list, tuple)) and len(val) == 3:
+        r, g, b = (int(v) for v in val)
+    else:
+        raise ValueError(f"color must be '#RRGGBB' or [r, g, b], got {val!r}")
+    if not all(0 <= v <= 255 for v in (r, g, b)):
+        raise ValueError(f"color components must be within 0..255, got {val!r}")
+    return b, g, r
+
+
+def color_bounds(spec: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Диапазон цвета: либо lower/upper, либо color ± tolerance. Границы — BGR uint8.
+    """
+    if "lower" in spec or "upper" in spec:
+        lo = np.array(parse_color(spec.get("lower", [0, 0, 0])), dtype=np.uint8)
+        hi = np.array(parse_color(spec.get("upper", [255, 255, 255])), dtype=np.uint8)
+        return lo, hi
+    if "color" not in spec:
+        raise ValueError("color probe: 'color' or 'lower'/'upper' is required")
+    c = np.array(parse_color(spec["color"]), dtype=np.int16)
+    tol = int(spec.get("tolerance", 16))
+    lo = np.clip(c - tol, 0, 255).astype(np.uint8)
+    hi = np.clip(c + tol, 0, 255).astype(np.uint8)
+    return lo, hi
+
+
+def in_range_ratio(scene_bgr: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> float:
+    """Доля пикселей кадра, попавших в [lo, hi] по всем каналам."""
+    if scene_bgr.size == 0:
+        return 0.0
+    mask = cv2.inRange(np.ascontiguousarray(scene_bgr), lo, hi)
+    return float(cv2.countNonZero(mask)) / float(mask.size)
+
+
+def frame_signature(scene_bgr: np.ndarray, max_side: int = 64) -> np.ndarray:
+    """
+    Уменьшенный grayscale-отпечаток кадра: каждый пиксель — среднее по блоку
+    исходника (INTER_AREA), так что локальные изменения не теряются.
+    """
+    g = cv2.cvtColor(scene_bgr, cv2.COLOR_BGR2GRAY)
+    h, w = g.shape[:2]
+    k = max(h, w) / float(max(1, max_side))
+    if k <= 1.0:
+        return g
+    size = (max(1, int(round(w / k))), max(1, int(round(h / k))))
+    return cv2.resize(g, size, interpolation=cv2.INTER_AREA)
+
+
+def frame_diff(a: np.ndarray, b: np.ndarray) -> float:
+    """Максимальное поблочное отличие двух отпечатков (0..255)."""
+    if a.shape != b.shape:
+        return 255.0
+    return float(cv2.absdiff(a, b).max())
+
+
+# ----------------------------- пробы для DSL -----------------------------
+
+
+def probe_pixel(ctx: Context, spec: Dict[str, Any]) -> Tuple[bool, BGR]:
+    """
+    pixel_is: x, y (относительно region), color, tolerance?
+    Захватывает ровно один пиксель. Возвращает (совпало?, фактический BGR).
+    """
+    if "x" not in spec or "y" not in spec:
+        raise ValueError("pixel_is: 'x' and 'y' are required")
+    if "color" not in spec:
+        raise ValueError("pixel_is: 'color' is required")
+    left, top, _, _ = resolve_region(spec.get("region"), ctx)
+    want = parse_color(spec["color"])
+    tol = int(spec.get("tolerance", 16))
+
+    px = grab_bgr((left + int(spec["x"]), top + int(spec["y"]), 1, 1))[0, 0]
+    got: BGR = (int(px[0]), int(px[1]), int(px[2]))
+    ok = all(abs(a - b) <= tol for a, b in zip(got, want))
+    return ok, got
+
+
+def probe_color_ratio(ctx: Context, spec: Dict[str, Any]) -> Tuple[bool, float]:
+    """
+    color_ratio: region, color+tolerance | lower/upper, min_ratio?, max_ratio?
+    Возвращает (ratio в [min_ratio, max_ratio]?, ratio).
+    """
+    region = resolve_region(spec.get("region"), ctx)
+    lo, hi = color_bounds(spec)
+    min_ratio = float(spec.get("min_ratio", 0.5))
+    max_ratio = float(spec.get("max_ratio", 1.0))
+
+    ratio = in_range_ratio(grab_bgr(region), lo, hi)
+    return min_ratio <= ratio <= max_ratio, ratio
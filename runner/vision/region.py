@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple
+
+from .. import desktop
+from ..context import Context
+
+Rect = Tuple[int, int, int, int]
+
+
+def _anchor_region(spec: Dict[str, Any], ctx: Context) -> Rect:
+    """
+    {anchor: <id>, dx?, dy?, width?, height?} — смещение от левого верхнего
+    угла ранее найденного якоря (ctx.state["anchor:<id>"]).
+    Размер по умолчанию — размер якоря.
+    """
+    aid = str(spec["anchor"])
+    dx = int(spec.get("dx", 0))
+    dy = int(spec.get("dy", 0))
+    hit = ctx.state.get(f"anchor:{aid}")
+    if not hit:
+        if ctx.dry_run:
+            # в dry-run якоря никто не ищет — отдаём заглушку нужного размера
+            w = max(1, int(spec.get("width", 1)))
+            h = max(1, int(spec.get("height", 1)))
+            return dx, dy, w, h
+        raise RuntimeError(
+            f"region: якорь '{aid}' ещё не найден (нужен vision-шаг с anchor_id: {aid})"
+        )
+    ax, ay, aw, ah = (int(v) for v in hit["rect"])
+    width = int(spec.get("width", aw))
+    height = int(spec.get("height", ah))
+    if width < 1 or height < 1:
+        raise ValueError(f"region: width/height must be >= 1, got {width}x{height}")
+    return ax + dx, ay + dy, width, height
+
+
+def _fraction_region(spec: Dict[str, Any], ctx: Context) -> Rect:
+    """
+    {fraction: [x, y, w, h], of?: <region>} — доли (0..1) базовой области;
+    базовая — любая region (screen, window, прямоугольник, якорь),
+    по умолчанию window. Доля не может выходить за базовую область.
+    """
+    frac = spec["fraction"]
+    if not isinstance(frac, (list, tuple)) or len(frac) != 4:
+        raise ValueError("region: 'fraction' must be [x, y, w, h]")
+    fx, fy, fw, fh = (float(v) for v in frac)
+    if not all(0.0 <= v <= 1.0 for v in (fx, fy, fw, fh)):
+        raise ValueError(f"region: fraction values must be within 0..1, got {frac!r}")
+    if fx + fw > 1.0 + 1e-9 or fy + fh > 1.0 + 1e-9:
+        raise ValueError(
+            f"region: fraction {frac!r} spills outside the base area"
+            " (x + w and y + h must be <= 1)"
+        )
+    left, top, bw, bh = resolve_region(spec.get("of", "window"), ctx)
+    x = int(round(bw * fx))
+    y = int(round(bh * fy))
+    # округление не должно вывести прямоугольник за край базы
+    return (
+        left + x,
+        top + y,
+        max(1, min(int(round(bw * fw)), bw - x)),
+        max(1, min(int(round(bh * fh)), bh - y)),
+    )
+
+
+def resolve_region(spec: Any, ctx: Context) -> Rect:
+    """
+    region: None|"default"|"screen"|"window"
+            |{left,top,width,height}
+            |{anchor, dx?, dy?, width?, height?}
+            |{fraction: [x,y,w,h], of?}
+    Возвращает абсолютный bbox (left, top, width, height).
+    """
+    if spec in (None, "default"):
+        spec = (ctx.config.get("vision") or {}).get("default_region", "screen")
+
+    if spec == "screen":
+        return desktop.current().screen_rect()
+
+    if spec == "window":
+        hwnd = ctx.state.get("target_hwnd") or desktop.current().foreground()
+        if not hwnd:
+            raise RuntimeError("region: window → нет активного окна")
+        return desktop.current().client_rect(hwnd)
+
+    if isinstance(spec, dict):
+        if "anchor" in spec:
+            return _anchor_region(spec, ctx)
+        if "fraction" in spec:
+            return _fraction_region(spec, ctx)
+        return (
+            int(spec["left"]),
+            int(spec["top"]),
+            int(spec["width"]),
+            int(spec["height"]),
+        )
+    raise ValueError(f"Unknown region spec: {spec!r}")
+
+
+def remember_hit(
+    ctx: Context,
+    step: Dict[str, Any],
+    image: str,
+    region: Rect,
+    hit: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Запоминает попадание в абсолютных координатах:
+      ctx.state["vision:last_hit"] — всегда,
+      ctx.state["anchor:<anchor_id>"] — если у шага задан anchor_id.
+    """
+    x, y, w, h = (int(v) for v in hit["rect"])
+    rec = {
+        "image": image,
+        "rect": (region[0] + x, region[1] + y, w, h),
+        "score": float(hit.get("score", 0.0)),
+        "method": str(hit.get("method", "")),
+        "region": tuple(int(v) for v in region),
+    }
+    ctx.state["vision:last_hit"] = rec
+    aid = step.get("anchor_id")
+    if aid:
+        ctx.state[f"anchor:{aid}"] = rec
+    return rec
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+# (path, imread flags) -> (mtime_ns, изображение)
+_images: Dict[Tuple[str, int], Tuple[int, np.ndarray]] = {}
+# (path, width, height, clahe) -> (mtime_ns, grayscale-шаблон ровно этого размера)
+_variants: Dict[Tuple[str, int, int, bool], Tuple[int, np.ndarray]] = {}
+_lock = threading.Lock()
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return -1
+
+
+def load_template(path: Path, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """
+    Читает шаблон с диска один раз; повторные вызовы отдают кэш, пока
+    не поменялся mtime файла.
+    """
+    key = (str(path), int(flags))
+    stamp = _mtime_ns(path)
+    with _lock:
+        hit = _images.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    img = cv2.imread(str(path), flags)
+    if img is None:
+        raise FileNotFoundError(f"Template not found or unreadable: {path}")
+    with _lock:
+        _images[key] = (stamp, img)
+    return img
+
+
+def load_gray_variant(
+    path: Path, size: Tuple[int, int], clahe: bool = False
+) -> np.ndarray:
+    """
+    Grayscale-вариант шаблона, отмасштабированный ровно в size=(w, h) —
+    размер прямоугольника последнего попадания. clahe=True — выравнивание
+    до масштабирования, в том же порядке, что и в find_template.
+    """
+    w, h = max(1, int(size[0])), max(1, int(size[1]))
+    key = (str(path), w, h, bool(clahe))
+    stamp = _mtime_ns(path)
+    with _lock:
+        hit = _variants.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    img = load_template(path, cv2.IMREAD_COLOR)
+    g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if clahe:
+        from .match import _clahe
+
+        g = _clahe(g)
+    if g.shape[1] != w or g.shape[0] != h:
+        g = cv2.resize(g, (w, h), interpolation=cv2.INTER_AREA)
+    with _lock:
+        _variants[key] = (stamp, g)
+    return g
+
+
+def invalidate(path: Path) -> int:
+    """Выбрасывает из кэша шаблон и все его варианты. Возвращает число записей."""
+    key = str(path)
+    with _lock:
+        stale_i = [k for k in _images if k[0] == key]
+        stale_v = [k for k in _variants if k[0] == key]
+        for ki in stale_i:
+            del _images[ki]
+        for kv in stale_v:
+            del _variants[kv]
+    return len(stale_i) + len(stale_v)
@@ -0,0 +1,550 @@
+# -*- coding: utf-8 -*-
+"""
+Наблюдение за файлами для тёплого демона и ожиданий файлов (wait_file):
+inotify на Linux, ReadDirectoryChangesW на Windows, иначе — опрос stat()
+с небольшим интервалом.
+Колбэк получает пачку изменившихся путей (создан/изменён/удалён).
+Корень-файл наблюдается через свой каталог (без рекурсии), так что можно
+ждать и ещё не существующий файл.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+OnChange = Callable[[Set[Path]], None]
+# идентичность файла + mtime + размер
+Stamp = Tuple[int, int, int, int]
+
+
+def file_stamp(path: Path) -> Optional[Stamp]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class Watcher:
+    """
+    Базовый интерфейс: add()/remove() — корни наблюдения, start()/stop() —
+    фоновый поток.
+    """
+
+    def __init__(self, on_change: OnChange, interval: float = 0.25) -> None:
+        self.on_change = on_change
+        self.interval = interval
+        self._roots: List[Path] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=type(self).__name__, daemon=True
+        )
+
+    def add(self, path: Path) -> bool:
+        """
+        Добавляет корень. False — наблюдение не установлено (нет каталога):
+        корень не запоминается, add() можно повторить позже.
+        """
+        path = Path(path)
+        with self._lock:
+            if path in self._roots:
+                return True
+            self._roots.append(path)
+        if self._added(path):
+            return True
+        with self._lock:
+            if path in self._roots:
+                self._roots.remove(path)
+        return False
+
+    def remove(self, path: Path) -> None:
+        path = Path(path)
+        with self._lock:
+            if path not in self._roots:
+                return
+            self._roots.remove(path)
+        self._removed(path)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _added(self, path: Path) -> bool:
+        return True
+
+    def _removed(self, path: Path) -> None:
+        pass
+
+    def _run(self) -> None:
+        raise NotImplementedError
+
+    def _emit(self, changed: Set[Path]) -> None:
+        if changed:
+            try:
+                self.on_change(changed)
+            except Exception:
+                pass  # наблюдатель не должен падать из-за обработчика
+
+
+class PollingWatcher(Watcher):
+    """Кроссплатформенный fallback: снимок stat() всех файлов под корнями."""
+
+    def __init__(self, on_change: OnChange, interval: float = 0.25) -> None:
+        super().__init__(on_change, interval)
+        self._snap: Dict[Path, Stamp] = {}
+
+    def _scan(self) -> Dict[Path, Stamp]:
+        out: Dict[Path, Stamp] = {}
+        with self._lock:
+            roots = list(self._roots)
+        for root in roots:
+            if root.is_file():
+                st = file_stamp(root)
+                if st:
+                    out[root] = st
+                continue
+            for dirpath, _, files in os.walk(root):
+                for fn in files:
+                    p = Path(dirpath) / fn
+                    st = file_stamp(p)
+                    if st:
+                        out[p] = st
+        return out
+
+    def _added(self, path: Path) -> bool:
+        # новые корни не должны выглядеть как «всё изменилось»
+        snap = self._scan()
+        with self._lock:
+            for p, st in snap.items():
+                self._snap.setdefault(p, st)
+        return True  # stat() увидит и ещё не созданный каталог
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            cur = self._scan()
+            with self._lock:
+                prev = self._snap
+                self._snap = cur
+            changed = {p for p, st in cur.items() if prev.get(p) != st}
+            changed |= set(prev) - set(cur)
+            self._emit(changed)
+
+
+# ------------------------------ inotify ------------------------------
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+
+def _libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1  # noqa: B018 — проверяем, что символ есть
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class InotifyWatcher(Watcher):
+    """Linux: события ядра, без опроса. Подкаталоги добавляются рекурсивно."""
+
+    def __init__(self, on_change: OnChange, interval: float = 0.25) -> None:
+        super().__init__(on_change, interval)
+        libc = _libc()
+        if libc is None:
+            raise OSError("inotify is not available")
+        self._libc = libc
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wd: Dict[int, Path] = {}
+        # корень -> (наблюдаемый каталог, рекурсивно ли)
+        self._targets: Dict[Path, Tuple[Path, bool]] = {}
+
+    def _watch(self, path: Path) -> bool:
+        target = path if path.is_dir() else path.parent
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(target)), _MASK)
+        if wd < 0:
+            return False
+        with self._lock:
+            self._wd[wd] = target
+        if path.is_dir():
+            for dirpath, dirs, _ in os.walk(path):
+                for d in dirs:
+                    sub = Path(dirpath) / d
+                    wd = self._libc.inotify_add_watch(
+                        self._fd, os.fsencode(str(sub)), _MASK
+                    )
+                    if wd >= 0:
+                        with self._lock:
+                            self._wd[wd] = sub
+        return True
+
+    def _added(self, path: Path) -> bool:
+        if not self._watch(path):
+            return False
+        with self._lock:
+            self._targets[path] = (
+                (path, True) if path.is_dir() else (path.parent, False)
+            )
+        return True
+
+    def _removed(self, path: Path) -> None:
+        # каталог снимается с наблюдения, когда он не нужен ни одному корню
+        with self._lock:
+            self._targets.pop(path, None)
+            keep = list(self._targets.values())
+            drop = [
+                wd
+                for wd, p in self._wd.items()
+                if not any(p == t or (rec and t in p.parents) for t, rec in keep)
+            ]
+            for wd in drop:
+                del self._wd[wd]
+        for wd in drop:
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([self._fd], [], [], self.interval)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._emit(self._parse(data))
+        finally:
+            os.close(self._fd)
+
+    def _parse(self, data: bytes) -> Set[Path]:
+        changed: Set[Path] = set()
+        off = 0
+        while off + _EVENT.size <= len(data):
+            wd, mask, _, size = _EVENT.unpack_from(data, off)
+            off += _EVENT.size
+            raw = data[off : off + size].rstrip(b"\0")
+            off += size
+            with self._lock:
+                base = self._wd.get(wd)
+            if base is None:
+                continue
+            path = base / os.fsdecode(raw) if raw else base
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                self._watch(path)
+                continue
+            if mask & _IN_ISDIR:
+                continue
+            changed.add(path)
+        return changed
+
+
+# ------------------------ ReadDirectoryChangesW ------------------------
+
+_FILE_LIST_DIRECTORY = 0x0001
+_FILE_SHARE_ALL = 0x00000007  # READ | WRITE | DELETE
+_OPEN_EXISTING = 3
+_FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+_NOTIFY_FILTER = (
+    0x00000001  # FILE_NAME
+    | 0x00000002  # DIR_NAME
+    | 0x00000004  # ATTRIBUTES
+    | 0x00000008  # SIZE
+    | 0x00000010  # LAST_WRITE
+)
+_NOTIFY_HEAD = struct.Struct("III")  # NextEntryOffset, Action, FileNameLength
+
+
+class WindowsWatcher(Watcher):
+    """
+    Windows: ReadDirectoryChangesW, по блокирующему потоку на корень.
+    stop() прерывает ожидание через CancelIoEx.
+    """
+
+    # объявлены здесь: вне Windows __init__ обрывается раньше присваиваний
+    _k32: Any
+    _dword: Any
+    _handles: Dict[Path, int]
+    _targets: Dict[Path, Path]
+    _started: bool
+
+    def __init__(self, on_change: OnChange, interval: float = 0.25) -> None:
+        super().__init__(on_change, interval)
+        if sys.platform != "win32":
+            raise OSError("ReadDirectoryChangesW is not available")
+        from ctypes import wintypes
+
+        k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        k32.CreateFileW.restype = wintypes.HANDLE
+        k32.CreateFileW.argtypes = [
+            wintypes.LPCWSTR,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.LPVOID,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.HANDLE,
+        ]
+        k32.ReadDirectoryChangesW.restype = wintypes.BOOL
+        k32.ReadDirectoryChangesW.argtypes = [
+            wintypes.HANDLE,
+            wintypes.LPVOID,
+            wintypes.DWORD,
+            wintypes.BOOL,
+            wintypes.DWORD,
+            ctypes.POINTER(wintypes.DWORD),
+            wintypes.LPVOID,
+            wintypes.LPVOID,
+        ]
+        k32.CancelIoEx.restype = wintypes.BOOL
+        k32.CancelIoEx.argtypes = [wintypes.HANDLE, wintypes.LPVOID]
+        k32.CloseHandle.restype = wintypes.BOOL
+        k32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._k32 = k32
+        self._dword = wintypes.DWORD
+        self._handles: Dict[Path, int] = {}
+        self._targets: Dict[Path, Path] = {}  # корень -> наблюдаемый каталог
+        self._started = False
+
+    def start(self) -> None:
+        with self._lock:
+            self._started = True
+            roots = list(self._roots)
+        for root in roots:
+            self._spawn(root)
+
+    def stop(self) -> None:
+        super().stop()
+        with self._lock:
+            handles = list(self._handles.values())
+        for h in handles:
+            self._k32.CancelIoEx(h, None)
+
+    def _added(self, path: Path) -> bool:
+        with self._lock:
+            started = self._started
+        return self._spawn(path) if started else True
+
+    def _removed(self, path: Path) -> None:
+        with self._lock:
+            target = self._targets.pop(path, None)
+            h = None
+            if target is not None and target not in self._targets.values():
+                h = self._handles.get(target)
+        if h is not None:
+            self._k32.CancelIoEx(h, None)  # поток закроет handle сам
+
+    def _spawn(self, root: Path) -> bool:
+        recursive = root.is_dir()
+        target = root if recursive else root.parent
+        with self._lock:
+            self._targets[root] = target
+            if target in self._handles:
+                return True
+        h = self._k32.CreateFileW(
+            str(target),
+            _FILE_LIST_DIRECTORY,
+            _FILE_SHARE_ALL,
+            None,
+            _OPEN_EXISTING,
+            _FILE_FLAG_BACKUP_SEMANTICS,
+            None,
+        )
+        if h is None or h == ctypes.c_void_p(-1).value:
+            # каталога нет — ожидающие перепроверяют по таймеру
+            with self._lock:
+                self._targets.pop(root, None)
+            return False
+        with self._lock:
+            self._handles[target] = h
+        threading.Thread(
+            target=self._loop,
+            args=(target, h, recursive),
+            name="WindowsWatcher",
+            daemon=True,
+        ).start()
+        return True
+
+    def _loop(self, target: Path, h: int, recursive: bool) -> None:
+        buf = ctypes.create_string_buffer(64 * 1024)
+        got = self._dword()
+        try:
+            while not self._stop.is_set():
+                ok = self._k32.ReadDirectoryChangesW(
+                    h,
+                    buf,
+                    len(buf),
+                    recursive,
+                    _NOTIFY_FILTER,
+                    ctypes.byref(got),
+                    None,
+                    None,
+                )
+                if not ok:
+                    break  # CancelIoEx из stop() или каталог удалён
+                if got.value == 0:
+                    # буфер переполнен: что именно изменилось, неизвестно
+                    self._emit({target})
+                    continue
+                self._emit(self._parse(target, buf.raw[: got.value]))
+        finally:
+            with self._lock:
+                self._handles.pop(target, None)
+            self._k32.CloseHandle(h)
+
+    @staticmethod
+    def _parse(target: Path, data: bytes) -> Set[Path]:
+        changed: Set[Path] = set()
+        off = 0
+        while off + _NOTIFY_HEAD.size <= len(data):
+            nxt, _, size = _NOTIFY_HEAD.unpack_from(data, off)
+            start = off + _NOTIFY_HEAD.size
+            name = data[start : start + size].decode("utf-16-le", errors="replace")
+            changed.add(target / name)
+            if nxt == 0:
+                break
+            off += nxt
+        return changed
+
+
+def make_watcher(on_change: OnChange, interval: float = 0.25) -> Watcher:
+    """inotify или ReadDirectoryChangesW, если доступны, иначе опрос."""
+    for kind in (InotifyWatcher, WindowsWatcher):
+        try:
+            return kind(on_change, interval)
+        except OSError:
+            continue
+    return PollingWatcher(on_change, interval)
+
+
+# ------------------------- ожидание файлов -------------------------
+
+
+class ChangeHub:
+    """
+    Общий на процесс наблюдатель для ожиданий файлов (wait_file, file_*):
+    ожидающий регистрируется watch(path), берёт generation(path),
+    проверяет файл и спит в wait() до события по этому пути; уходя —
+    unwatch(path). Событие о каталоге (переполнение буфера Windows,
+    удаление) будит всех, кто ждёт файлы в нём. Если каталога ещё нет,
+    наблюдение не установлено: ожидающий повторяет watch() при перепроверке.
+    """
+
+    def __init__(self, interval: float = 0.25) -> None:
+        self.interval = interval
+        self._watcher: Optional[Watcher] = None
+        self._cond = threading.Condition()
+        self._gen: Dict[Path, int] = {}
+        self._users: Dict[Path, int] = {}
+        self._live: Set[Path] = set()  # пути с установленным наблюдением
+
+    @property
+    def kind(self) -> str:
+        """Тип наблюдателя (InotifyWatcher, WindowsWatcher, PollingWatcher)."""
+        with self._cond:
+            return type(self._watcher).__name__ if self._watcher else "-"
+
+    def watch(self, path: Path) -> bool:
+        """Регистрирует ожидающего path; True — наблюдение установлено."""
+        with self._cond:
+            self._users[path] = self._users.get(path, 0) + 1
+            self._gen.setdefault(path, 0)
+        return self.retry(path)
+
+    def retry(self, path: Path) -> bool:
+        """Повторить установку наблюдения (каталог мог появиться)."""
+        with self._cond:
+            if path in self._live:
+                return True
+            if path not in self._users:
+                return False
+            if self._watcher is None:
+                self._watcher = make_watcher(self._on_change, self.interval)
+                self._watcher.start()
+            if self._watcher.add(path):
+                self._live.add(path)
+                return True
+            return False
+
+    def unwatch(self, path: Path) -> None:
+        """Ожидающий ушёл; с последним — путь снимается с наблюдения."""
+        with self._cond:
+            left = self._users.get(path, 0) - 1
+            if left > 0:
+                self._users[path] = left
+                return
+            self._users.pop(path, None)
+            self._gen.pop(path, None)
+            if path in self._live:
+                self._live.discard(path)
+                if self._watcher is not None:
+                    self._watcher.remove(path)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"paths": len(self._gen), "live": len(self._live)}
+
+    def _on_change(self, changed: Set[Path]) -> None:
+        with self._cond:
+            hit = [p for p in self._gen if p in changed or p.parent in changed]
+            for p in hit:
+                self._gen[p] += 1
+            if hit:
+                self._cond.notify_all()
+
+    def generation(self, path: Path) -> int:
+        with self._cond:
+            return self._gen.get(path, 0)
+
+    def wait(self, path: Path, since: int, seconds: float) -> bool:
+        """Ждёт событие по path после generation since; True — дождались."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._gen.get(path, 0) != since, max(0.0, seconds)
+            )
+
+
+_hub: Optional[ChangeHub] = None
+_hub_lock = threading.Lock()
+
+
+def change_hub() -> ChangeHub:
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = ChangeHub()
+        return _hub
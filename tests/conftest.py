@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from rich.console import Console
+
+# тесты запускаются из корня репозитория без установки пакета
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from runner.context import Context  # noqa: E402
+
+
+@pytest.fixture
+def ctx(tmp_path: Path) -> Context:
+    """Контекст прогона; артефакты (логи шагов) — во временном каталоге."""
+    config = {"paths": {"project_root": str(tmp_path)}, "run": {"timeout": "5s"}}
+    return Context(config=config, console=Console(file=io.StringIO(), width=200))
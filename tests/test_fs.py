@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from runner.actions import flow, fs
+from runner.context import Context
+from runner.utils import timing
+from runner.watch import ChangeHub, change_hub
+
+
+def _later(seconds: float, fn: Callable[[], object]) -> threading.Timer:
+    timer = threading.Timer(seconds, fn)
+    timer.start()
+    return timer
+
+
+def test_wait_file_wakes_on_creation(ctx: Context, tmp_path: Path) -> None:
+    target = tmp_path / "out.txt"
+    timer = _later(0.2, target.touch)
+    t0 = time.perf_counter()
+    try:
+        fs.wait_file(ctx, {"path": str(target)})
+    finally:
+        timer.cancel()
+    assert 0.15 <= time.perf_counter() - t0 < 2.0
+    assert ctx.state["file:last"] == str(target)
+
+
+def test_wait_file_vanish(ctx: Context, tmp_path: Path) -> None:
+    target = tmp_path / "lock"
+    target.touch()
+    timer = _later(0.2, target.unlink)
+    try:
+        fs.wait_file(ctx, {"path": str(target), "exists": False})
+    finally:
+        timer.cancel()
+    assert not target.exists()
+
+
+def test_wait_file_stable(ctx: Context, tmp_path: Path) -> None:
+    target = tmp_path / "report.csv"
+
+    def _writer() -> None:
+        for _ in range(4):
+            with target.open("a") as f:
+                f.write("y" * 100)
+            time.sleep(0.1)
+
+    writer = threading.Thread(target=_writer)
+    writer.start()
+    t0 = time.perf_counter()
+    fs.wait_file(ctx, {"path": str(target), "stable": "300ms"})
+    took = time.perf_counter() - t0
+    writer.join()
+    # дописан (4 записи по 100 мс) и ещё 300 мс тишины
+    assert target.stat().st_size == 400
+    assert took >= 0.6
+
+
+def test_wait_file_stable_needs_exists(ctx: Context, tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="'stable' needs exists: true"):
+        fs.wait_file(
+            ctx, {"path": str(tmp_path / "x"), "exists": False, "stable": True}
+        )
+
+
+def test_wait_file_timeout(ctx: Context, tmp_path: Path) -> None:
+    # каталога нет — наблюдать нечего, работает перепроверка по таймеру
+    missing = tmp_path / "nodir" / "x"
+    t0 = time.perf_counter()
+    with pytest.raises(TimeoutError, match="wait_file"):
+        fs.wait_file(ctx, {"path": str(missing), "timeout": "0.4s"})
+    assert 0.35 <= time.perf_counter() - t0 < 1.5
+
+
+def test_wait_file_timeout_on_virtual_clock(ctx: Context, tmp_path: Path) -> None:
+    clock = timing.VirtualClock()
+    t0 = time.perf_counter()
+    with timing.use_clock(clock), pytest.raises(TimeoutError):
+        fs.wait_file(ctx, {"path": str(tmp_path / "never"), "timeout": "10s"})
+    assert clock.virtual_elapsed == pytest.approx(10.0)
+    assert time.perf_counter() - t0 < 2.0
+
+
+def test_file_conditions(ctx: Context, tmp_path: Path) -> None:
+    target = tmp_path / "data.bin"
+    exists = {"type": "file_exists", "path": str(target)}
+    stable = {"type": "file_stable", "path": str(target), "stable_for": "0.2s"}
+    assert not flow._eval_leaf(ctx, exists)
+    assert not flow._eval_leaf(ctx, stable)
+
+    target.write_text("z")
+    assert flow._eval_leaf(ctx, exists)
+    # «тишина» копится между проверками
+    assert not flow._eval_leaf(ctx, stable)
+    time.sleep(0.25)
+    assert flow._eval_leaf(ctx, stable)
+
+
+def test_hub_watches_a_directory_created_later(tmp_path: Path) -> None:
+    hub = ChangeHub()
+    target = tmp_path / "later" / "out.txt"
+    assert not hub.watch(target)  # каталога нет — наблюдать нечего
+    target.parent.mkdir()
+    assert hub.retry(target)
+    gen = hub.generation(target)
+    timer = _later(0.1, target.touch)
+    try:
+        assert hub.wait(target, gen, 2.0)
+    finally:
+        timer.cancel()
+    hub.unwatch(target)
+    assert hub.stats() == {"paths": 0, "live": 0}
+
+
+def test_wait_file_releases_its_watch(ctx: Context, tmp_path: Path) -> None:
+    before = change_hub().stats()
+    target = tmp_path / "sub" / "out.txt"
+    _later(0.1, target.parent.mkdir)
+    timer = _later(0.5, target.touch)
+    try:
+        fs.wait_file(ctx, {"path": str(target), "timeout": "5s"})
+    finally:
+        timer.cancel()
+    assert change_hub().stats() == before
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import http.server
+import socket
+import threading
+import time
+from typing import Iterator
+
+import pytest
+
+from runner.actions import flow, net
+from runner.context import Context
+from runner.utils import timing
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+class _Health(http.server.BaseHTTPRequestHandler):
+    """Первые два ответа — 503 «starting», дальше 200 «status: ready»."""
+
+    hits = 0
+
+    def do_GET(self) -> None:
+        type(self).hits += 1
+        ready = type(self).hits > 2
+        self.send_response(200 if ready else 503)
+        self.end_headers()
+        self.wfile.write(b"status: ready" if ready else b"starting")
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def late_server() -> Iterator[int]:
+    """Порт, на котором HTTP-сервер поднимется через 0.3s."""
+    port = _free_port()
+    handler = type("Health", (_Health,), {"hits": 0})
+    servers = []
+
+    def _start() -> None:
+        srv = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+        servers.append(srv)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    timer = threading.Timer(0.3, _start)
+    timer.start()
+    yield port
+    timer.cancel()
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_wait_port_then_wait_http(ctx: Context, late_server: int) -> None:
+    port = late_server
+    assert not flow._eval_leaf(ctx, {"type": "port_open", "port": port})
+    t0 = time.perf_counter()
+    net.wait_port(ctx, {"port": port})
+    assert 0.25 <= time.perf_counter() - t0 < 3.0
+
+    # порт уже открыт, но сервис ещё отвечает 503 — ждём тело
+    url = f"http://127.0.0.1:{port}/health"
+    net.wait_http(ctx, {"url": url, "body": "/READY/i"})
+    assert ctx.state["http:status"] == 200
+
+    assert flow._eval_leaf(ctx, {"type": "port_open", "port": port})
+    assert flow._eval_leaf(ctx, {"type": "http_ok", "url": url, "status": [200]})
+    assert not flow._eval_leaf(ctx, {"type": "http_ok", "url": url, "status": 204})
+
+
+def test_wait_port_timeout(ctx: Context) -> None:
+    port = _free_port()
+    t0 = time.perf_counter()
+    with pytest.raises(TimeoutError, match="wait_port"):
+        net.wait_port(ctx, {"port": port, "timeout": "0.4s"})
+    assert 0.35 <= time.perf_counter() - t0 < 2.0
+
+
+def test_wait_http_timeout_on_virtual_clock(ctx: Context) -> None:
+    url = f"http://127.0.0.1:{_free_port()}/"
+    clock = timing.VirtualClock()
+    t0 = time.perf_counter()
+    with timing.use_clock(clock), pytest.raises(TimeoutError, match="wait_http"):
+        net.wait_http(ctx, {"url": url, "timeout": "30s"})
+    assert clock.virtual_elapsed == pytest.approx(30.0, abs=0.5)
+    assert time.perf_counter() - t0 < 5.0
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import re
+import subprocess
+import sys
+import threading
+from typing import Iterator
+
+import pytest
+
+from runner.utils import outputs
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry() -> Iterator[None]:
+    yield
+    with outputs._lock:
+        outputs._streams.clear()
+
+
+def _closed_stream() -> outputs.OutputStream:
+    s = outputs.OutputStream(None)
+    s.open_pipe()
+    s.feed("out", "line\n")
+    s.close_pipe()
+    return s
+
+
+def test_tail_is_bounded_and_search_sees_new_lines() -> None:
+    s = outputs.OutputStream(None, tail_lines=3)
+    s.open_pipe()
+    for i in range(10):
+        s.feed("out", f"line {i}\n")
+    assert [ln[2] for ln in s.lines()] == ["line 7", "line 8", "line 9"]
+    since = s.cursor
+    assert s.search(re.compile("line"), since) is None
+    s.feed("err", "ready\n")
+    assert s.search(re.compile("ready"), since, "err") == (10, "err", "ready")
+    assert s.search(re.compile("ready"), since, "out") is None
+
+
+def test_wait_new_wakes_on_line() -> None:
+    s = outputs.OutputStream(None)
+    s.open_pipe()
+    threading.Timer(0.05, s.feed, ("out", "hello")).start()
+    assert s.wait_new(s.cursor, 5.0)
+    assert s.lines()[-1][2] == "hello"
+
+
+def test_attach_streams_to_log(tmp_path) -> None:
+    log = tmp_path / "p.log"
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import sys; print('a'); print('b', file=sys.stderr)"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    s = outputs.OutputStream(log)
+    s.attach("out", proc.stdout)
+    s.attach("err", proc.stderr)
+    proc.wait()
+    assert s.join(5.0)
+    assert s.text("out") == "a" and s.text("err") == "b"
+    assert sorted(log.read_text(encoding="utf-8").splitlines()) == ["! b", "a"]
+
+
+def test_registry_keeps_live_and_bounds_closed() -> None:
+    live = outputs.OutputStream(None)
+    live.open_pipe()
+    outputs.register(1, live)
+    for pid in range(2, 2 + outputs.KEEP_CLOSED + 10):
+        outputs.register(pid, _closed_stream())
+    assert outputs.get(1) is live
+    assert len(outputs._streams) == outputs.KEEP_CLOSED + 1
+    assert outputs.get(2) is None  # самые старые дочитанные — забыты
+
+    assert outputs.prune() == outputs.KEEP_CLOSED
+    assert list(outputs._streams) == [1]
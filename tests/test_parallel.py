@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from runner.actions import flow
+from runner.context import Context
+from runner.utils import timing
+
+
+def _sleep(duration: str) -> Dict[str, Any]:
+    return {"action": "sleep", "duration": duration}
+
+
+def _log(message: str) -> Dict[str, Any]:
+    return {"action": "log", "message": message}
+
+
+# sleep без duration — шаг, который падает сразу и на любой ОС
+BOOM: Dict[str, Any] = {"action": "sleep"}
+
+
+def _parallel(ctx: Context, join: str, branches: List[Any]) -> timing.VirtualClock:
+    clock = timing.VirtualClock()
+    with timing.use_clock(clock):
+        flow.action_parallel(
+            ctx, {"action": "parallel", "join": join, "branches": branches}
+        )
+    return clock
+
+
+def _out(ctx: Context) -> str:
+    return ctx.console.file.getvalue()  # type: ignore[attr-defined]
+
+
+def test_all_runs_branches_concurrently(ctx: Context) -> None:
+    clock = _parallel(
+        ctx, "all", [[_sleep("0.5s"), _log("a done")], [_sleep("0.2s"), _log("b done")]]
+    )
+    # ветки идут одновременно: блок длится как самая долгая, а не сумма
+    assert clock.virtual_elapsed == pytest.approx(0.5)
+    assert "a done" in _out(ctx) and "b done" in _out(ctx)
+
+
+def test_all_fails_on_first_error_and_cancels_the_rest(ctx: Context) -> None:
+    t0 = time.perf_counter()
+    with pytest.raises(RuntimeError, match="branch 'branch 2' failed"):
+        flow.action_parallel(
+            ctx,
+            {
+                "action": "parallel",
+                "branches": [[_sleep("2s"), _log("SHOULD NOT")], [BOOM]],
+            },
+        )
+    assert time.perf_counter() - t0 < 1.0
+    time.sleep(0.1)  # проигравшая ветка успела бы дойти до log, если не отменена
+    assert "SHOULD NOT" not in _out(ctx)
+
+
+def test_any_is_decided_by_the_first_finished_branch(ctx: Context) -> None:
+    clock = _parallel(ctx, "any", [[_sleep("0.2s")], [_sleep("0.5s"), BOOM]])
+    assert clock.virtual_elapsed == pytest.approx(0.2)
+
+    with pytest.raises(RuntimeError, match="branch 'branch 1' failed"):
+        _parallel(ctx, "any", [[_sleep("0.1s"), BOOM], [_sleep("0.5s")]])
+
+
+def test_first_success_skips_failed_branches(ctx: Context) -> None:
+    clock = _parallel(
+        ctx, "first_success", [[_sleep("0.1s"), BOOM], [_sleep("0.3s"), _log("won")]]
+    )
+    assert clock.virtual_elapsed == pytest.approx(0.3)
+    assert "first_success → branch 2" in _out(ctx)
+
+    with pytest.raises(RuntimeError, match="failed"):
+        _parallel(ctx, "first_success", [[BOOM], [_sleep("0.1s"), BOOM]])
+
+
+def test_branch_timeout(ctx: Context) -> None:
+    branches = [
+        [_sleep("0.1s")],
+        {"name": "slow", "timeout": "0.3s", "steps": [_sleep("2s")]},
+    ]
+    with pytest.raises(RuntimeError, match="branch 'slow' failed: timed out"):
+        _parallel(ctx, "all", branches)
+
+
+def test_branch_timeout_cancels_on_real_clock(ctx: Context) -> None:
+    t0 = time.perf_counter()
+    with pytest.raises(RuntimeError, match="timed out"):
+        flow.action_parallel(
+            ctx,
+            {
+                "action": "parallel",
+                "timeout": "0.2s",
+                "branches": [[_sleep("2s"), _log("SHOULD NOT")]],
+            },
+        )
+    assert time.perf_counter() - t0 < 1.0
+    time.sleep(0.1)
+    assert "SHOULD NOT" not in _out(ctx)
+
+
+def test_unknown_join_policy(ctx: Context) -> None:
+    with pytest.raises(ValueError, match="join must be one of"):
+        flow.action_parallel(ctx, {"branches": [[_sleep("0s")]], "join": "most"})
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import re
+import subprocess
+import sys
+from typing import Iterator
+
+import pytest
+
+from runner.utils import processes, timing
+
+
+@pytest.fixture(autouse=True)
+def _fresh_snapshot() -> Iterator[None]:
+    processes.invalidate()
+    yield
+    processes.invalidate()
+
+
+def _spawn(code: int = 0) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-c", f"raise SystemExit({code})"])
+
+
+def test_exit_code_of_own_process_is_read_once() -> None:
+    proc = _spawn(7)
+    processes.track(proc)
+    proc.wait()
+    assert not processes.alive(proc.pid)
+    assert processes.exit_code(proc.pid) == 7
+    # прочитанный код не хранится: процесс забыт
+    assert proc.pid not in processes._spawned
+    assert processes.exit_code(proc.pid) is None
+
+
+def test_finished_processes_are_bounded_and_pruned() -> None:
+    procs = [_spawn() for _ in range(processes.KEEP_FINISHED + 5)]
+    for p in procs:
+        p.wait()
+        processes.track(p)
+    assert len(processes._spawned) <= processes.KEEP_FINISHED
+    processes.prune()
+    assert not processes._spawned
+
+
+def test_snapshot_is_shared_within_interval() -> None:
+    before = processes.stats()
+    rx = re.compile(r"^no-such-process-name$")
+    for _ in range(20):
+        assert processes.find(rx, max_age=60.0) == []
+    after = processes.stats()
+    assert after["full"] - before["full"] == 1
+    assert after["cached"] - before["cached"] == 19
+
+
+def test_snapshot_is_not_reused_across_clocks() -> None:
+    rx = re.compile(r"^no-such-process-name$")
+    processes.find(rx, max_age=60.0)
+    before = processes.stats()["full"]
+    # виртуальные часы начинают с 0: отметка реальных часов им несравнима
+    with timing.use_clock(timing.VirtualClock()):
+        processes.find(rx, max_age=60.0)
+        processes.find(rx, max_age=60.0)
+    processes.find(rx, max_age=60.0)
+    assert processes.stats()["full"] - before == 2
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from runner.actions.run import run_many, run_shell
+from runner.context import Context
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="команды в тестах — синтаксис sh"
+)
+
+
+def _gone(pid: int, within: float = 2.0) -> bool:
+    deadline = time.monotonic() + within
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _spawner(pidfile: Path) -> str:
+    """Команда, которая ждёт своего потомка (pid потомка — в pidfile)."""
+    return f"sleep 30 & echo $! > '{pidfile}'; wait"
+
+
+def _statuses(ctx: Context) -> list:
+    return [row["status"] for row in ctx.state["run_many"]]
+
+
+def test_all_ok(ctx: Context) -> None:
+    run_many(ctx, {"name": "m", "commands": ["echo a", "echo b", "echo c"]})
+    assert _statuses(ctx) == ["ok", "ok", "ok"]
+    assert all(row["code"] == 0 for row in ctx.state["run_many"])
+
+
+def test_collect_all_counts_launch_failures(ctx: Context) -> None:
+    step = {
+        "name": "m",
+        "on_error": "collect_all",
+        # pwsh нет в PATH: Popen падает уже в рабочем потоке
+        "commands": [{"inline": "1", "pwsh": True}, "exit 3", "echo ok"],
+    }
+    with pytest.raises(RuntimeError, match="2 of 3 commands failed"):
+        run_many(ctx, step)
+    rows = ctx.state["run_many"]
+    assert _statuses(ctx) == ["failed", "failed", "ok"]
+    assert rows[0]["error"].startswith("cannot start")
+    assert rows[1]["code"] == 3 and rows[1]["error"] == "exit 3"
+
+
+def test_fail_fast_stops_running_and_skips_rest(ctx: Context) -> None:
+    step = {
+        "name": "m",
+        "concurrency": 2,
+        "commands": ["sleep 0.2; exit 1", "sleep 10", "echo never"],
+    }
+    t0 = time.monotonic()
+    with pytest.raises(RuntimeError, match="1 of 3 commands failed"):
+        run_many(ctx, step)
+    assert time.monotonic() - t0 < 5
+    assert _statuses(ctx) == ["failed", "cancelled", "skipped"]
+
+
+def test_timeout_per_command(ctx: Context) -> None:
+    step = {
+        "name": "m",
+        "on_error": "collect_all",
+        "commands": [{"command": "sleep 10", "timeout": "300ms"}, "echo ok"],
+    }
+    with pytest.raises(RuntimeError, match="timeout after 0.3s"):
+        run_many(ctx, step)
+    assert _statuses(ctx) == ["timeout", "ok"]
+
+
+def test_timeout_kills_the_command_tree(ctx: Context, tmp_path: Path) -> None:
+    pidfile = tmp_path / "child.pid"
+    step = {
+        "name": "m",
+        "commands": [{"command": _spawner(pidfile), "timeout": "500ms"}],
+    }
+    with pytest.raises(RuntimeError, match="timeout"):
+        run_many(ctx, step)
+    assert _gone(int(pidfile.read_text()))
+
+
+def test_fail_fast_kills_the_command_tree(ctx: Context, tmp_path: Path) -> None:
+    pidfile = tmp_path / "child.pid"
+    step = {"name": "m", "commands": [_spawner(pidfile), "sleep 0.5; exit 1"]}
+    with pytest.raises(RuntimeError, match="1 of 2 commands failed"):
+        run_many(ctx, step)
+    assert _statuses(ctx) == ["cancelled", "failed"]
+    assert _gone(int(pidfile.read_text()))
+
+
+def test_run_shell_without_session_kills_the_tree(ctx: Context, tmp_path: Path) -> None:
+    pidfile = tmp_path / "child.pid"
+    step = {"command": _spawner(pidfile), "session": False, "timeout": "500ms"}
+    with pytest.raises(TimeoutError, match="run_shell: timeout"):
+        run_shell(ctx, step)
+    assert _gone(int(pidfile.read_text()))
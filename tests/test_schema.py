@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+from runner import schema
+
+
+def test_not_keyword() -> None:
+    check = schema.compile_schema({"not": {"required": ["a", "b"]}})
+    assert check({"a": 1}, ()) == []
+    assert check({"a": 1, "b": 2}, ()) == [
+        ((), "should not be valid under {'required': ['a', 'b']}")
+    ]
+
+
+def test_unknown_keyword_fails_at_compile_time() -> None:
+    with pytest.raises(ValueError, match="'minLength' is not supported"):
+        schema.compile_schema({"type": "string", "minLength": 1})
+    # аннотации и then/else при if — не ошибка
+    schema.compile_schema(
+        {"title": "t", "if": {"type": "string"}, "then": {}, "else": {}}
+    )
+
+
+def test_repo_schema_compiles() -> None:
+    schema.compile_schema(schema.load_schema())
+
+
+def test_wait_process_takes_name_or_pid() -> None:
+    doc = "version: 1\nsteps:\n  - action: wait_process\n    name: x\n{extra}"
+    assert schema.check_text(doc.format(extra="")) == []
+    assert schema.check_text(doc.format(extra="    pid: 5\n")) == [
+        "3:5: steps[0]: should not be valid under {'required': ['name', 'pid']}"
+    ]
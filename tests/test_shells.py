@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import time
+from typing import Iterator
+
+import pytest
+
+from runner.utils import shells
+
+posix_only = pytest.mark.skipif(
+    sys.platform == "win32", reason="команды в тестах — синтаксис sh"
+)
+
+
+@pytest.fixture
+def pool() -> Iterator[shells.ShellPool]:
+    p = shells.ShellPool(shells.default_shell(), size=1, max_commands=100)
+    yield p
+    p.close()
+
+
+def _gone(pid: int, within: float = 2.0) -> bool:
+    deadline = time.monotonic() + within
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@posix_only
+def test_run_returns_code_and_output(pool: shells.ShellPool) -> None:
+    assert pool.run("echo out; echo err >&2; exit 3") == (3, "out", "err")
+    assert pool.run("echo again") == (0, "again", "")
+
+
+@posix_only
+def test_commands_do_not_leak_state(pool: shells.ShellPool, tmp_path) -> None:
+    pool.run(f"cd '{tmp_path}'; FOO=1")
+    code, out, _ = pool.run('pwd; echo "[$FOO]"')
+    assert code == 0
+    assert out.splitlines()[1] == "[]"
+    assert out.splitlines()[0] != str(tmp_path)
+    # stdin команды пуст, а не канал команд сессии
+    reader = f"'{sys.executable}' -c 'import sys; print(len(sys.stdin.read()))'"
+    assert pool.run(reader, timeout=10) == (0, "0", "")
+
+
+@pytest.mark.skipif(
+    not shutil.which(shells._EXES["pwsh"]), reason="нет PowerShell (pwsh)"
+)
+def test_powershell_commands_do_not_leak_state(tmp_path) -> None:
+    p = shells.ShellPool("pwsh", size=1, max_commands=100)
+    try:
+        home = p.run("(Get-Location).Path")[1]
+        p.run(f"Set-Location -LiteralPath '{tmp_path}'; $env:RPA_FOO = '1'")
+        assert p.run("(Get-Location).Path")[1] == home
+        assert p.run('"[$env:RPA_FOO]"') == (0, "[]", "")
+        # stdin команды пуст, а не канал команд сессии
+        reader = f"& '{sys.executable}' -c 'import sys; print(len(sys.stdin.read()))'"
+        assert p.run(reader, timeout=10) == (0, "0", "")
+        assert p.started == 1
+        # $global: не откатить — сессия заменяется новой
+        p.run("$global:RpaFoo = 1")
+        assert p.run('"[$global:RpaFoo]"') == (0, "[]", "")
+        assert p.started == 2
+    finally:
+        p.close()
+
+
+@posix_only
+def test_timeout_returns_promptly_and_kills_children(
+    pool: shells.ShellPool, tmp_path
+) -> None:
+    pidfile = tmp_path / "child.pid"
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.run(f"sleep 30 & echo $! > '{pidfile}'; wait", timeout=0.5)
+    assert time.monotonic() - t0 < 3.0
+    assert _gone(int(pidfile.read_text()))
+    # сессия, убитая по таймауту, заменяется новой
+    assert pool.run("echo ok") == (0, "ok", "")
+    assert pool.started == 2
+
+
+@posix_only
+def test_session_retired_after_max_commands() -> None:
+    p = shells.ShellPool(shells.default_shell(), size=1, max_commands=2)
+    try:
+        for i in range(5):
+            assert p.run(f"echo {i}") == (0, str(i), "")
+        assert p.started == 3
+    finally:
+        p.close()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from rich.console import Console
+
+from runner.desktop import sim
+from runner.desktop.sim import SimDesktop
+from runner.dsl import load_config
+from runner.orchestrator import ENGINES, run_scenario
+from runner.utils import timing
+
+ROOT = Path(__file__).resolve().parents[1]
+SIM = ROOT / "scenarios" / "notepad_click.assets" / "sim.yaml"
+
+
+def _run(tmp_path: Path, engine: str) -> tuple[float, float, dict]:
+    cfg = load_config(ROOT, "notepad_click", None, [])
+    # артефакты (debug.save_best) — во временный каталог, не в репозиторий
+    cfg = {**cfg, "paths": {**(cfg.get("paths") or {}), "project_root": str(tmp_path)}}
+    desk = SimDesktop.from_file(SIM)
+    clock = timing.VirtualClock()
+    console = Console(file=io.StringIO(), width=200)
+    t0 = time.perf_counter()
+    run_scenario(cfg, console=console, engine=engine, clock=clock, desktop=desk)
+    return time.perf_counter() - t0, clock.virtual_elapsed, desk.summary()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_notepad_click_on_sim(tmp_path: Path, engine: str) -> None:
+    real, scen, summary = _run(tmp_path, engine)
+    assert summary == {
+        "frames": 1,
+        "spawn": 1,
+        "focus": 1,
+        "move": 1,
+        "click": 1,
+        "key": 1,
+    }
+    # паузы сценария идут по виртуальным часам, а не по-настоящему
+    assert 0.8 <= scen < 1.0
+    assert real < scen
+
+
+def test_engines_agree_on_scenario_time(tmp_path: Path) -> None:
+    times = {e: _run(tmp_path / e, e)[1] for e in ENGINES}
+    assert len(set(round(t, 6) for t in times.values())) == 1, times
+
+
+def test_add_effect_reads_its_image_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cv2.imwrite(str(tmp_path / "dot.png"), np.full((4, 4, 3), 255, np.uint8))
+    spec = {
+        "windows": [{"id": "w", "title": "W", "rect": [0, 0, 100, 100]}],
+        "reactions": [
+            {
+                "when": "key",
+                "target": "f5",
+                "do": [
+                    {
+                        "add": {
+                            "window": "w",
+                            "id": "e",
+                            "image": "dot.png",
+                            "at": [1, 1],
+                        }
+                    }
+                ],
+            },
+            {"when": "key", "target": "f6", "do": [{"remove": "e"}]},
+        ],
+    }
+    calls = []
+    imread = sim.cv2.imread
+    monkeypatch.setattr(sim.cv2, "imread", lambda *a: calls.append(a[0]) or imread(*a))
+    desk = SimDesktop.from_spec(spec, base_dir=tmp_path)
+    for _ in range(3):
+        desk.press("f5")
+        assert [e.id for e in desk.window("w").elements] == ["e"]
+        desk.press("f6")
+    assert len(calls) == 1
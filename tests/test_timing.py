@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import Iterator, List
+
+import pytest
+
+from runner.context import CancelToken
+from runner.utils import timing
+
+
+@pytest.fixture
+def clock() -> Iterator[timing.VirtualClock]:
+    with timing.use_clock(timing.VirtualClock()) as clk:
+        yield clk  # type: ignore[misc]
+
+
+def _times(clock: timing.Clock, it: Iterator[int], work: float = 0.0) -> List[float]:
+    start = clock.now()
+    out: List[float] = []
+    for _ in it:
+        out.append(round(clock.now() - start, 6))
+        if work:
+            timing.sleep(work)
+    return out
+
+
+def test_ticks_fire_at_fixed_rate(clock: timing.VirtualClock) -> None:
+    it = timing.ticks(0.5, timeout=2.0)
+    # первая попытка сразу, дальше start + k*period; тик в дедлайн не идёт
+    assert _times(clock, it) == [0.0, 0.5, 1.0, 1.5]
+
+
+def test_work_time_is_part_of_the_period(clock: timing.VirtualClock) -> None:
+    it = timing.ticks(0.5, timeout=2.0)
+    assert _times(clock, it, work=0.2) == [0.0, 0.5, 1.0, 1.5]
+
+
+def test_slow_attempt_does_not_cause_catch_up(clock: timing.VirtualClock) -> None:
+    start = clock.now()
+    seen: List[tuple] = []
+    for k in timing.ticks(0.5, timeout=3.0):
+        seen.append((k, round(clock.now() - start, 6)))
+        if k == 1:
+            timing.sleep(1.2)  # попытка заняла больше двух периодов
+    # после 1.7s следующий тик — ближайший будущий (2.0), пропущенные не догоняем
+    assert seen == [(0, 0.0), (1, 0.5), (4, 2.0), (5, 2.5)]
+
+
+def test_timeout_bounds_the_last_tick(clock: timing.VirtualClock) -> None:
+    start = clock.now()
+    for _ in timing.ticks(0.3, timeout=1.0):
+        assert clock.now() - start < 1.0
+    assert clock.now() - start == pytest.approx(0.9)
+
+
+def test_cancel_stops_iteration(clock: timing.VirtualClock) -> None:
+    token = CancelToken()
+    seen = []
+    for k in timing.ticks(0.1, cancel=token):
+        seen.append(k)
+        if k == 2:
+            token.cancel()
+    assert seen == [0, 1, 2]
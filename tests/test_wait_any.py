@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from runner.actions import flow
+from runner.context import Context
+from runner.utils import timing
+
+
+@pytest.fixture
+def probes(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    """Порядок одиночных проверок; image_exists здесь всегда ложно и без экрана."""
+    seen: List[str] = []
+    real = flow._probe_leaf
+
+    def _spy(ctx: Context, cond: Dict[str, Any]) -> bool:
+        seen.append(flow._cond_label(cond))
+        if cond.get("type") == "image_exists":
+            return False
+        return real(ctx, cond)
+
+    monkeypatch.setattr(flow, "_probe_leaf", _spy)
+    return seen
+
+
+def _exists(path: Path, cid: str) -> Dict[str, Any]:
+    return {"type": "file_exists", "path": str(path), "id": cid}
+
+
+IMAGE: Dict[str, Any] = {"type": "image_exists", "image": "button.png"}
+
+
+def test_wait_any_records_the_fired_condition(ctx: Context, tmp_path: Path) -> None:
+    (tmp_path / "ready").touch()
+    step = {
+        "conditions": [
+            _exists(tmp_path / "missing", "missing"),
+            _exists(tmp_path / "ready", "ready"),
+        ]
+    }
+    flow.action_wait_any(ctx, step)
+    fired = ctx.state["condition:fired"]
+    assert (fired["index"], fired["id"], fired["type"]) == (
+        2,
+        "file_exists(ready)",
+        "file_exists",
+    )
+
+
+def test_cheap_conditions_are_probed_first(
+    ctx: Context, tmp_path: Path, probes: List[str]
+) -> None:
+    (tmp_path / "ready").touch()
+    flow.action_wait_any(
+        ctx, {"conditions": [IMAGE, _exists(tmp_path / "ready", "ready")]}
+    )
+    # дешёвый file_exists уже сработал — дорогой image_exists не снимает экран
+    assert probes == ["file_exists(ready)"]
+
+
+def test_groups_short_circuit(ctx: Context, tmp_path: Path, probes: List[str]) -> None:
+    (tmp_path / "ready").touch()
+    assert flow._eval_condition(
+        ctx, {"any": [IMAGE, _exists(tmp_path / "ready", "ready")]}
+    )
+    assert probes == ["file_exists(ready)"]
+
+    probes.clear()
+    cond = {"all": [IMAGE, _exists(tmp_path / "missing", "missing")]}
+    assert not flow._eval_condition(ctx, cond)
+    assert probes == ["file_exists(missing)"]
+
+
+def test_wait_any_times_out_on_virtual_clock(ctx: Context, tmp_path: Path) -> None:
+    clock = timing.VirtualClock()
+    t0 = time.perf_counter()
+    with timing.use_clock(clock), pytest.raises(TimeoutError, match="none of 2"):
+        flow.action_wait_any(
+            ctx,
+            {
+                "conditions": [
+                    _exists(tmp_path / "a", "a"),
+                    _exists(tmp_path / "b", "b"),
+                ],
+                "timeout": "30s",
+            },
+        )
+    assert clock.virtual_elapsed == pytest.approx(30.0)
+    assert time.perf_counter() - t0 < 5.0
+    assert "condition:fired" not in ctx.state
+
+
+def test_wait_any_fires_when_a_file_appears(ctx: Context, tmp_path: Path) -> None:
+    target = tmp_path / "late"
+    timer = threading.Timer(0.2, target.touch)
+    timer.start()
+    try:
+        flow.action_wait_any(
+            ctx,
+            {
+                "conditions": [
+                    _exists(tmp_path / "never", "never"),
+                    _exists(target, "late"),
+                ]
+            },
+        )
+    finally:
+        timer.cancel()
+    fired = ctx.state["condition:fired"]
+    assert fired["id"] == "file_exists(late)"
+    assert 0.15 <= fired["elapsed"] < 2.0
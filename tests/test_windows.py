@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import Iterator
+
+import pytest
+
+from runner import desktop
+from runner.desktop import windows
+from runner.desktop.sim import SimDesktop
+from runner.utils import timing
+
+
+@pytest.fixture
+def sim() -> Iterator[SimDesktop]:
+    desk = SimDesktop(size=(800, 600))
+    desk.add_window("a", title="Alpha", rect=(0, 0, 200, 100))
+    desk.add_window("b", title="Beta", rect=(300, 0, 200, 100))
+    windows.invalidate()
+    with desktop.use_desktop(desk):
+        yield desk
+    windows.invalidate()
+
+
+def test_find_and_snapshot_share_enumeration(sim: SimDesktop) -> None:
+    before = windows.stats()
+    assert windows.find(lambda w: w[1] == "Gamma", max_age=60.0) is None
+    titles = [title for _, title, _ in windows.snapshot(max_age=60.0)]
+    assert sorted(titles) == ["Alpha", "Beta"]
+    after = windows.stats()
+    assert after["full"] - before["full"] == 1
+    assert after["cached"] - before["cached"] == 1
+
+
+def test_snapshot_is_not_reused_across_clocks(sim: SimDesktop) -> None:
+    windows.snapshot(max_age=60.0)
+    before = windows.stats()["full"]
+    with timing.use_clock(timing.VirtualClock()):
+        windows.snapshot(max_age=60.0)
+        windows.snapshot(max_age=60.0)
+    windows.snapshot(max_age=60.0)
+    assert windows.stats()["full"] - before == 2